@@ -0,0 +1,69 @@
+# tests/maquinas.py
+import random
+
+from tomasulo_engine import SimuladorTomasulo
+
+# Programas aleatórios e impressão digital do estado simulado, comuns aos testes
+
+OPS_ALU = ('ADD', 'SUB', 'MUL', 'DIV')
+
+# Configurações cobertas pelos testes de equivalência: backends, resolução de
+# desvio e larguras (set_config)
+CONFIGS = {
+    'padrao': {},
+    'compacto': {'backend': 'compacto'},
+    'execute': {'resolucao_desvio': 'execute', 'preditor': '2bits'},
+    'largo': {'largura_issue': 3, 'largura_commit': 2, 'num_cdb': 1, 'tamanho_rob': 10},
+    'compacto_execute_largo': {'backend': 'compacto', 'resolucao_desvio': 'execute', 'preditor': 'gshare',
+                               'largura_issue': 2, 'largura_commit': 2, 'num_ufs': {'MUL': 1}},
+}
+
+
+def programa_aleatorio(semente, n=None, memoria=True):
+    """Programa sem laços (BEQs só para frente) com ALU, desvios e LW/SW sobre
+    poucos endereços, para que loads encontrem stores em voo (memoria=False:
+    sem LW/SW)."""
+    r = random.Random(semente)
+    n = n or r.randint(4, 30)
+    linhas = ["ADD R7, R0, 4"] # Base dos acessos; R7 não é reescrito
+    for i in range(n):
+        x = r.random()
+        if x < 0.15:
+            a, b = r.choice('01234'), r.choice('01234')
+            linhas.append(f"BEQ R{a}, R{b}, {r.randint(len(linhas) + 1, n + 1)}")
+        elif x < 0.3 and memoria:
+            linhas.append(f"SW R{r.randint(0, 6)}, {4 * r.randint(0, 3)}(R{r.choice('07')})")
+        elif x < 0.45 and memoria:
+            linhas.append(f"LW R{r.randint(1, 6)}, {4 * r.randint(0, 3)}(R{r.choice('07')})")
+        else:
+            fonte = r.choice(['R1', 'R2', 'R3', 'R4', 'R5', str(r.randint(-5, 9))])
+            linhas.append(f"{r.choice(OPS_ALU)} R{r.randint(1, 6)}, R{r.randint(0, 6)}, {fonte}")
+    return linhas
+
+
+def latencias_aleatorias(semente):
+    r = random.Random(semente)
+    return {op: r.randint(1, 6) for op in ('ADD', 'SUB', 'MUL', 'DIV', 'BEQ', 'LW', 'SW')}
+
+
+def simulador(linhas, config=None, semente=0, historico=None):
+    sim = SimuladorTomasulo()
+    if historico is not None:
+        sim.history = historico
+    sim.set_config(latencias_aleatorias(semente), {'R1': 3, 'R2': -2, 'R3': 5}, **(config or {}))
+    sim.reset()
+    sim.carregar_instrucoes(linhas)
+    return sim
+
+
+def estado(sim):
+    """Tudo o que a simulação determina (sem os eventos do ciclo), comparável com ==."""
+    return (
+        sim.ciclo, sim.pc, list(sim.regs), list(sim.rat), dict(sim.metricas), dict(sim.memoria),
+        sim.head, sim.tail, sim.itens_no_rob,
+        [(e.busy, e.pronto, e.valor, e.dest, e.tipo, str(e.instrucao), e.previsto) for e in sim.rob],
+        [(rs.nome, rs.busy, rs.op, rs.vj, rs.vk, rs.qj, rs.qk, rs.dest, rs.tempo_restante)
+         for rs in sim.rs_add + sim.rs_mul + sim.rs_mem],
+        [(e.rob, e.load, e.endereco, e.valor, e.iniciado, e.fonte) for e in sim.lsq],
+        sorted(rs.nome for rs in sim.prontas), sorted(rs.nome for rs in sim.executando),
+    )
@@ -0,0 +1,27 @@
+# tests/test_amostragem.py
+import json
+
+import pytest
+
+import tomasulo_engine
+from tomasulo_amostragem import amostrar
+from tomasulo_workloads import gerar
+
+from maquinas import simulador
+
+
+def test_uma_amostra_da_limites_none():
+    r = amostrar(simulador(gerar('laco', iteracoes=20)), intervalo=100, aquecimento=10, janela=1000)
+    assert r['amostras'] == 1
+    assert r['ciclos_ic'][1] is None and r['ipc_ic'] == (0.0, None)
+    assert r['ciclos_ic'][0] == 0.0 and r['ipc'] == 1 / r['cpi']
+
+
+def test_cli_imprime_json_estrito(tmp_path, capsys):
+    caminho = tmp_path / 'laco.s'
+    caminho.write_text("\n".join(gerar('laco', iteracoes=20)) + "\n")
+    tomasulo_engine.main([str(caminho), '--sem-cache', '--amostrar', '100', '--aquecimento', '10',
+                          '--janela', '1000'])
+    saida = capsys.readouterr().out
+    r = json.loads(saida, parse_constant=lambda c: pytest.fail(f"constante não padrão {c}"))
+    assert r['amostras'] == 1 and r['ipc_ic'] == [0.0, None]
@@ -0,0 +1,28 @@
+# tests/test_asm.py
+import pytest
+
+from tomasulo_asm import montar, montar_arquivo
+from tomasulo_program import decodificar_linha
+
+
+@pytest.mark.parametrize('texto, valor', [('16', 16), ('0x10', 16), ('-0x10', -16), ('0b101', 5),
+                                          ('0o17', 15), ('007', 7)])
+def test_imediato_igual_nos_dois_formatos(texto, valor, tmp_path):
+    linhas = [f"ADD R1, R0, {texto}", f"LW R2, {texto}(R0)"]
+    caminho = tmp_path / 'p.s'
+    caminho.write_text("\n".join(linhas + [".data", f".word {texto}"]) + "\n")
+    arquivo = montar_arquivo(caminho, cache=False)
+    for programa in (montar(linhas), arquivo):
+        assert [i.imm for i in programa.instrucoes] == [valor, valor]
+    assert [i.imm for i in (decodificar_linha(l, n, n) for n, l in enumerate(linhas))] == [valor, valor]
+    assert arquivo.memoria == {0: valor}
+
+
+@pytest.mark.parametrize('texto', ['0x', '1.5', 'dez'])
+def test_imediato_invalido_nos_dois_formatos(texto, tmp_path):
+    with pytest.raises(ValueError):
+        montar([f"ADD R1, R0, {texto}"])
+    caminho = tmp_path / 'p.s'
+    caminho.write_text(f".data\n.word {texto}\n")
+    with pytest.raises(ValueError):
+        montar_arquivo(caminho, cache=False)
@@ -0,0 +1,95 @@
+# tests/test_goto_cycle.py
+import random
+from time import perf_counter
+
+from tomasulo_engine import SimuladorTomasulo
+from tomasulo_stats import Instrumentacao
+from tomasulo_workloads import gerar
+
+# Meta de latência do goto do GUI: qualquer ciclo de uma execução de ~100k
+# ciclos em menos de 50 ms, com a configuração do GUI (instrumentação ligada)
+LIMITE_GOTO = 0.050
+LOTE_GUI = 64 # Ciclos por chamada a run() no "Executar" do GUI
+
+
+def _simulador_gui(linhas):
+    sim = SimuladorTomasulo()
+    sim.instrumentacao = Instrumentacao()
+    sim.carregar_instrucoes(linhas)
+    return sim
+
+
+def _executar_como_gui(sim):
+    while not sim.esta_terminado():
+        sim.run(max_cycles=sim.ciclo + LOTE_GUI, checkpoints=True)
+
+
+def _goto(sim, alvo):
+    inicio = perf_counter()
+    ciclo = sim.goto_cycle(alvo)
+    return ciclo, perf_counter() - inicio
+
+
+def test_goto_cycle_latencia_configuracao_gui():
+    sim = _simulador_gui(gerar('laco', iteracoes=2000))
+    _executar_como_gui(sim)
+    fim = sim.ciclo
+    assert fim >= 100_000
+    final = sim.relatorio()
+
+    tempos = {}
+    for alvo in (0, fim, fim // 2, 1, fim - 1, 0, fim):
+        ciclo, tempos[alvo] = _goto(sim, alvo)
+        assert ciclo == alvo
+    r = random.Random(14)
+    for _ in range(200):
+        alvo = r.randrange(fim + 1)
+        ciclo, tempos[alvo] = _goto(sim, alvo)
+        assert ciclo == alvo
+        assert sim.relatorio()['instrumentacao']['ciclos_amostrados'] == alvo
+
+    pior = max(tempos, key=tempos.get)
+    assert tempos[pior] < LIMITE_GOTO, f"goto_cycle({pior}) levou {tempos[pior] * 1000:.1f} ms"
+
+    # Voltar e avançar no tempo não muda o resultado nem as amostras
+    sim.goto_cycle(fim)
+    assert sim.relatorio() == final
+    assert final['instrumentacao']['ciclos_sem_amostra'] == 0
+
+
+def test_voltar_ciclo_latencia_configuracao_gui():
+    sim = _simulador_gui(gerar('laco', iteracoes=2000))
+    _executar_como_gui(sim)
+    fim = sim.ciclo
+    pior = 0.0
+    for _ in range(50):
+        inicio = perf_counter()
+        sim.voltar_ciclo()
+        pior = max(pior, perf_counter() - inicio)
+    assert sim.ciclo == fim - 50
+    assert pior < LIMITE_GOTO, f"voltar_ciclo levou {pior * 1000:.1f} ms"
+
+
+def test_executar_voltar_e_passo_como_gui():
+    """Executar (lotes de run headless) → Voltar → Passo: o passo a passo volta
+    a gerar o log e o journal, e as voltas seguintes saem do journal."""
+    sim = _simulador_gui(gerar('laco', iteracoes=50))
+    for _ in range(5):
+        sim.run(max_cycles=sim.ciclo + LOTE_GUI, checkpoints=True)
+    fim = sim.ciclo
+    assert len(sim.history) == 0
+
+    sim.voltar_ciclo() # Sem journal: checkpoint + re-simulação, que refaz o journal
+    assert sim.ciclo == fim - 1
+    assert len(sim.history) > 0
+    registros = len(sim.history)
+    sim.voltar_ciclo()
+    assert len(sim.history) == registros - 1
+
+    eventos = [ev for _ in range(LOTE_GUI) for ev in sim.executar_ciclo()]
+    assert eventos
+    assert len(sim.history) == registros - 1 + LOTE_GUI
+    for _ in range(3):
+        sim.voltar_ciclo()
+    assert sim.ciclo == fim - 2 + LOTE_GUI - 3
+    assert len(sim.history) == registros - 1 + LOTE_GUI - 3
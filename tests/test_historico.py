@@ -0,0 +1,94 @@
+# tests/test_historico.py
+import random
+
+import pytest
+
+from tomasulo_history import Historico
+from tomasulo_workloads import gerar
+
+from maquinas import CONFIGS, estado, programa_aleatorio, simulador
+
+LIMITE_CICLOS = 500
+
+# (intervalo_checkpoint, limite_registros, limite_checkpoints): o padrão e um
+# histórico apertado, em que o journal é descartado e os checkpoints se diluem
+HISTORICOS = {'padrao': None, 'apertado': (3, 40, 3)}
+
+
+def _passo_a_passo(sim):
+    estados = [estado(sim)]
+    while not sim.esta_terminado() and sim.ciclo < LIMITE_CICLOS:
+        sim.executar_ciclo()
+        estados.append(estado(sim))
+    return estados
+
+
+@pytest.mark.parametrize('historico', HISTORICOS)
+@pytest.mark.parametrize('nome', CONFIGS)
+def test_passo_voltar_e_goto_equivalem_a_run(nome, historico):
+    config, hist = CONFIGS[nome], HISTORICOS[historico]
+    r = random.Random(nome + historico)
+    for semente in range(40):
+        linhas = programa_aleatorio(semente)
+
+        def novo():
+            return simulador(linhas, config, semente, hist and Historico(*hist))
+
+        ref = novo()
+        relatorio = ref.run()
+        assert ref.esta_terminado()
+
+        sim = novo()
+        estados = _passo_a_passo(sim)
+        assert estados[-1] == estado(ref), semente
+        assert sim.relatorio() == relatorio, semente
+
+        # Desfaz tudo, um ciclo por vez
+        while sim.ciclo:
+            sim.voltar_ciclo()
+            assert estado(sim) == estados[sim.ciclo], (semente, sim.ciclo)
+
+        # Saltos aleatórios, intercalados com passos e voltas
+        fim = len(estados) - 1
+        for _ in range(25):
+            modo = r.random()
+            if modo < 0.15:
+                for _ in range(r.randint(1, 10)):
+                    sim.executar_ciclo()
+            elif modo < 0.3:
+                for _ in range(r.randint(1, 5)):
+                    sim.voltar_ciclo()
+            else:
+                alvo = r.randint(0, fim + 3)
+                assert sim.goto_cycle(alvo) == min(alvo, fim), (semente, alvo)
+            assert estado(sim) == estados[sim.ciclo], (semente, sim.ciclo)
+
+        sim.goto_cycle(fim)
+        assert sim.relatorio() == relatorio, semente
+
+
+@pytest.mark.parametrize('nome', CONFIGS)
+def test_goto_depois_de_run(nome):
+    """run() sem histórico seguido de saltos: tudo sai dos checkpoints."""
+    for semente in range(20):
+        linhas = programa_aleatorio(semente, n=60)
+        estados = _passo_a_passo(simulador(linhas, CONFIGS[nome], semente))
+        sim = simulador(linhas, CONFIGS[nome], semente)
+        sim.run(checkpoints=True)
+        r = random.Random(semente)
+        for alvo in [0, *(r.randrange(len(estados)) for _ in range(10)), len(estados) - 1]:
+            sim.goto_cycle(alvo)
+            assert estado(sim) == estados[alvo], (semente, alvo)
+
+
+def test_passo_a_passo_volta_a_gravar_depois_de_run():
+    """Checkpoints do run() headless não desligam eventos nem journal ao serem restaurados."""
+    linhas = gerar('laco', iteracoes=50)
+    for volta in (lambda sim: sim.voltar_ciclo(), lambda sim: sim.goto_cycle(sim.ciclo // 2)):
+        sim = simulador(linhas, semente=3)
+        sim.run(max_cycles=300, checkpoints=True)
+        volta(sim)
+        assert sim.tracing and sim.gravar_historico
+        registros = len(sim.history)
+        assert any([sim.executar_ciclo() for _ in range(5)])
+        assert len(sim.history) == registros + 5
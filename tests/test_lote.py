@@ -0,0 +1,80 @@
+# tests/test_lote.py
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from tomasulo_lote import LIMITE_EXATO, SimuladorLote, configurar, executar_lote
+from tomasulo_workloads import gerar
+
+from maquinas import programa_aleatorio
+
+
+def _configs(semente, n=12):
+    """Configurações dentro do motor em lote (máquina padrão, parâmetros variados)."""
+    r = random.Random(semente)
+    return [{
+        'latencias': {op: r.randint(1, 12) for op in ('ADD', 'SUB', 'MUL', 'DIV', 'BEQ')},
+        'regs': {f'R{i}': r.randint(-3, 9) for i in range(r.randint(0, 8))},
+        'tamanho_rob': r.randint(1, 12),
+        'num_rs': {'ADD': r.randint(1, 4), 'MUL': r.randint(1, 3)},
+        'backend': r.choice(['objetos', 'compacto']),
+    } for _ in range(n)]
+
+
+def _escalar(linhas, config, max_cycles=None):
+    sim = configurar(config)
+    sim.reset()
+    sim.carregar_instrucoes(linhas)
+    return sim.run(max_cycles=max_cycles), list(sim.regs)
+
+
+def _conferir(linhas, configs, max_cycles=None, estrito=True):
+    lote = SimuladorLote(linhas, configs, estrito)
+    resultados = lote.run(max_cycles=max_cycles)
+    for config, r, regs in zip(configs, resultados, lote.regs_finais):
+        assert (r, regs) == _escalar(linhas, config, max_cycles), config
+
+
+def _programas():
+    yield from (programa_aleatorio(semente, memoria=False) for semente in range(40))
+    yield gerar('laco', iteracoes=40, taxa_tomado=0.3)
+    yield gerar('muldiv', n=200)
+    yield gerar('falsas', n=200)
+    yield ["ADD R1, R0, 3", *["MUL R1, R1, R1"] * 8, "DIV R2, R1, 7"] # Passa de LIMITE_EXATO
+
+
+def test_lote_igual_ao_escalar():
+    for semente, linhas in enumerate(_programas()):
+        _conferir(linhas, _configs(semente))
+
+
+def test_lote_igual_ao_escalar_com_max_cycles():
+    r = random.Random(18)
+    for semente, linhas in enumerate(_programas()):
+        _conferir(linhas, _configs(semente, 6), max_cycles=r.randint(1, 80))
+
+
+def test_valores_grandes_terminam_no_escalar():
+    linhas = ["ADD R1, R0, 3", *["MUL R1, R1, R1"] * 8]
+    lote = SimuladorLote(linhas, _configs(0, 3))
+    lote.run()
+    assert all(regs[1] > LIMITE_EXATO for regs in lote.regs_finais)
+
+
+def test_fora_do_lote_estrito_e_fallback():
+    linhas = programa_aleatorio(3, memoria=False)
+    fora = [{'latencias': {}, 'regs': {}, 'resolucao_desvio': 'execute'},
+            {'latencias': {}, 'regs': {}, 'preditor': '2bits'},
+            {'latencias': {}, 'regs': {}, 'largura_issue': 2}]
+    for config in fora:
+        with pytest.raises(ValueError):
+            executar_lote(linhas, [config])
+    _conferir(linhas, _configs(3, 4) + fora, estrito=False)
+
+    # Programa com LW/SW: tudo no motor escalar
+    linhas = programa_aleatorio(5)
+    with pytest.raises(ValueError):
+        executar_lote(linhas, _configs(5, 1))
+    _conferir(linhas, _configs(5, 4), estrito=False)
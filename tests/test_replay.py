@@ -0,0 +1,40 @@
+# tests/test_replay.py
+import json
+
+import pytest
+
+from tomasulo_replay import VERSAO, _CABECALHO, Replay, linhas_exibicao
+from tomasulo_workloads import gerar
+
+from maquinas import CONFIGS, simulador
+
+
+@pytest.mark.parametrize('nome', CONFIGS)
+def test_quadros_iguais_a_simulacao(nome, tmp_path):
+    linhas = gerar('laco', iteracoes=20)
+    caminho = tmp_path / 'r.replay'
+    relatorio = simulador(linhas, CONFIGS[nome]).gravar_replay(caminho)
+
+    ref = simulador(linhas, CONFIGS[nome])
+    replay = Replay(caminho)
+    assert replay.meta['relatorio'] == relatorio
+    assert replay.quadro(0) == (list(linhas_exibicao(ref)), [])
+    while not ref.esta_terminado():
+        eventos = ref.executar_ciclo()
+        tabelas, textos = replay.quadro(ref.ciclo)
+        assert tabelas == list(linhas_exibicao(ref)), ref.ciclo
+        assert [estagio for estagio, _ in textos] == [int(ev.estagio) for ev in eventos], ref.ciclo
+    assert replay.ultimo_ciclo == ref.ciclo
+    replay.fechar()
+
+
+def test_versao_do_indice_diferente_e_recusada(tmp_path):
+    caminho = tmp_path / 'r.replay'
+    simulador(gerar('laco', iteracoes=2)).gravar_replay(caminho)
+    dados = caminho.read_bytes()
+    posicao = _CABECALHO.unpack_from(dados)[3]
+    indice = json.loads(dados[posicao:])
+    indice['versao'] = VERSAO + 1
+    caminho.write_bytes(dados[:posicao] + json.dumps(indice).encode())
+    with pytest.raises(ValueError, match=f'versão {VERSAO + 1}'):
+        Replay(caminho)
@@ -0,0 +1,171 @@
+# tests/test_resultados.py
+import csv
+
+import pytest
+
+import tomasulo_asm
+import tomasulo_resultados
+import tomasulo_sweep
+from tomasulo_engine import SimuladorTomasulo
+from tomasulo_lote import configurar
+from tomasulo_resultados import CacheResultados, cacheavel, chave, executar, versao_motor
+from tomasulo_stats import Instrumentacao
+from tomasulo_workloads import gerar
+
+from maquinas import CONFIGS, programa_aleatorio, simulador
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = CacheResultados(str(tmp_path / 'resultados.sqlite'))
+    yield c
+    c.fechar()
+
+
+@pytest.mark.parametrize('max_cycles', [None, 25])
+@pytest.mark.parametrize('nome', CONFIGS)
+def test_falha_depois_acerto_sem_simular(cache, nome, max_cycles):
+    for semente in range(8):
+        linhas = programa_aleatorio(semente, n=40)
+        ref = simulador(linhas, CONFIGS[nome], semente)
+        esperado = ref.run(max_cycles=max_cycles), list(ref.regs)
+
+        falhas = cache.falhas
+        assert executar(simulador(linhas, CONFIGS[nome], semente), cache, max_cycles) == esperado
+        assert cache.falhas == falhas + 1
+
+        acertos = cache.acertos
+        sim = simulador(linhas, CONFIGS[nome], semente)
+        assert executar(sim, cache, max_cycles) == esperado
+        assert cache.acertos == acertos + 1
+        assert sim.ciclo == 0 and sim.em_estado_inicial() # Nada foi simulado
+
+
+def test_chave_muda_com_programa_configuracao_e_max_cycles():
+    linhas = programa_aleatorio(1)
+    base = chave(simulador(linhas, {}, 1))
+    assert chave(simulador(linhas, {}, 1)) == base
+    variantes = [
+        chave(simulador(programa_aleatorio(2), {}, 1)),
+        chave(simulador(linhas, {}, 2)), # Outras latências
+        chave(simulador(linhas, {}, 1), max_cycles=10),
+        chave(simulador(linhas, {'memoria': {4: 1}}, 1)),
+        chave(simulador([".data", "x: .word 1", ".text", *linhas], {}, 1)),
+    ]
+    variantes += [chave(simulador(linhas, config, 1)) for nome, config in CONFIGS.items() if config]
+    assert len(set(variantes + [base])) == len(variantes) + 1
+
+
+def test_fora_de_cacheavel_simula_sem_consultar(cache):
+    linhas = gerar('laco', iteracoes=10)
+    sim = simulador(linhas)
+    executar(sim, cache)
+    falhas, acertos = cache.falhas, cache.acertos
+
+    instrumentado = simulador(linhas)
+    instrumentado.instrumentacao = Instrumentacao()
+    assert not cacheavel(instrumentado)
+    relatorio, _ = executar(instrumentado, cache)
+    assert 'instrumentacao' in relatorio and instrumentado.ciclo == sim.ciclo
+
+    andou = simulador(linhas)
+    andou.executar_ciclo()
+    assert not cacheavel(andou)
+    executar(andou, cache)
+
+    editado = simulador(linhas)
+    editado.regs[5] = 9
+    assert not cacheavel(editado)
+    assert (cache.falhas, cache.acertos) == (falhas, acertos)
+
+
+def _linha_de_outra_versao(cache, k):
+    with cache._con:
+        cache._con.execute('INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?, ?)',
+                           (k, 'outra' + versao_motor()[5:], b'{"relatorio": {}, "regs": []}', 29, 0))
+
+
+def test_outras_versoes_nao_sao_lidas_e_saem_no_podar(cache):
+    linhas = programa_aleatorio(4)
+    atual = simulador(linhas, {}, 4)
+    executar(atual, cache)
+    k_antiga = chave(simulador(programa_aleatorio(5), {}, 5))
+    _linha_de_outra_versao(cache, k_antiga)
+    assert len(cache) == 2
+
+    assert cache.buscar(k_antiga) is None
+    assert cache.buscar(chave(simulador(linhas, {}, 4))) is not None
+    assert cache.podar() == 1
+    assert len(cache) == 1 and cache.buscar(chave(simulador(linhas, {}, 4))) is not None
+    assert cache.podar() == 0
+
+
+def test_versao_do_motor_muda_a_chave(cache, monkeypatch):
+    sim = simulador(programa_aleatorio(6), {}, 6)
+    executar(sim, cache)
+    monkeypatch.setattr(tomasulo_resultados, '_versao', 'f' * 64) # Outro checkout do motor
+    novo = simulador(programa_aleatorio(6), {}, 6)
+    assert cache.buscar(chave(novo)) is None
+    assert cache.podar() == 1
+    assert len(cache) == 0
+
+
+def test_lru_descarta_os_menos_usados(tmp_path):
+    cache = CacheResultados(str(tmp_path / 'lru.sqlite'), limite_bytes=10 ** 9)
+    try:
+        chaves = []
+        for semente in range(6):
+            sim = simulador(programa_aleatorio(semente), {}, semente)
+            chaves.append(chave(sim))
+            executar(sim, cache)
+        assert cache.buscar(chaves[0]) is not None # Volta a ser o mais recente
+        cache.limite_bytes = cache._total - 1
+        executar(simulador(programa_aleatorio(99), {}, 99), cache)
+        presentes = [k for k in chaves if cache.buscar(k) is not None]
+        assert chaves[0] in presentes and chaves[1] not in presentes
+        assert cache._total <= cache.limite_bytes
+    finally:
+        cache.fechar()
+
+
+@pytest.fixture
+def programa_s(tmp_path, monkeypatch):
+    diretorio = str(tmp_path / 'programas')
+    monkeypatch.setenv('TOMASULO_CACHE', diretorio) # Processos de trabalho da varredura
+    monkeypatch.setattr(tomasulo_asm, 'DIRETORIO_CACHE', diretorio)
+    caminho = tmp_path / 'laco.s'
+    caminho.write_text("\n".join(gerar('laco', iteracoes=20)) + "\n")
+    return str(caminho)
+
+
+def test_chave_da_varredura_igual_a_do_simulador(programa_s):
+    molde = SimuladorTomasulo()
+    for config in tomasulo_sweep.grade([programa_s], tamanho_rob=[4, 8], lat_MUL=[3, 9], rs_add=[2],
+                                       preditor=['nao_tomado', 'gshare'], resolucao_desvio=['commit', 'execute'],
+                                       uf_mul=[0, 1], num_cdb=[0, 2]):
+        sim = configurar(tomasulo_sweep._maquina(config))
+        sim.reset()
+        sim.carregar_arquivo(programa_s)
+        assert tomasulo_sweep._chave_resultado(config, molde, None) == chave(sim), config
+        assert tomasulo_sweep._chave_resultado(config, molde, 50) == chave(sim, 50), config
+
+
+def _ler_csv(caminho):
+    with open(caminho, newline='') as f:
+        return sorted(map(sorted, (linha.items() for linha in csv.DictReader(f))))
+
+
+def test_varredura_repetida_sai_do_cache(programa_s, tmp_path, cache, monkeypatch):
+    configs = list(tomasulo_sweep.grade([programa_s], tamanho_rob=[4, 8], lat_MUL=[3, 9],
+                                        resolucao_desvio=['commit', 'execute']))
+    primeira = str(tmp_path / 'a.csv')
+    assert tomasulo_sweep.varrer(configs, primeira, processos=1, cache=cache) == len(configs)
+    assert len(cache) == len(configs)
+
+    def sem_processos(*args, **kwargs):
+        raise AssertionError("acerto do cache não deveria simular")
+
+    monkeypatch.setattr(tomasulo_sweep, 'ProcessPoolExecutor', sem_processos)
+    segunda = str(tmp_path / 'b.csv')
+    assert tomasulo_sweep.varrer(configs, segunda, processos=1, cache=cache, lote=4) == len(configs)
+    assert _ler_csv(segunda) == _ler_csv(primeira)
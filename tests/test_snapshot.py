@@ -0,0 +1,157 @@
+# tests/test_snapshot.py
+import json
+import zlib
+
+import pytest
+
+import tomasulo_snapshot
+from tomasulo_asm import TAMANHO_REGISTRO
+from tomasulo_engine import SimuladorTomasulo
+from tomasulo_snapshot import VERSAO, _CABECALHO
+from tomasulo_workloads import gerar
+
+from maquinas import CONFIGS, estado, programa_aleatorio, simulador
+
+
+def _gravar(dados, caminho):
+    caminho.write_bytes(bytes(dados))
+    return caminho
+
+
+def _regravar_estado(original, mudar, caminho):
+    """Cópia do snapshot com o estado JSON alterado por mudar(dict) e o crc recalculado."""
+    mag, versao, reservado, _, ciclo, n = _CABECALHO.unpack_from(original)
+    fim_programa = _CABECALHO.size + n * TAMANHO_REGISTRO
+    d = json.loads(zlib.decompress(original[fim_programa:]))
+    mudar(d)
+    corpo = original[_CABECALHO.size:fim_programa] + zlib.compress(json.dumps(d).encode())
+    cabecalho = _CABECALHO.pack(mag, versao, reservado, zlib.crc32(corpo), ciclo, n)
+    return _gravar(cabecalho + corpo, caminho)
+
+
+@pytest.mark.parametrize('nome', CONFIGS)
+def test_ida_e_volta_continua_igual(nome, tmp_path):
+    config = CONFIGS[nome]
+    for semente in range(15):
+        linhas = programa_aleatorio(semente, n=50) if semente % 3 else gerar('laco', iteracoes=15)
+        ref = simulador(linhas, config, semente)
+        relatorio = ref.run()
+        for corte in (1, ref.ciclo // 3, ref.ciclo // 2, ref.ciclo - 1):
+            sim = simulador(linhas, config, semente)
+            while sim.ciclo < corte:
+                sim.executar_ciclo()
+            caminho = tmp_path / f'{semente}_{corte}.snap'
+            sim.save_snapshot(caminho)
+
+            novo = SimuladorTomasulo() # Configuração padrão: tudo vem do arquivo
+            novo.load_snapshot(caminho)
+            assert estado(novo) == estado(sim), (semente, corte)
+            if corte % 2:
+                while not novo.esta_terminado():
+                    novo.executar_ciclo()
+            else:
+                novo.run()
+            assert estado(novo) == estado(ref), (semente, corte)
+            assert novo.relatorio() == relatorio, (semente, corte)
+
+
+def test_preditor_e_btb_voltam(tmp_path):
+    sim = simulador(gerar('laco', iteracoes=60, taxa_tomado=0.8), {'preditor': 'torneio'})
+    sim.run(max_cycles=1500)
+    sim.save_snapshot(tmp_path / 'p.snap')
+    novo = SimuladorTomasulo()
+    novo.load_snapshot(tmp_path / 'p.snap')
+    assert vars(novo.btb) == vars(sim.btb)
+    assert novo.run() == sim.run()
+
+
+def _snapshot_e_alvo(tmp_path):
+    sim = simulador(gerar('memoria', n=60), CONFIGS['compacto_execute_largo'])
+    sim.run(max_cycles=40)
+    caminho = tmp_path / 'ok.snap'
+    sim.save_snapshot(caminho)
+    alvo = simulador(programa_aleatorio(2), {}, 2)
+    alvo.run(max_cycles=10)
+    return caminho.read_bytes(), alvo
+
+
+def _corrupcoes(original, tmp_path):
+    """(descrição, arquivo) de snapshots que carregar() tem de recusar."""
+    yield 'mágico', _gravar(b'XXXXXXXX' + original[8:], tmp_path / 'magico.snap')
+    yield 'vazio', _gravar(b'', tmp_path / 'vazio.snap')
+    mag, versao, reservado, crc, ciclo, n = _CABECALHO.unpack_from(original)
+    outra = _CABECALHO.pack(mag, VERSAO + 1, reservado, crc, ciclo, n)
+    yield 'versão', _gravar(outra + original[_CABECALHO.size:], tmp_path / 'versao.snap')
+    mexido = bytearray(original)
+    mexido[-3] ^= 0xFF
+    yield 'crc', _gravar(mexido, tmp_path / 'crc.snap')
+    yield 'truncado', _gravar(original[:len(original) - 5], tmp_path / 'truncado.snap')
+    grande = _CABECALHO.pack(mag, versao, reservado, crc, ciclo, n + 10 ** 6)
+    yield 'instruções', _gravar(grande + original[_CABECALHO.size:], tmp_path / 'n.snap')
+
+    corpo = original[_CABECALHO.size:_CABECALHO.size + n * TAMANHO_REGISTRO] + b'nao e zlib'
+    cabecalho = _CABECALHO.pack(mag, versao, reservado, zlib.crc32(corpo), ciclo, n)
+    yield 'zlib', _gravar(cabecalho + corpo, tmp_path / 'zlib.snap')
+
+    def mudanca(campo, valor):
+        def mudar(d):
+            alvo = d
+            *caminho, ultimo = campo
+            for parte in caminho:
+                alvo = alvo[parte]
+            if valor is KeyError:
+                del alvo[ultimo]
+            else:
+                alvo[ultimo] = valor
+        return mudar
+
+    for i, (campo, valor) in enumerate([
+        (('head',), 999),
+        (('head',), -1),
+        (('regs',), [0] * 3),
+        (('regs',), ['a'] * 32),
+        (('rat',), [10 ** 6] * 32),
+        (('pc',), 'x'),
+        (('metricas',), KeyError),
+        (('rob', 0, 4), 10 ** 9), # instrucao fora do programa
+        (('rs',), []),
+        (('config', 'backend'), 'outro'),
+        (('config', 'tamanho_rob'), 0),
+        (('config', 'tamanho_preditor'), 1 << 40),
+        (('conclusoes',), [[1, 999]]),
+        (('prontas',), [999]),
+        (('lsq',), [[0, True, None, None, False, None]] * 100),
+        (('preditor',), {'tabela': 'x'}),
+    ]):
+        yield f"{'.'.join(map(str, campo))}={valor!r:.20}", _regravar_estado(
+            original, mudanca(campo, valor), tmp_path / f'campo{i}.snap')
+
+
+def test_snapshot_invalido_da_valueerror_sem_mudar_o_simulador(tmp_path):
+    original, alvo = _snapshot_e_alvo(tmp_path)
+    antes = estado(alvo)
+    for descricao, caminho in _corrupcoes(original, tmp_path):
+        with pytest.raises(ValueError):
+            alvo.load_snapshot(caminho)
+            pytest.fail(f"aceitou snapshot com {descricao}")
+        assert estado(alvo) == antes, descricao
+
+    # O simulador continua utilizável e igual a um que nunca tentou carregar
+    ref = simulador(programa_aleatorio(2), {}, 2)
+    assert alvo.run() == ref.run()
+    assert estado(alvo) == estado(ref)
+
+
+def test_json_alterado_com_crc_certo_e_lido(tmp_path):
+    """A validação confere os valores, não só o crc: uma alteração válida passa."""
+    original, alvo = _snapshot_e_alvo(tmp_path)
+    caminho = _regravar_estado(original, lambda d: d['regs'].__setitem__(9, 123), tmp_path / 'r9.snap')
+    alvo.load_snapshot(caminho)
+    assert alvo.regs[9] == 123
+
+
+def test_versao_errada_diz_a_versao(tmp_path):
+    original, alvo = _snapshot_e_alvo(tmp_path)
+    caminho = dict(_corrupcoes(original, tmp_path))['versão']
+    with pytest.raises(ValueError, match=f'versão {VERSAO + 1}'):
+        tomasulo_snapshot.carregar(alvo, caminho)
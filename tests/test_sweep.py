@@ -0,0 +1,47 @@
+# tests/test_sweep.py
+import csv
+
+import pytest
+
+import tomasulo_asm
+import tomasulo_sweep
+from tomasulo_workloads import gerar
+
+
+@pytest.fixture
+def programa_s(tmp_path, monkeypatch):
+    diretorio = str(tmp_path / 'programas')
+    monkeypatch.setenv('TOMASULO_CACHE', diretorio) # Processos de trabalho da varredura
+    monkeypatch.setattr(tomasulo_asm, 'DIRETORIO_CACHE', diretorio)
+    caminho = tmp_path / 'p.s'
+    caminho.write_text("\n".join(gerar('laco', iteracoes=10)) + "\n")
+    return str(caminho)
+
+
+def _linhas(caminho):
+    with open(caminho, newline='') as f:
+        return [sorted(linha.items()) for linha in csv.DictReader(f)]
+
+
+@pytest.mark.parametrize('fragmento', [0, 1, 7, -1])
+def test_retomar_depois_de_interrupcao(programa_s, tmp_path, fragmento):
+    """Retomada com a última linha cortada (fragmento: caracteres que sobraram
+    dela; -1 = só falta o '\\n'): cada configuração sai uma vez, com o mesmo resultado."""
+    configs = list(tomasulo_sweep.grade([programa_s], rs_add=[2, 5], rs_mul=[1, 2], tamanho_rob=[2, 4, 8]))
+    completa = str(tmp_path / 'completa.csv')
+    assert tomasulo_sweep.varrer(configs, completa, processos=1) == len(configs)
+    esperado = _linhas(completa)
+    assert len(esperado) == len(configs)
+
+    with open(completa, newline='') as f:
+        linhas = f.read().splitlines(keepends=True)
+    corte = linhas[5].rstrip('\r\n') if fragmento < 0 else linhas[5][:fragmento]
+    interrompida = tmp_path / 'interrompida.csv'
+    interrompida.write_text(''.join(linhas[:5]) + corte, newline='')
+
+    restantes = len(configs) - 4
+    assert tomasulo_sweep.varrer(configs, str(interrompida), processos=1) == restantes
+    assert sorted(_linhas(interrompida)) == sorted(esperado)
+    # Uma nova retomada não tem nada a fazer
+    assert tomasulo_sweep.varrer(configs, str(interrompida), processos=1) == 0
+    assert sorted(_linhas(interrompida)) == sorted(esperado)
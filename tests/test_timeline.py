@@ -0,0 +1,102 @@
+# tests/test_timeline.py
+import json
+
+import pytest
+
+from tomasulo_engine import SimuladorTomasulo
+from tomasulo_timeline import DESCARTADA, MISPREDICT, LinhaDoTempo, caminho_critico, diagrama, exportar_chrome_trace
+
+LATENCIAS = {'ADD': 2, 'SUB': 2, 'MUL': 4, 'DIV': 8, 'BEQ': 1, 'LW': 2, 'SW': 2}
+
+# Cadeia RAW: ADD (2) -> MUL (4) -> ADD (2) -> ADD (2)
+CADEIA = ["ADD R1, R0, 1", "MUL R2, R1, 3", "ADD R3, R2, 1", "ADD R4, R3, 1"]
+# BEQ tomado (previsto não tomado) que espera o MUL: os ADDs do caminho errado
+# já foram emitidos quando ele resolve, e o alvo é emitido de novo
+DESVIO = ["ADD R1, R0, 1", "MUL R2, R1, 3", "BEQ R2, R2, 5", "ADD R4, R0, 1", "ADD R5, R0, 1", "ADD R6, R2, 1"]
+
+
+def _executar(linhas, **config):
+    sim = SimuladorTomasulo()
+    sim.set_config(LATENCIAS, {}, **config)
+    sim.reset()
+    sim.linha_do_tempo = LinhaDoTempo()
+    sim.carregar_instrucoes(linhas)
+    while not sim.esta_terminado():
+        sim.executar_ciclo()
+    return sim
+
+
+def test_cadeia_raw():
+    sim = _executar(CADEIA)
+    lt = sim.linha_do_tempo
+    assert [(r.emissao, r.inicio, r.fim, r.escrita, r.commit) for r in lt] == [
+        (1, 2, 3, 4, 5), (2, 4, 7, 8, 9), (3, 8, 9, 10, 11), (4, 10, 11, 12, 13)]
+    assert [(r.prod_j, r.prod_k) for r in lt] == [(-1, -1), (0, -1), (1, -1), (2, -1)]
+
+    cc = caminho_critico(lt, sim.ciclo)
+    assert cc['total'] == sim.ciclo == 13
+    assert sum(cc['categorias'].values()) == cc['total']
+    assert cc['categorias']['dependencia'] == 2 + 4 + 2
+    assert cc['categorias']['flush'] == 0
+
+    assert diagrama(lt, sim.prog_original).splitlines() == [
+        "                    1234567890123",
+        "    0 ADD R1, R0, 1 IEEWC",
+        "    1 MUL R2, R1, 3  I-EEEEWC",
+        "    2 ADD R3, R2, 1   I----EEWC",
+        "    3 ADD R4, R3, 1    I-----EEWC",
+    ]
+
+
+@pytest.mark.parametrize('resolucao, ciclos, flush, diagrama_esperado', [
+    ('commit', 14, 7, [
+        "    2 BEQ R2, R2, 5   I----EWC",
+        "    3 ADD R4, R0, 1    IEEW..X",
+        "    4 ADD R5, R0, 1     IEEW.X",
+        "    5 ADD R6, R2, 1       IEEX",
+        "    6 ADD R6, R2, 1          IEEWC",
+    ]),
+    ('execute', 13, 6, [  # Squash na resolução do BEQ, antes do commit
+        "    2 BEQ R2, R2, 5   I----EWC",
+        "    3 ADD R4, R0, 1    IEEW.X",
+        "    4 ADD R5, R0, 1     IEEWX",
+        "    5 ADD R6, R2, 1       IEX",
+        "    6 ADD R6, R2, 1         IEEWC",
+    ]),
+])
+def test_desvio_mal_previsto(resolucao, ciclos, flush, diagrama_esperado):
+    sim = _executar(DESVIO, resolucao_desvio=resolucao)
+    lt = sim.linha_do_tempo
+    assert [r.flags for r in lt] == [0, 0, MISPREDICT, DESCARTADA, DESCARTADA, DESCARTADA, 0]
+    assert [r.pc for r in lt] == [0, 1, 2, 3, 4, 5, 5]
+
+    cc = caminho_critico(lt, sim.ciclo)
+    assert cc['total'] == sim.ciclo == ciclos
+    assert sum(cc['categorias'].values()) == cc['total']
+    assert cc['categorias']['flush'] == flush
+    assert cc['categorias']['dependencia'] == 0 # O alvo reemitido já encontra R2 no banco
+    assert diagrama(lt, sim.prog_original).splitlines()[3:] == diagrama_esperado
+
+
+@pytest.mark.parametrize('linhas, config', [(CADEIA, {}), (DESVIO, {}), (DESVIO, {'resolucao_desvio': 'execute'})])
+def test_chrome_trace(linhas, config, tmp_path):
+    sim = _executar(linhas, **config)
+    lt = sim.linha_do_tempo
+    caminho = tmp_path / 'trace.json'
+    exportar_chrome_trace(lt, sim.prog_original, str(caminho))
+    eventos = json.loads(caminho.read_text())['traceEvents']
+    assert eventos and all(ev['ph'] == 'X' and ev['dur'] > 0 for ev in eventos)
+
+    fatias = {}
+    for ev in eventos:
+        fatias.setdefault(ev['args']['seq'], []).append(ev)
+    aposentadas = [r for r in lt if not r.flags & DESCARTADA]
+    assert len(aposentadas) == sim.instrucoes_retiradas()
+    for r in aposentadas:
+        # As fases cobrem a vida da instrução, do issue ao commit, sem buracos
+        fases = sorted(fatias[r.seq], key=lambda ev: ev['ts'])
+        assert fases[0]['ts'] == r.emissao and fases[-1]['ts'] + fases[-1]['dur'] == r.commit
+        assert all(a['ts'] + a['dur'] == b['ts'] for a, b in zip(fases, fases[1:]))
+        assert all(ev['tid'] == r.rob and ev['name'] == str(sim.prog_original[r.pc]) for ev in fases)
+    descartadas = [r.seq for r in lt if r.flags & DESCARTADA]
+    assert all(fatias[s][0]['args']['descartada'] for s in descartadas)
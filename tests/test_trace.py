@@ -0,0 +1,81 @@
+# tests/test_trace.py
+import pytest
+
+from tomasulo_trace import Estagio, SinkBinario, SinkJSONL, SinkLista, ler_binario, ler_jsonl
+
+from maquinas import CONFIGS, programa_aleatorio, simulador
+
+# Valores grandes (e negativos) no CDB e um BEQ mal previsto (FLUSH/SQUASH)
+PROGRAMA_GRANDES = [
+    "ADD R1, R0, 1099511627776",  # 2**40
+    "MUL R2, R1, R1",
+    "MUL R3, R2, R2",
+    "SUB R4, R0, R3",
+    "BEQ R0, R0, 6",
+    "ADD R5, R5, 1",
+    "ADD R6, R4, R4",
+]
+
+
+class _Varios:
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def emitir(self, ev):
+        for s in self.sinks:
+            s.emitir(ev)
+
+    def fechar(self):
+        for s in self.sinks:
+            s.fechar()
+
+
+def _gravar(sim, tmp_path):
+    """Passo a passo com voltas (delta de ciclo negativo) gravando nos três sinks."""
+    lista = SinkLista()
+    bin_, jsonl = str(tmp_path / 't.bin'), str(tmp_path / 't.jsonl')
+    sim.sink = _Varios(lista, SinkBinario(bin_, buffer=64), SinkJSONL(jsonl))
+    passos = 0
+    while not sim.esta_terminado():
+        sim.executar_ciclo()
+        passos += 1
+        if passos % 7 == 0:
+            for _ in range(3):
+                sim.voltar_ciclo()
+    sim.sink.fechar()
+    return lista.eventos, bin_, jsonl
+
+
+@pytest.mark.parametrize('nome', CONFIGS)
+def test_ida_e_volta_nos_dois_formatos(nome, tmp_path):
+    for semente, linhas in [(0, PROGRAMA_GRANDES), *((s, programa_aleatorio(s, n=40)) for s in range(1, 6))]:
+        emitidos, bin_, jsonl = _gravar(simulador(linhas, CONFIGS[nome], semente), tmp_path)
+        ciclos = [ev.ciclo for ev in emitidos]
+        assert any(b < a for a, b in zip(ciclos, ciclos[1:])) # Houve voltar_ciclo
+        assert list(ler_binario(bin_)) == emitidos
+        assert list(ler_jsonl(jsonl)) == emitidos
+
+
+def test_campos_none_valores_grandes_e_rs_repetidas(tmp_path):
+    emitidos, bin_, _ = _gravar(simulador(PROGRAMA_GRANDES), tmp_path)
+    lidos = list(ler_binario(bin_))
+    assert lidos == emitidos
+    assert any(ev.estagio == Estagio.PC and ev.rob is None and ev.rs is None for ev in lidos)
+    assert -(2 ** 160) in {ev.valor for ev in lidos}
+    nomes = [ev.rs for ev in lidos if ev.rs is not None]
+    assert len(nomes) > len(set(nomes))
+
+
+def test_binario_truncado_da_erro_claro(tmp_path):
+    _, bin_, _ = _gravar(simulador(PROGRAMA_GRANDES), tmp_path)
+    with open(bin_, 'rb') as f:
+        dados = f.read()
+    for corte in (1, 3):
+        truncado = tmp_path / f'truncado{corte}.bin'
+        truncado.write_bytes(dados[:-corte])
+        with pytest.raises(ValueError, match='truncado'):
+            list(ler_binario(str(truncado)))
+    cabecalho = tmp_path / 'cabecalho.bin'
+    cabecalho.write_bytes(dados[:3])
+    with pytest.raises(ValueError, match='não é um trace'):
+        list(ler_binario(str(cabecalho)))
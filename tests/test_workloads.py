@@ -0,0 +1,25 @@
+# tests/test_workloads.py
+import pytest
+
+from tomasulo_program import Op
+from tomasulo_workloads import CARGAS, gerar
+
+from maquinas import simulador
+
+PARAMETROS = {'laco': {'iteracoes': 30}}
+
+
+@pytest.mark.parametrize('tipo', CARGAS)
+def test_resultado_nao_depende_de_regs_iniciais(tipo):
+    """Os geradores inicializam tudo o que leem: as baselines do benchmark não
+    dependem do banco de registradores padrão."""
+    linhas = gerar(tipo, **PARAMETROS.get(tipo, {'n': 200}))
+    resultados = []
+    for regs in ({}, {f'R{i}': 7 * i + 3 for i in range(1, 32)}):
+        sim = simulador(linhas)
+        sim.set_config({}, regs)
+        sim.reset()
+        sim.carregar_instrucoes(linhas)
+        escritos = sorted({i.rd for i in sim.prog_original if i.codigo not in (Op.BEQ, Op.SW)})
+        resultados.append((sim.run(), [sim.regs[r] for r in escritos]))
+    assert resultados[0] == resultados[1]
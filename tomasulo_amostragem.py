@@ -0,0 +1,84 @@
+# tomasulo_amostragem.py
+import math
+from statistics import NormalDist, fmean, stdev
+
+# Simulação por amostragem: em vez de passar o programa inteiro pelo modelo de
+# tempo, cada período de `intervalo` instruções dinâmicas começa com uma janela
+# detalhada (SimuladorTomasulo.run) e segue em modo funcional
+# (avancar_funcional), que só executa a semântica da ISA e aquece preditor e
+# BTB. A janela detalhada parte do pipeline vazio: as `aquecimento` primeiras
+# instruções enchem ROB e estações e não entram na medida; as `janela`
+# seguintes dão uma amostra de CPI. A média das amostras, vezes o total de
+# instruções executadas, estima os ciclos do programa inteiro, com intervalo
+# de confiança pela aproximação normal do erro padrão da média.
+#
+# As contas usam instruções dinâmicas (as que o modo funcional conta). Na
+# resolução no commit, o BEQ mal previsto sai do ROB pelo flush e não entra em
+# metricas['commits']; sim.instrucoes_retiradas() o soma de volta. Por isso o
+# 'ipc' estimado é instruções dinâmicas por ciclo, um pouco acima do ipc do
+# relatorio() quando há mispredicts.
+
+
+def amostrar(sim, intervalo=100_000, aquecimento=2_000, janela=10_000, confianca=0.95):
+    """Roda o programa carregado em sim até o fim, alternando janelas detalhadas e
+    avanço funcional, e devolve a estimativa (ver _estimativa).
+
+    sim deve estar no início do programa (reset + carregar_*). Com
+    intervalo <= aquecimento + janela não há avanço funcional e tudo é
+    simulado em detalhe. Uma janela cortada pelo fim do programa (que
+    inclui o esvaziamento do pipeline) só conta se for a única.
+    """
+    if aquecimento < 0 or janela < 1:
+        raise ValueError("aquecimento deve ser >= 0 e janela >= 1")
+    if not 0 < confianca < 1:
+        raise ValueError("confianca deve estar entre 0 e 1")
+    avanco = intervalo - aquecimento - janela
+    cpis = []
+    instrucoes = detalhadas = 0
+    while not sim.esta_terminado():
+        inicio = sim.instrucoes_retiradas()
+        sim.run(max_commits=sim.metricas['commits'] + aquecimento)
+        ciclo, medidas = sim.ciclo, sim.instrucoes_retiradas()
+        sim.run(max_commits=sim.metricas['commits'] + janela)
+        retiradas = sim.instrucoes_retiradas() - medidas
+        if retiradas >= janela or (retiradas and not cpis and sim.esta_terminado()):
+            cpis.append((sim.ciclo - ciclo) / retiradas)
+        detalhadas += sim.instrucoes_retiradas() - inicio
+        instrucoes += sim.instrucoes_retiradas() - inicio
+        if avanco > 0 and not sim.esta_terminado():
+            instrucoes += sim.avancar_funcional(avanco)
+    return _estimativa(cpis, instrucoes, detalhadas, confianca)
+
+
+def _estimativa(cpis, instrucoes, detalhadas, confianca):
+    """ciclos/ipc estimados, com (mínimo, máximo) do intervalo de confiança.
+
+    Um limite que não existe (uma amostra só não dá variância) é None, e não
+    math.inf, para que o resultado continue sendo JSON válido.
+    """
+    if not cpis:
+        raise ValueError("Nenhuma amostra: o programa terminou antes da primeira janela de medida")
+    cpi = fmean(cpis)
+    if len(cpis) > 1:
+        erro = NormalDist().inv_cdf((1 + confianca) / 2) * stdev(cpis) / math.sqrt(len(cpis))
+        cpi_min, cpi_max = max(cpi - erro, 0.0), cpi + erro
+    else:
+        cpi_min, cpi_max = 0.0, None
+    return {
+        'instrucoes': instrucoes,
+        'instrucoes_detalhadas': detalhadas,
+        'amostras': len(cpis),
+        'confianca': confianca,
+        'cpi': cpi,
+        'ciclos_estimados': cpi * instrucoes,
+        'ciclos_ic': (cpi_min * instrucoes, None if cpi_max is None else cpi_max * instrucoes),
+        'ipc': _inverso(cpi),
+        'ipc_ic': (_inverso(cpi_max), _inverso(cpi_min)),
+    }
+
+
+def _inverso(cpi):
+    """1 / cpi: None (sem limite) para cpi 0 e 0.0 para cpi sem limite (None)."""
+    if cpi is None:
+        return 0.0
+    return 1 / cpi if cpi else None
@@ -0,0 +1,279 @@
+# tomasulo_asm.py
+
+# Montador de programas em arquivo (.s). Além do formato de carregar_instrucoes
+# (uma instrução por linha, BEQ com o índice do alvo), aceita:
+#   - comentários com '#' ou ';' até o fim da linha;
+#   - rótulos `nome:` sozinhos ou antes de uma instrução, usados como alvo de
+#     BEQ e como imediato/deslocamento (`LW R1, vetor(R0)`);
+#   - diretivas .text, .data, .org ENDERECO, .word V1, V2, ... (palavras de 4
+#     bytes) e .space BYTES na seção de dados.
+# Números (imediatos, deslocamentos e diretivas) são lidos por ler_inteiro,
+# o mesmo de carregar_instrucoes: decimal, 0x, 0o ou 0b.
+#
+# montar_arquivo guarda o programa decodificado num cache em disco chaveado
+# pelo hash do conteúdo, em registros binários de tamanho fixo. O programa
+# devolvido lê esse arquivo via mmap e decodifica blocos de instruções sob
+# demanda, então nem a montagem nem a simulação materializam o programa
+# inteiro como objetos Python.
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+from collections import OrderedDict, namedtuple
+from tomasulo_program import Instrucao, Op, decodificar_linha, ler_inteiro
+
+Programa = namedtuple('Programa', 'instrucoes memoria rotulos')
+Programa.__doc__ = """Programa montado: instrucoes indexadas pelo PC (tupla ou ProgramaMapeado),
+memoria inicial do .data (endereço -> valor) e rotulos (nome -> índice/endereço)."""
+
+TAMANHO_PALAVRA = 4
+DIRETORIO_CACHE = os.environ.get('TOMASULO_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'tomasulo'))
+
+_ROTULO = re.compile(r'^\s*([A-Za-z_]\w*)\s*:')
+_MAGICO = b'TOMASM\x00\x01' # Muda junto com o formato dos registros
+_CABECALHO = struct.Struct('<8sQ') # mágico, tamanho do JSON (n, memoria, rotulos)
+_REGISTRO = struct.Struct('<BbbbqI') # codigo, rd, rs1, rs2 (-1 = imediato), imm, linha do fonte
+TAMANHO_REGISTRO = _REGISTRO.size
+_ALINHAMENTO = 16
+_BLOCO = 4096 # Instruções decodificadas por vez no ProgramaMapeado
+_BLOCOS_EM_MEMORIA = 8
+_BLOCO_LEITURA = 1 << 20
+
+
+def _itens(linhas):
+    """Percorre o fonte: (id, rótulos definidos na linha, resto sem comentário)."""
+    for id, txt in enumerate(linhas):
+        for marca in '#;':
+            if marca in txt:
+                txt = txt[:txt.index(marca)]
+        nomes = []
+        while ':' in txt:
+            m = _ROTULO.match(txt)
+            if m is None:
+                break
+            nomes.append(m.group(1))
+            txt = txt[m.end():]
+        yield id, nomes, txt.strip()
+
+
+def _inteiro(txt, id, rotulos=None):
+    try:
+        return ler_inteiro(txt, rotulos)
+    except ValueError:
+        raise ValueError(f"Linha {id}: valor inválido '{txt}'") from None
+
+
+def _percorrer(linhas, rotulos, emitir=None, memoria=None):
+    """Uma passada do montador.
+
+    Sem emitir, só define os rótulos (primeira passada). Com emitir, decodifica
+    cada instrução e chama emitir(instr); as palavras do .data vão para memoria.
+    Devolve o número de instruções.
+    """
+    secao, pc, endereco = '.text', 0, 0
+    for id, nomes, corpo in _itens(linhas):
+        if emitir is None:
+            for nome in nomes:
+                if nome in rotulos:
+                    raise ValueError(f"Linha {id}: rótulo '{nome}' redefinido")
+                rotulos[nome] = pc if secao == '.text' else endereco
+        if not corpo:
+            continue
+        if not corpo.startswith('.'):
+            if secao != '.text':
+                raise ValueError(f"Linha {id}: instrução fora da seção .text")
+            if emitir is not None:
+                emitir(decodificar_linha(corpo, id, pc, rotulos))
+            pc += 1
+            continue
+        diretiva, *resto = corpo.split(None, 1)
+        args = [a.strip() for a in resto[0].split(',')] if resto else []
+        if diretiva in ('.text', '.data'):
+            secao = diretiva
+        elif secao != '.data' or diretiva not in ('.org', '.word', '.space'):
+            raise ValueError(f"Linha {id}: diretiva '{diretiva}' não suportada aqui")
+        elif diretiva == '.word':
+            for a in args:
+                if memoria is not None:
+                    memoria[endereco] = _inteiro(a, id, rotulos)
+                endereco += TAMANHO_PALAVRA
+        elif len(args) != 1:
+            raise ValueError(f"Linha {id}: {diretiva} espera um argumento")
+        elif diretiva == '.org':
+            endereco = _inteiro(args[0], id)
+        else:
+            endereco += _inteiro(args[0], id)
+    return pc
+
+
+def montar(linhas):
+    """Monta uma lista de linhas em memória (ValueError em erros de sintaxe)."""
+    rotulos, memoria, instrucoes = {}, {}, []
+    _percorrer(linhas, rotulos)
+    _percorrer(linhas, rotulos, instrucoes.append, memoria)
+    return Programa(tuple(instrucoes), memoria, rotulos)
+
+
+def _linhas_arquivo(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        for txt in f:
+            yield txt.rstrip('\n')
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256(_MAGICO)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(_BLOCO_LEITURA), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def empacotar(instr):
+    """Registro binário de tamanho fixo de uma Instrucao (lido de volta pelo ProgramaMapeado)."""
+    try:
+        return _REGISTRO.pack(instr.codigo, instr.rd, instr.rs1, -1 if instr.rs2 is None else instr.rs2,
+                              instr.imm or 0, instr.id)
+    except struct.error:
+        raise ValueError(f"Linha {instr.id}: imediato fora do intervalo de 64 bits") from None
+
+
+def _zerar_linhas(registros):
+    """Apaga a linha do fonte (últimos 4 bytes) de cada registro, in-place."""
+    n = len(registros) // _REGISTRO.size
+    for i in range(_REGISTRO.size - 4, _REGISTRO.size):
+        registros[i::_REGISTRO.size] = bytes(n)
+
+
+def hash_programa(instrucoes, memoria=None):
+    """sha256 canônico de um programa decodificado: os registros de empacotar
+    sem a linha do fonte, mais a memória inicial. Comentários, rótulos e
+    formatação não mudam o hash, e tupla e ProgramaMapeado do mesmo programa
+    dão o mesmo valor."""
+    h = hashlib.sha256(_MAGICO)
+    h.update(len(instrucoes).to_bytes(8, 'little'))
+    if isinstance(instrucoes, ProgramaMapeado):
+        # Direto dos registros no mmap, sem decodificar as instruções
+        passo = _BLOCO_LEITURA // _REGISTRO.size
+        for inicio in range(0, len(instrucoes), passo):
+            fim = min(inicio + passo, len(instrucoes))
+            bloco = bytearray(instrucoes._mm[instrucoes._inicio + inicio * _REGISTRO.size:
+                                             instrucoes._inicio + fim * _REGISTRO.size])
+            _zerar_linhas(bloco)
+            h.update(bloco)
+    else:
+        bloco = bytearray(b''.join(map(empacotar, instrucoes)))
+        _zerar_linhas(bloco)
+        h.update(bloco)
+    h.update(json.dumps(sorted((memoria or {}).items())).encode())
+    return h.hexdigest()
+
+
+def _compilar(caminho, f):
+    """Monta o arquivo em duas passadas de streaming, gravando os registros em f."""
+    rotulos, memoria = {}, {}
+    n = _percorrer(_linhas_arquivo(caminho), rotulos)
+    # A memória só é conhecida na segunda passada: os metadados vão depois dos
+    # registros e o cabeçalho (reservado no início) guarda o tamanho deles
+    buffer = bytearray()
+    def emitir(instr):
+        buffer.extend(empacotar(instr))
+        if len(buffer) >= _BLOCO_LEITURA:
+            f.write(buffer)
+            buffer.clear()
+    f.write(bytes(_ALINHAMENTO))
+    _percorrer(_linhas_arquivo(caminho), rotulos, emitir, memoria)
+    f.write(buffer)
+    cabecalho = json.dumps({'n': n, 'memoria': list(memoria.items()), 'rotulos': rotulos}).encode()
+    f.write(cabecalho)
+    f.seek(0)
+    f.write(_CABECALHO.pack(_MAGICO, len(cabecalho)))
+    f.flush()
+
+
+def montar_arquivo(caminho, cache=True):
+    """Monta um arquivo .s, reaproveitando o cache em disco se o conteúdo já foi montado.
+
+    cache pode ser False (monta num arquivo temporário anônimo) ou o diretório
+    do cache (padrão: $TOMASULO_CACHE ou ~/.cache/tomasulo).
+    """
+    if cache is False:
+        f = tempfile.TemporaryFile()
+        _compilar(caminho, f)
+        return _abrir(f)
+    diretorio = DIRETORIO_CACHE if cache is True else cache
+    destino = os.path.join(diretorio, _hash_arquivo(caminho) + '.tprog')
+    if not os.path.exists(destino):
+        os.makedirs(diretorio, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w+b') as f:
+                _compilar(caminho, f)
+            os.replace(temporario, destino) # Atômico: processos concorrentes veem o arquivo inteiro ou nada
+        except BaseException:
+            os.unlink(temporario)
+            raise
+    return _abrir(open(destino, 'rb'))
+
+
+def _abrir(f):
+    with f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magico, tamanho = _CABECALHO.unpack_from(mm, 0)
+    if magico != _MAGICO:
+        raise ValueError("Arquivo de programa montado inválido ou de outra versão")
+    meta = json.loads(mm[len(mm) - tamanho:])
+    instrucoes = ProgramaMapeado(mm, meta['n'])
+    return Programa(instrucoes, {e: v for e, v in meta['memoria']}, meta['rotulos'])
+
+
+class ProgramaMapeado:
+    """Sequência de Instrucao lida de registros binários num mmap.
+
+    Decodifica blocos de _BLOCO instruções sob demanda e guarda só os últimos
+    _BLOCOS_EM_MEMORIA, então o custo em memória não cresce com o programa. O
+    texto de exibição é o canônico (registradores em maiúsculas, imediatos e
+    alvos numéricos), o mesmo que decodificar_linha produz.
+    """
+
+    def __init__(self, mm, n, inicio=_ALINHAMENTO):
+        self._mm = mm
+        self._n = n
+        self._inicio = inicio # Posição do primeiro registro no mmap
+        self._blocos = OrderedDict()
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, pc):
+        if isinstance(pc, slice):
+            return [self[i] for i in range(*pc.indices(self._n))]
+        if pc < 0:
+            pc += self._n
+        if not 0 <= pc < self._n:
+            raise IndexError("PC fora do programa")
+        b, i = divmod(pc, _BLOCO)
+        bloco = self._blocos.get(b)
+        if bloco is None:
+            bloco = self._blocos[b] = self._decodificar_bloco(b)
+            if len(self._blocos) > _BLOCOS_EM_MEMORIA:
+                self._blocos.popitem(last=False)
+        else:
+            self._blocos.move_to_end(b)
+        return bloco[i]
+
+    def _decodificar_bloco(self, b):
+        inicio = b * _BLOCO
+        fim = min(inicio + _BLOCO, self._n)
+        dados = memoryview(self._mm)[self._inicio + inicio * _REGISTRO.size:self._inicio + fim * _REGISTRO.size]
+        bloco = []
+        for pc, (codigo, rd, rs1, rs2, imm, id) in enumerate(_REGISTRO.iter_unpack(dados), inicio):
+            op = Op(codigo)
+            if rs2 >= 0:
+                bloco.append(Instrucao(id, op.name, f"R{rd}", f"R{rs1}", f"R{rs2}", op, rd, rs1, rs2, None, pc))
+            else:
+                bloco.append(Instrucao(id, op.name, f"R{rd}", f"R{rs1}", str(imm), op, rd, rs1, None, imm, pc))
+        dados.release()
+        return tuple(bloco)
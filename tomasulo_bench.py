@@ -0,0 +1,187 @@
+# tomasulo_bench.py
+import json
+import platform
+import sys
+import tracemalloc
+from time import perf_counter
+
+from tomasulo_engine import SimuladorTomasulo
+from tomasulo_workloads import gerar
+
+# Mede a vazão do próprio simulador (ciclos simulados/s, instruções/s e pico de
+# memória) numa suíte fixa de cargas sintéticas e compara com uma baseline
+# gravada. Os ciclos simulados também entram na comparação: se mudarem, o
+# motor mudou de comportamento, não só de velocidade.
+
+BASELINE_PADRAO = 'bench_baseline.json'
+CICLOS_MEMORIA = 5000 # Ciclos da execução com tracemalloc (o modo headless não acumula estado)
+
+_LARGA = {'largura_issue': 4, 'largura_commit': 4, 'tamanho_rob': 32, 'num_rs': {'ADD': 8, 'MUL': 4}}
+
+# nome -> (carga, parâmetros do gerador, configuração para set_config)
+SUITE = {
+    'raw': ('raw', {'n': 10000}, {}),
+    'ilp': ('ilp', {'n': 10000}, {}),
+    'ilp_larga': ('ilp', {'n': 10000}, _LARGA),
+    'falsas_larga': ('falsas', {'n': 10000}, _LARGA),
+    'muldiv': ('muldiv', {'n': 4000}, {}),
+    'laco': ('laco', {'iteracoes': 1000}, {}),
+    'laco_2bits_execute': ('laco', {'iteracoes': 1000, 'taxa_tomado': 0.9},
+                           dict(_LARGA, preditor='2bits', resolucao_desvio='execute')),
+    'laco_compacto': ('laco', {'iteracoes': 1000}, {'backend': 'compacto'}),
+}
+
+
+def _simulador(linhas, config):
+    sim = SimuladorTomasulo()
+    sim.set_config({}, {}, **config)
+    sim.reset()
+    sim.carregar_instrucoes(linhas)
+    return sim
+
+
+def calibrar(repeticoes=5):
+    """Segundos de um laço Python fixo (o melhor de N): normaliza a vazão entre máquinas."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = perf_counter()
+        d, x = {}, 0
+        for i in range(200_000):
+            d[i & 255] = x
+            x = (x + i) & 0xFFFF
+        melhor = min(melhor, perf_counter() - inicio)
+    return melhor
+
+
+def medir(linhas, config=None, repeticoes=3):
+    """Roda o programa no modo headless e devolve vazão e pico de memória.
+
+    O tempo é o melhor de `repeticoes` execuções; o pico de memória vem de uma
+    execução separada com tracemalloc (que deixaria a medição de tempo lenta),
+    limitada a CICLOS_MEMORIA ciclos e que inclui a decodificação do programa.
+    """
+    config = config or {}
+    melhor, relatorio = float('inf'), None
+    for _ in range(repeticoes):
+        sim = _simulador(linhas, config)
+        inicio = perf_counter()
+        relatorio = sim.run()
+        melhor = min(melhor, perf_counter() - inicio)
+        instrucoes = sim.instrucoes_retiradas()
+
+    tracemalloc.start()
+    try:
+        sim = _simulador(linhas, config)
+        sim.run(max_cycles=CICLOS_MEMORIA)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ciclos': relatorio['ciclos'],
+        'instrucoes': instrucoes,
+        'segundos': melhor,
+        'ciclos_por_s': relatorio['ciclos'] / melhor,
+        'instrucoes_por_s': instrucoes / melhor,
+        'pico_memoria_kb': pico / 1024,
+    }
+
+
+def executar_suite(nomes=None, repeticoes=3, suite=SUITE):
+    resultados = {}
+    for nome in nomes or suite:
+        carga, parametros, config = suite[nome]
+        resultados[nome] = medir(gerar(carga, **parametros), config, repeticoes)
+    return resultados
+
+
+def comparar(resultados, baseline, calibracao=None, tolerancia=0.25):
+    """Lista de regressões (strings) em relação à baseline.
+
+    A vazão da baseline é escalada pela razão entre as calibrações, quando as
+    duas existem. Vazão abaixo de (1 - tolerancia) ou memória acima de
+    (1 + tolerancia) contam como regressão; ciclos simulados têm de ser iguais.
+    """
+    escala = 1.0
+    if calibracao and baseline.get('calibracao'):
+        escala = baseline['calibracao'] / calibracao
+    problemas = []
+    for nome, r in resultados.items():
+        b = baseline.get('resultados', {}).get(nome)
+        if b is None:
+            continue
+        if r['ciclos'] != b['ciclos'] or r['instrucoes'] != b['instrucoes']:
+            problemas.append(f"{nome}: resultado mudou ({b['ciclos']} -> {r['ciclos']} ciclos, "
+                             f"{b['instrucoes']} -> {r['instrucoes']} instruções)")
+        esperado = b['ciclos_por_s'] * escala
+        if r['ciclos_por_s'] < esperado * (1 - tolerancia):
+            problemas.append(f"{nome}: vazão {r['ciclos_por_s']:.0f} ciclos/s, "
+                             f"esperado ~{esperado:.0f} ({r['ciclos_por_s'] / esperado - 1:+.0%})")
+        if r['pico_memoria_kb'] > b['pico_memoria_kb'] * (1 + tolerancia):
+            problemas.append(f"{nome}: pico de memória {r['pico_memoria_kb']:.0f} KB, "
+                             f"baseline {b['pico_memoria_kb']:.0f} KB")
+    return problemas
+
+
+def salvar_baseline(resultados, calibracao, caminho=BASELINE_PADRAO):
+    dados = {
+        'python': platform.python_version(),
+        'maquina': platform.machine(),
+        'calibracao': calibracao,
+        'resultados': resultados,
+    }
+    with open(caminho, 'w') as f:
+        json.dump(dados, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def carregar_baseline(caminho=BASELINE_PADRAO):
+    with open(caminho) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m tomasulo_bench',
+                                     description='Benchmarks de vazão do simulador com comparação contra uma baseline.')
+    parser.add_argument('cargas', nargs='*', metavar='CARGA',
+                        help=f"subconjunto da suíte (padrão: todas): {', '.join(SUITE)}")
+    parser.add_argument('-r', '--repeticoes', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE_PADRAO)
+    parser.add_argument('--salvar-baseline', action='store_true', help='grava os resultados como nova baseline')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='queda de vazão (ou aumento de memória) aceita, em fração da baseline')
+    parser.add_argument('--json', action='store_true', help='imprime os resultados em JSON')
+    args = parser.parse_args(argv)
+    for nome in args.cargas:
+        if nome not in SUITE:
+            parser.error(f"Carga desconhecida: {nome}")
+
+    calibracao = calibrar()
+    resultados = executar_suite(args.cargas or None, args.repeticoes)
+    if args.json:
+        print(json.dumps({'calibracao': calibracao, 'resultados': resultados}, indent=2))
+    else:
+        print(f"{'carga':<20} {'ciclos':>8} {'ciclos/s':>10} {'instr/s':>10} {'memória KB':>11}")
+        for nome, r in resultados.items():
+            print(f"{nome:<20} {r['ciclos']:>8} {r['ciclos_por_s']:>10.0f} "
+                  f"{r['instrucoes_por_s']:>10.0f} {r['pico_memoria_kb']:>11.0f}")
+
+    if args.salvar_baseline:
+        salvar_baseline(resultados, calibracao, args.baseline)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+    try:
+        baseline = carregar_baseline(args.baseline)
+    except FileNotFoundError:
+        print(f"Sem baseline em {args.baseline}; use --salvar-baseline")
+        return 0
+    problemas = comparar(resultados, baseline, calibracao, args.tolerancia)
+    for p in problemas:
+        print("REGRESSÃO:", p)
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# tomasulo_compact.py
+from array import array
+
+# Backend compacto: os campos do ROB e das RS ficam em colunas pré-alocadas
+# (array para flags/tags, list para valores Python) indexadas pelo slot.
+# As "views" expõem os mesmos atributos de EntradaROB/EstacaoReserva, então o
+# motor e o GUI (rs.busy, rob.pronto, ...) não precisam saber qual backend está ativo.
+
+NULO = -1  # Representa None nas colunas inteiras (tags/destinos)
+
+
+def _flag(nome):
+    def get(self):
+        return bool(getattr(self._banco, nome)[self._i])
+    def set(self, valor):
+        getattr(self._banco, nome)[self._i] = 1 if valor else 0
+    return property(get, set)
+
+
+def _tag(nome):
+    def get(self):
+        v = getattr(self._banco, nome)[self._i]
+        return None if v == NULO else v
+    def set(self, valor):
+        getattr(self._banco, nome)[self._i] = NULO if valor is None else valor
+    return property(get, set)
+
+
+def _valor(nome):
+    def get(self):
+        return getattr(self._banco, nome)[self._i]
+    def set(self, valor):
+        getattr(self._banco, nome)[self._i] = valor
+    return property(get, set)
+
+
+class _Banco:
+    # (nome da coluna, tipo do array ou None para list, valor inicial)
+    COLUNAS = ()
+
+    def __init__(self, n):
+        self.n = n
+        for nome, tipo, inicial in self.COLUNAS:
+            setattr(self, nome, self._nova_coluna(tipo, inicial))
+
+    def _nova_coluna(self, tipo, inicial):
+        if tipo is None:
+            return [inicial] * self.n
+        return array(tipo, [inicial]) * self.n
+
+    def limpar(self, set_campo=setattr):
+        """Reset em bloco: troca cada coluna por uma nova (set_campo permite journaling)."""
+        for nome, tipo, inicial in self.COLUNAS:
+            set_campo(self, nome, self._nova_coluna(tipo, inicial))
+
+
+class BancoRS(_Banco):
+    COLUNAS = (
+        ('busy', 'b', 0),
+        ('op', None, None),
+        ('vj', None, None),
+        ('vk', None, None),
+        ('qj', 'i', NULO),
+        ('qk', 'i', NULO),
+        ('dest', 'i', NULO),
+        ('tempo_restante', 'i', 0),
+    )
+
+    def __init__(self, nomes, tipos):
+        super().__init__(len(nomes))
+        self.nomes = nomes
+        self.tipos = tipos
+
+
+class BancoROB(_Banco):
+    COLUNAS = (
+        ('tipo', None, None),
+        ('dest', 'i', NULO),
+        ('valor', None, None),
+        ('pronto', 'b', 0),
+        ('instrucao', None, None),
+        ('busy', 'b', 0),
+        ('previsto', 'b', 0),
+        ('ciclo_emissao', 'q', 0),
+        ('rat_salvo', None, None),
+    )
+
+
+class EstacaoReservaView:
+    __slots__ = ('_banco', '_i')
+
+    def __init__(self, banco, i):
+        self._banco = banco
+        self._i = i
+
+    nome = property(lambda self: self._banco.nomes[self._i])
+    tipo = property(lambda self: self._banco.tipos[self._i])
+    indice = property(lambda self: self._i)
+
+    busy = _flag('busy')
+    op = _valor('op')
+    vj = _valor('vj')
+    vk = _valor('vk')
+    qj = _tag('qj')
+    qk = _tag('qk')
+    dest = _tag('dest')
+    tempo_restante = _valor('tempo_restante')
+
+
+class EntradaROBView:
+    __slots__ = ('_banco', '_i')
+
+    def __init__(self, banco, i):
+        self._banco = banco
+        self._i = i
+
+    id = property(lambda self: self._i)
+    tipo = _valor('tipo')
+    dest = _tag('dest')
+    valor = _valor('valor')
+    pronto = _flag('pronto')
+    instrucao = _valor('instrucao')
+    busy = _flag('busy')
+    previsto = _flag('previsto')
+    ciclo_emissao = _valor('ciclo_emissao')
+    rat_salvo = _valor('rat_salvo')
+
+
+def criar_rs(num_rs):
+    """Devolve (banco, rs_add, rs_mul, rs_mem) com os mesmos nomes/índices do backend de objetos."""
+    nomes, tipos = [], []
+    for classe in ('ADD', 'MUL', 'MEM'):
+        for i in range(num_rs[classe]):
+            nomes.append(f'{classe}_{i}')
+            tipos.append(classe)
+    banco = BancoRS(nomes, tipos)
+    views = [EstacaoReservaView(banco, i) for i in range(banco.n)]
+    n_add, n_mul = num_rs['ADD'], num_rs['MUL']
+    return banco, views[:n_add], views[n_add:n_add + n_mul], views[n_add + n_mul:]
+
+
+def criar_rob(tamanho):
+    banco = BancoROB(tamanho)
+    return banco, [EntradaROBView(banco, i) for i in range(tamanho)]
@@ -1,22 +1,30 @@
 # tomasulo_engine.py
-import copy
+import heapq
+import pickle
+from time import perf_counter
+from tomasulo_history import Historico, ATRIBUTO, ITEM, AUSENTE
+from tomasulo_program import Op, NUM_REGS, indice_registrador
+from tomasulo_asm import montar, montar_arquivo
+from tomasulo_predictor import BTB, PREDITORES, criar_preditor
+from tomasulo_trace import Estagio, Evento, SinkNulo, SinkJSONL, SinkBinario
+from tomasulo_stats import Instrumentacao, ISSUE_OK, ISSUE_ROB_CHEIO, ISSUE_LSQ_CHEIO, ISSUE_FIM
+from tomasulo_timeline import LinhaDoTempo, caminho_critico, diagrama, exportar_chrome_trace
+import tomasulo_compact
+import tomasulo_snapshot
+import tomasulo_replay
+import tomasulo_resultados
+from tomasulo_amostragem import amostrar
 
-class Instrucao:
-    def __init__(self, op, dest, s1, s2, id):
-        self.id = id
-        self.op = op        
-        self.dest = dest    
-        self.s1 = s1        
-        self.s2 = s2        
-        self.estado = "EMITIDO" 
-
-    def __repr__(self):
-        return f"{self.op} {self.dest}, {self.s1}, {self.s2}"
+BACKENDS = ('objetos', 'compacto')
+RESOLUCOES = ('commit', 'execute') # Onde o BEQ é resolvido
+CLASSES_RS = {'ADD': 'ADD', 'SUB': 'ADD', 'BEQ': 'ADD', 'MUL': 'MUL', 'DIV': 'MUL', 'LW': 'MEM', 'SW': 'MEM'}
+_OPS_MEMORIA = (Op.LW, Op.SW)
 
 class EstacaoReserva:
-    def __init__(self, nome, tipo):
+    def __init__(self, nome, tipo, indice=0):
         self.nome = nome
         self.tipo = tipo
+        self.indice = indice # Posição em rs_add + rs_mul (desempate da fila de conclusão)
         self.busy = False
         self.op = None
         self.vj = None
@@ -35,194 +43,879 @@ class EntradaROB:
         self.pronto = False
         self.instrucao = None
         self.busy = False
+        self.previsto = False # BEQ: a busca seguiu o alvo previsto?
+        self.ciclo_emissao = 0
+        self.rat_salvo = None # RAT no ISSUE do BEQ (resolução no EXECUTE) ou antes do LW (violação de ordem)
+
+class EntradaLSQ:
+    """Entrada da fila de loads/stores, em ordem de programa (alocada no ISSUE, liberada no commit)."""
+    def __init__(self, rob, load):
+        self.rob = rob
+        self.load = load
+        self.endereco = None # Conhecido quando a estação MEM termina o cálculo
+        self.valor = None # Dado do SW
+        self.iniciado = False # LW: já leu a memória ou recebeu o dado de um SW
+        self.fonte = None # LW: ROB do SW que encaminhou o dado (None = memória)
 
 class SimuladorTomasulo:
     def __init__(self):
-        self.latencias = {'ADD': 2, 'SUB': 2, 'MUL': 8, 'DIV': 10, 'BEQ': 1}
+        self.latencias = {'ADD': 2, 'SUB': 2, 'MUL': 8, 'DIV': 10, 'BEQ': 1, 'LW': 1, 'SW': 1} # LW/SW: cálculo do endereço
         self.regs_iniciais = {'R1': 10, 'R2': 20, 'R3': 30} 
-        self.history = [] 
-        self.prog_original = [] # Armazena o programa original para saltos
+        self.tamanho_rob = 6
+        self.num_rs = {'ADD': 3, 'MUL': 2, 'MEM': 2} # Estações por classe (ver CLASSES_RS); MEM calcula endereços de LW/SW
+        self.tamanho_lsq = 8 # Entradas da fila de loads/stores
+        self.latencia_memoria = 4 # Ciclos de um LW que lê a memória (encaminhado de um SW: 1)
+        self.memoria_inicial = {} # endereço -> valor; o resto da memória de dados vale 0
+        self.backend = 'objetos' # 'compacto' guarda ROB/RS em colunas (tomasulo_compact)
+        self.preditor_tipo = 'nao_tomado' # Ver tomasulo_predictor.PREDITORES
+        self.tamanho_preditor = 1024 # Entradas das tabelas do preditor
+        self.tamanho_btb = 64
+        self.resolucao_desvio = 'commit' # 'execute' resolve no WRITE do BEQ, com squash seletivo
+        self.largura_issue = 1 # Instruções emitidas por ciclo
+        self.largura_commit = 1 # Entradas do ROB aposentadas por ciclo
+        self.num_cdb = None # Barramentos de resultado por ciclo (None = ilimitado)
+        self.num_ufs = {'ADD': None, 'MUL': None} # Unidades funcionais por classe (None = uma por estação)
+        self.history = Historico()
+        self._journal = None # Registros de desfazer do ciclo corrente (None = não grava)
+        self.gravar_historico = True # Desligados pelo modo headless (run)
+        self.tracing = True # Gera eventos (sim.eventos do ciclo + sink); desligado no modo headless
+        self.sink = SinkNulo() # Destino do stream de eventos (ver tomasulo_trace)
+        self.instrumentacao = None # tomasulo_stats.Instrumentacao para ocupação/travamentos por ciclo
+        self.linha_do_tempo = None # tomasulo_timeline.LinhaDoTempo: ciclos de cada instrução dinâmica
+        self.prog_original = () # Programa decodificado (imutável), indexado pelo PC
+        self.memoria_programa = {} # Imagem do .data do programa carregado (memoria_inicial prevalece)
         self.reset()
 
-    def set_config(self, latencias_novas, regs_novos):
+    def set_config(self, latencias_novas, regs_novos, tamanho_rob=None, num_rs=None, backend=None,
+                   preditor=None, tamanho_btb=None, resolucao_desvio=None,
+                   largura_issue=None, largura_commit=None, num_cdb=None, num_ufs=None,
+                   tamanho_lsq=None, latencia_memoria=None, memoria=None):
+        """Argumentos None mantêm o valor atual; num_cdb e num_ufs usam 0 para "ilimitado"."""
+        if backend is not None and backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {backend}")
+        if preditor is not None and preditor not in PREDITORES:
+            raise ValueError(f"Preditor desconhecido: {preditor}")
+        if tamanho_btb is not None and tamanho_btb < 1:
+            raise ValueError("tamanho_btb deve ser >= 1")
+        if resolucao_desvio is not None and resolucao_desvio not in RESOLUCOES:
+            raise ValueError(f"Resolução de desvio desconhecida: {resolucao_desvio}")
+        if any(w is not None and w < 1 for w in (largura_issue, largura_commit)):
+            raise ValueError("Larguras de issue/commit devem ser >= 1")
+        if num_cdb is not None and num_cdb < 0:
+            raise ValueError("num_cdb deve ser >= 0 (0 = ilimitado)")
+        if num_ufs is not None and any(n < 0 for n in num_ufs.values()):
+            raise ValueError("Unidades funcionais devem ser >= 0 (0 = uma por estação)")
+        if any(lat < 1 for lat in latencias_novas.values()):
+            raise ValueError("Latências devem ser >= 1")
+        if tamanho_rob is not None and tamanho_rob < 1:
+            raise ValueError("tamanho_rob deve ser >= 1")
+        if num_rs is not None and any(n < 1 for n in num_rs.values()):
+            raise ValueError("Cada classe precisa de ao menos uma estação de reserva")
+        if tamanho_lsq is not None and tamanho_lsq < 1:
+            raise ValueError("tamanho_lsq deve ser >= 1")
+        if latencia_memoria is not None and latencia_memoria < 1:
+            raise ValueError("latencia_memoria deve ser >= 1")
         self.latencias.update(latencias_novas)
         self.regs_iniciais = regs_novos
+        if tamanho_rob is not None:
+            self.tamanho_rob = tamanho_rob
+        if num_rs is not None:
+            self.num_rs.update(num_rs)
+        if backend is not None:
+            self.backend = backend
+        if preditor is not None:
+            self.preditor_tipo = preditor
+        if tamanho_btb is not None:
+            self.tamanho_btb = tamanho_btb
+        if resolucao_desvio is not None:
+            self.resolucao_desvio = resolucao_desvio
+        if largura_issue is not None:
+            self.largura_issue = largura_issue
+        if largura_commit is not None:
+            self.largura_commit = largura_commit
+        if num_cdb is not None:
+            self.num_cdb = num_cdb or None
+        if num_ufs is not None:
+            self.num_ufs.update((classe, n or None) for classe, n in num_ufs.items())
+        if tamanho_lsq is not None:
+            self.tamanho_lsq = tamanho_lsq
+        if latencia_memoria is not None:
+            self.latencia_memoria = latencia_memoria
+        if memoria is not None:
+            self.memoria_inicial = dict(memoria)
 
     def reset(self):
         self.ciclo = 0
-        self.log_msg = ""
-        self.history = [] 
+        self.eventos = [] # Eventos do ciclo corrente
+        self.history.limpar()
+        self._journal = None
         
         # Métricas
         self.metricas = {
             'commits': 0,
-            'bolhas': 0,
-            'flushes': 0
+            'bolhas': 0, # Ciclos com o ISSUE travado (= bolhas_rob + bolhas_rs + bolhas_lsq)
+            'bolhas_rob': 0, # ... por ROB cheio
+            'bolhas_rs': 0, # ... por falta de estação de reserva livre
+            'bolhas_lsq': 0, # ... por LSQ cheia (LW/SW)
+            'flushes': 0, # Recuperações de desvio mal previsto
+            'desvios': 0, # BEQs que chegaram ao commit
+            'mispredicts': 0, # Desses, quantos foram mal previstos
+            'ciclos_desperdicados': 0, # Do ISSUE do BEQ mal previsto até o flush
+            'conflitos_cdb': 0, # RS-ciclos esperando barramento para o WRITE
+            'conflitos_uf': 0, # RS-ciclos prontas esperando unidade funcional
+            'loads_encaminhados': 0, # LWs que receberam o dado de um SW na LSQ
+            'loads_especulativos': 0, # LWs que passaram à frente de SWs com endereço desconhecido
+            'flushes_memoria': 0 # Violações de ordem de memória (LW refeito)
         }
+        self._limite_ufs = {c: n for c, n in self.num_ufs.items() if n is not None}
+        if self.instrumentacao is not None:
+            self.instrumentacao.limpar()
+        if self.linha_do_tempo is not None:
+            self.linha_do_tempo.limpar()
 
-        self.rat = {f'R{i}': None for i in range(32)} 
-        self.regs = {f'R{i}': 0 for i in range(32)}
+        # Preditor e BTB fazem parte do estado (voltar_ciclo desfaz o treino)
+        self.preditor = criar_preditor(self.preditor_tipo, self.tamanho_preditor)
+        self.btb = BTB(self.tamanho_btb)
+
+        # Banco de registradores indexado pelo número do registrador (R5 -> 5)
+        self.regs = [0] * NUM_REGS
+        self.memoria = {**self.memoria_programa, **self.memoria_inicial} # Memória de dados (esparsa)
         
         for reg, val in self.regs_iniciais.items():
-            if reg in self.regs:
-                self.regs[reg] = val
+            i = indice_registrador(reg)
+            if i is not None:
+                self.regs[i] = val
         
-        self.fila_instrucoes = []
-        self.tamanho_rob = 6
-        self.rob = [EntradaROB(i) for i in range(self.tamanho_rob)]
+        self.pc = 0 # Próxima instrução de prog_original a ser emitida
+        self._limpar_pipeline()
+        # Ponto de partida de voltar_ciclo/goto_cycle mesmo depois de um run() sem histórico
+        self.history.checkpoint_periodico(self)
+
+    def em_estado_inicial(self):
+        """True se a máquina está exatamente como reset() + carregar_programa a
+        deixam com a configuração atual (nada simulado, avançado ou editado)."""
+        if self.ciclo or self.pc or self.itens_no_rob or self.lsq or any(t is not None for t in self.rat):
+            return False
+        if any(self.metricas.values()):
+            return False
+        if (self._banco_rob is not None) != (self.backend == 'compacto') or len(self.rob) != self.tamanho_rob:
+            return False
+        for estacoes, classe in ((self.rs_add, 'ADD'), (self.rs_mul, 'MUL'), (self.rs_mem, 'MEM')):
+            if len(estacoes) != self.num_rs[classe] or any(rs.busy for rs in estacoes):
+                return False
+        if self._limite_ufs != {c: n for c, n in self.num_ufs.items() if n is not None}:
+            return False
+        regs = [0] * NUM_REGS
+        for reg, val in self.regs_iniciais.items():
+            i = indice_registrador(reg)
+            if i is not None:
+                regs[i] = val
+        if list(self.regs) != regs or self.memoria != {**self.memoria_programa, **self.memoria_inicial}:
+            return False
+        # Preditor e BTB sem treino (avancar_funcional os aquece)
+        return (pickle.dumps(self.preditor) == pickle.dumps(criar_preditor(self.preditor_tipo, self.tamanho_preditor))
+                and pickle.dumps(self.btb) == pickle.dumps(BTB(self.tamanho_btb)))
+
+    def _limpar_pipeline(self):
+        """Pipeline vazio: RAT, ROB, estações, LSQ e filas (o estado arquitetural fica)."""
+        self.rat = [None] * NUM_REGS # tag do ROB que vai escrever cada registrador
+        self.lsq = [] # EntradaLSQ, da mais velha para a mais nova
         self.head = 0
         self.tail = 0
         self.itens_no_rob = 0
         
-        self.rs_add = [EstacaoReserva(f'ADD_{i}', 'ADD') for i in range(3)]
-        self.rs_mul = [EstacaoReserva(f'MUL_{i}', 'MUL') for i in range(2)]
-        
-        # Recria o prog_original no reset
-        if hasattr(self, 'prog_original') and self.prog_original:
-             pass
+        if self.backend == 'compacto':
+            self._banco_rob, self.rob = tomasulo_compact.criar_rob(self.tamanho_rob)
+            self._banco_rs, self.rs_add, self.rs_mul, self.rs_mem = tomasulo_compact.criar_rs(self.num_rs)
+        else:
+            self._banco_rob = self._banco_rs = None
+            self.rob = [EntradaROB(i) for i in range(self.tamanho_rob)]
+            n_add, n_mul = self.num_rs['ADD'], self.num_rs['MUL']
+            self.rs_add = [EstacaoReserva(f'ADD_{i}', 'ADD', i) for i in range(n_add)]
+            self.rs_mul = [EstacaoReserva(f'MUL_{i}', 'MUL', n_add + i) for i in range(n_mul)]
+            self.rs_mem = [EstacaoReserva(f'MEM_{i}', 'MEM', n_add + n_mul + i) for i in range(self.num_rs['MEM'])]
+        self._limpar_filas()
 
-    def log(self, msg):
-        self.log_msg += msg + "\n"
+    def _limpar_filas(self):
+        # Estruturas de wakeup/select: o custo de cada estágio fica proporcional
+        # às RS envolvidas, e não ao total de estações.
+        self.consumidores = {}  # tag (id do ROB) -> [(rs, 'j'|'k')] esperando aquele resultado
+        self.prontas = []       # RS com operandos prontos que começam a executar no próximo EXECUTE
+        self.executando = []    # RS decrementando tempo_restante
+        self.conclusoes = []    # heap (ciclo do WRITE, indice da RS, rs)
+        self.enderecos = []     # heap (ciclo, indice, rs) de estações MEM com endereço calculado
+
+    def _evento(self, estagio, rob=None, rs=None, instr=None, valor=None):
+        ev = Evento(self.ciclo, estagio, rob, rs, instr, valor)
+        self.eventos.append(ev)
+        self.sink.emitir(ev)
 
     def carregar_instrucoes(self, lista_instrucoes):
-        self.fila_instrucoes = []
-        self.prog_original = [] # Limpa e carrega o programa original
-        for i, txt in enumerate(lista_instrucoes):
-            if not txt.strip(): continue
-            partes = txt.replace(',', '').split()
-            if len(partes) >= 4:
-                instr = Instrucao(partes[0], partes[1], partes[2], partes[3], i)
-                self.fila_instrucoes.append(instr)
-                self.prog_original.append(instr) # Salva no programa original
+        """Monta o programa (ValueError em erros de sintaxe) e aponta o PC para o início.
+
+        Aceita rótulos, comentários e diretivas (ver tomasulo_asm).
+        """
+        self.carregar_programa(montar(lista_instrucoes))
+
+    def carregar_arquivo(self, caminho, cache=True):
+        """Monta um arquivo .s via cache em disco; as instruções são lidas sob demanda."""
+        self.carregar_programa(montar_arquivo(caminho, cache))
+
+    def carregar_programa(self, programa):
+        """Carrega um tomasulo_asm.Programa e aponta o PC para o início."""
+        self.prog_original = programa.instrucoes
+        if programa.memoria != self.memoria_programa:
+            # O .data faz parte do estado inicial: refaz o reset (e o checkpoint do ciclo 0)
+            self.memoria_programa = programa.memoria
+            self.reset()
+        self.pc = 0
+
+    def proxima_instrucao(self):
+        return self.prog_original[self.pc] if self.pc < len(self.prog_original) else None
+
+    def _travamento_issue(self):
+        """Por que a próxima instrução não pode ser emitida agora (ISSUE_OK se pode)."""
+        instr = self.proxima_instrucao()
+        if instr is None:
+            return ISSUE_FIM
+        if self.itens_no_rob >= self.tamanho_rob:
+            return ISSUE_ROB_CHEIO
+        if self.get_rs_livre(instr.op) is None:
+            return 'rs_' + CLASSES_RS[instr.op]
+        if instr.codigo in _OPS_MEMORIA and len(self.lsq) >= self.tamanho_lsq:
+            return ISSUE_LSQ_CHEIO
+        return ISSUE_OK
+
+    def _contar_bolhas(self, causa, n=1):
+        m = self.metricas
+        self._set_item(m, 'bolhas', m['bolhas'] + n)
+        campo = 'bolhas_rob' if causa == ISSUE_ROB_CHEIO else 'bolhas_lsq' if causa == ISSUE_LSQ_CHEIO else 'bolhas_rs'
+        self._set_item(m, campo, m[campo] + n)
 
     def get_rs_livre(self, op):
-        lista = self.rs_mul if op in ['MUL', 'DIV'] else self.rs_add
+        classe = CLASSES_RS[op]
+        lista = self.rs_add if classe == 'ADD' else self.rs_mul if classe == 'MUL' else self.rs_mem
         for rs in lista:
             if not rs.busy:
                 return rs
         return None
 
+    # --- Escritas de estado passam por aqui para alimentar o journal de desfazer ---
+    def _set(self, obj, campo, valor):
+        if self._journal is not None:
+            self._journal.append((ATRIBUTO, obj, campo, getattr(obj, campo)))
+        setattr(obj, campo, valor)
+
+    def _set_item(self, d, chave, valor):
+        if self._journal is not None:
+            try:
+                antigo = d[chave]
+            except KeyError:
+                antigo = AUSENTE
+            self._journal.append((ITEM, d, chave, antigo))
+        d[chave] = valor
+
+    def _esperar(self, tag, rs, lado):
+        self._set_item(self.consumidores, tag, self.consumidores.get(tag, []) + [(rs, lado)])
+
     def salvar_estado(self):
-        estado_atual = copy.deepcopy(self.__dict__)
-        del estado_atual['history']
-        self.history.append(estado_atual)
+        """Abre o journal do próximo ciclo (e um checkpoint completo a cada K ciclos)."""
+        self._journal = self.history.abrir_ciclo(self)
 
     def voltar_ciclo(self):
-        if not self.history:
+        if self.ciclo == 0:
             return "Já está no início."
-        
-        estado_anterior = self.history.pop()
-        prog_original_temp = self.prog_original
-        self.__dict__.update(estado_anterior)
-        self.prog_original = prog_original_temp
+        if self.instrumentacao is not None:
+            self.instrumentacao.posicionar(self.ciclo)
 
-        if not hasattr(self, 'history'):
-            self.history = []
+        if len(self.history):
+            self.history.desfazer_ultimo()
+            self._journal = None
+        else:
+            # Journal descartado pelo orçamento: volta ao checkpoint e re-simula
+            alvo = self.ciclo - 1
+            if not self.history.restaurar_checkpoint(self, alvo):
+                return "Já está no início."
+            self._re_simular(alvo, passo_a_passo=True)
+        if self.instrumentacao is not None:
+            self.instrumentacao.posicionar(self.ciclo)
         return f"Voltou para Ciclo {self.ciclo}"
 
+    def goto_cycle(self, alvo):
+        """Vai para o ciclo `alvo`, para trás ou para frente (para no fim do programa).
+
+        Para trás, desfaz pelo journal quando ele cobre o trecho; senão restaura o
+        checkpoint mais próximo e re-simula em modo headless. Para frente, parte
+        de um checkpoint já gravado entre o ciclo atual e o alvo, se houver
+        (ciclos simulados antes de voltar), e executa o restante com run().
+        Devolve o ciclo alcançado.
+        """
+        alvo = max(alvo, 0)
+        if self.instrumentacao is not None:
+            self.instrumentacao.posicionar(self.ciclo)
+        if alvo < self.ciclo and self.ciclo - alvo <= len(self.history):
+            while self.ciclo > alvo:
+                self.history.desfazer_ultimo()
+            self._journal = None
+        else:
+            anterior = self.history.checkpoint_anterior(alvo)
+            if anterior is not None and (alvo < self.ciclo or anterior > self.ciclo):
+                self.history.restaurar_checkpoint(self, alvo)
+                self._re_simular(alvo, passo_a_passo=False)
+            elif alvo > self.ciclo:
+                self.run(max_cycles=alvo, log=False, checkpoints=True)
+        if self.instrumentacao is not None:
+            self.instrumentacao.posicionar(self.ciclo)
+        return self.ciclo
+
+    def save_snapshot(self, caminho):
+        """Grava o estado da máquina e o programa num arquivo binário versionado (ver tomasulo_snapshot)."""
+        tomasulo_snapshot.salvar(self, caminho)
+
+    def load_snapshot(self, caminho):
+        """Retoma um snapshot (estado, configuração e programa). O histórico
+        recomeça no ciclo do snapshot: não dá para voltar para antes dele."""
+        tomasulo_snapshot.carregar(self, caminho)
+        self.history.limpar()
+        self.history.checkpoint_periodico(self)
+        if self.instrumentacao is not None:
+            self.instrumentacao.limpar() # As amostras eram de outra execução
+
+    def gravar_replay(self, caminho, max_cycles=None):
+        """Roda até o fim (ou max_cycles) gravando um quadro por ciclo para o
+        modo replay do GUI (ver tomasulo_replay). Devolve o relatorio()."""
+        return tomasulo_replay.gravar(self, caminho, max_cycles)
+
+    def _re_simular(self, alvo, passo_a_passo):
+        """Avança de um checkpoint restaurado até `alvo`. Ciclos re-simulados não
+        voltam ao stream de eventos nem à linha do tempo; a instrumentação só
+        amostra os que ainda não tinha (ver tomasulo_stats)."""
+        sink, self.sink = self.sink, SinkNulo()
+        linha_do_tempo, self.linha_do_tempo = self.linha_do_tempo, None
+        try:
+            if passo_a_passo:
+                while self.ciclo < alvo:
+                    self.executar_ciclo()
+            else:
+                self.run(max_cycles=alvo, log=False, checkpoints=True)
+        finally:
+            self.sink = sink
+            self.linha_do_tempo = linha_do_tempo
+
+    def instrucoes_retiradas(self):
+        """Instruções dinâmicas que já saíram do ROB: commits mais os BEQs mal
+        previstos que, na resolução no commit, saem pelo flush sem contar em
+        metricas['commits'] (é o que avancar_funcional conta)."""
+        m = self.metricas
+        return m['commits'] + (m['flushes'] if self.resolucao_desvio == 'commit' else 0)
+
+    def relatorio(self):
+        """Métricas finais da simulação (o que o GUI mostra e o CLI imprime)."""
+        m = self.metricas
+        r = {
+            'ciclos': self.ciclo,
+            'commits': m['commits'],
+            'ipc': m['commits'] / self.ciclo if self.ciclo > 0 else 0,
+            'bolhas': m['bolhas'],
+            'bolhas_rob': m['bolhas_rob'],
+            'bolhas_rs': m['bolhas_rs'],
+            'flushes': m['flushes'],
+            'desvios': m['desvios'],
+            'mispredicts': m['mispredicts'],
+            'precisao_previsao': 1 - m['mispredicts'] / m['desvios'] if m['desvios'] > 0 else 1.0,
+            'ciclos_desperdicados': m['ciclos_desperdicados'],
+            'conflitos_cdb': m['conflitos_cdb'],
+            'conflitos_uf': m['conflitos_uf'],
+            'bolhas_lsq': m['bolhas_lsq'],
+            'loads_encaminhados': m['loads_encaminhados'],
+            'loads_especulativos': m['loads_especulativos'],
+            'flushes_memoria': m['flushes_memoria'],
+        }
+        if self.instrumentacao is not None:
+            r['instrumentacao'] = self.instrumentacao.relatorio(self)
+        return r
+
+    def run(self, max_cycles=None, record_history=False, log=False, skip_idle=True, checkpoints=False,
+            max_commits=None):
+        """Executa até esta_terminado() (ou max_cycles, ou metricas['commits'] chegar
+        a max_commits) sem o custo do modo passo a passo.
+
+        Com skip_idle, trechos em que a máquina só decrementa latências são
+        avançados de uma vez (ver ciclos_ociosos); o histórico precisa estar
+        desligado, já que voltar_ciclo anda de um em um ciclo. Com checkpoints,
+        grava os checkpoints periódicos mesmo sem histórico (usado por goto_cycle).
+        """
+        pular = skip_idle and not record_history
+        gravar, tracing = self.gravar_historico, self.tracing
+        self.gravar_historico, self.tracing = record_history, log
+        if not record_history:
+            # Ciclos sem journal: voltar_ciclo passa a usar checkpoint + re-simulação
+            self.history.descartar_journal()
+        try:
+            while not self.esta_terminado():
+                if max_cycles is not None and self.ciclo >= max_cycles:
+                    break
+                if max_commits is not None and self.metricas['commits'] >= max_commits:
+                    break
+                if checkpoints and not record_history:
+                    self.history.checkpoint_periodico(self)
+                if pular:
+                    n = self.ciclos_ociosos()
+                    if max_cycles is not None:
+                        n = min(n, max_cycles - self.ciclo)
+                    if n > 0:
+                        self.pular_ciclos(n)
+                        continue
+                self.executar_ciclo()
+        finally:
+            self.gravar_historico, self.tracing = gravar, tracing
+            self._journal = None
+        return self.relatorio()
+
+    def avancar_funcional(self, n, aquecer=True):
+        """Executa até n instruções só pela semântica da ISA, sem o modelo de tempo.
+
+        Parte do estado arquitetural: o que estiver em voo é descartado e a
+        execução segue da instrução mais velha ainda sem commit. Ciclo e
+        métricas não andam. Com aquecer, cada BEQ treina preditor e BTB como no
+        commit. O histórico recomeça aqui (voltar_ciclo não passa para trás
+        deste ponto). Devolve quantas instruções foram executadas (menos de n
+        se o programa terminar).
+        """
+        if self.itens_no_rob:
+            self.pc = self.rob[self.head].instrucao.pc
+            self._limpar_pipeline()
+        prog, regs, memoria = self.prog_original, self.regs, self.memoria
+        preditor, btb = self.preditor, self.btb
+        fim, pc, feitas = len(prog), self.pc, 0
+        ADD, SUB, MUL, DIV, BEQ, LW = Op.ADD, Op.SUB, Op.MUL, Op.DIV, Op.BEQ, Op.LW
+        while feitas < n and pc < fim:
+            _, _, _, _, _, codigo, rd, rs1, rs2, imm, _ = prog[pc]
+            feitas += 1
+            if codigo == BEQ:
+                tomado = regs[rd] == regs[rs1]
+                if aquecer:
+                    preditor.atualizar(pc, tomado, self)
+                    if tomado:
+                        btb.atualizar(pc, imm, self)
+                pc = imm if tomado else pc + 1
+                if not 0 <= pc < fim:
+                    pc = fim
+                continue
+            vj = regs[rs1]
+            vk = imm if rs2 is None else regs[rs2]
+            if codigo == ADD: regs[rd] = vj + vk
+            elif codigo == SUB: regs[rd] = vj - vk
+            elif codigo == MUL: regs[rd] = vj * vk
+            elif codigo == DIV: regs[rd] = int(vj / vk) if vk != 0 else 0
+            elif codigo == LW: regs[rd] = memoria.get(int(vj) + vk, 0)
+            else: memoria[int(vj) + vk] = regs[rd] # SW
+            pc += 1
+        self.pc = pc
+        self.history.limpar()
+        self.history.checkpoint_periodico(self)
+        if self.instrumentacao is not None:
+            self.instrumentacao.truncar(self.ciclo) # Os ciclos seguintes já não são os amostrados
+        return feitas
+
+    def ciclos_ociosos(self):
+        """Quantos dos próximos ciclos só decrementam tempo_restante.
+
+        Um ciclo é ocioso quando o head do ROB não está pronto (sem commit),
+        nenhuma RS terminou (sem write) e o ISSUE está travado ou sem instruções.
+        Como só commit/write liberam ROB e RS, o travamento persiste até a RS
+        em execução mais adiantada chegar a zero.
+        """
+        if self.itens_no_rob > 0:
+            head = self.rob[self.head]
+            if head.busy and head.pronto:
+                return 0
+
+        if self.conclusoes or self.prontas or self.enderecos or not self.executando:
+            return 0
+        menor = min(rs.tempo_restante for rs in self.executando)
+
+        instr = self.proxima_instrucao()
+        if instr is not None:
+            if self.itens_no_rob < self.tamanho_rob and self.get_rs_livre(instr.op):
+                return 0
+        return menor
+
+    def pular_ciclos(self, n):
+        """Avança n ciclos ociosos de uma vez, com o mesmo efeito de n chamadas a executar_ciclo."""
+        self._set(self, 'ciclo', self.ciclo + n)
+        self._executar(n)
+        causa = self._travamento_issue()
+        if causa != ISSUE_FIM:
+            self._contar_bolhas(causa, n)
+        if self.instrumentacao is not None:
+            self.instrumentacao.amostrar(self, causa, n)
+        if self.tracing or self.eventos:
+            self._set(self, 'eventos', [])
+
+    def _alocar_ufs(self):
+        """Separa as RS prontas que conseguem unidade funcional neste ciclo das que esperam."""
+        livres = dict(self._limite_ufs)
+        for rs in self.executando:
+            if rs.tipo in livres:
+                livres[rs.tipo] -= 1
+        admitidas, espera = [], []
+        for rs in self.prontas:
+            if rs.tipo in livres:
+                if livres[rs.tipo] <= 0:
+                    espera.append(rs)
+                    continue
+                livres[rs.tipo] -= 1
+            admitidas.append(rs)
+        if espera:
+            self._set_item(self.metricas, 'conflitos_uf', self.metricas['conflitos_uf'] + len(espera))
+        return admitidas, espera
+
+    def _executar(self, n=1):
+        """Avança n ciclos de EXECUTE; quem chega a zero entra na fila de conclusão."""
+        admitidas, espera = self.prontas, []
+        if admitidas and self._limite_ufs:
+            admitidas, espera = self._alocar_ufs()
+        executando = self.executando + admitidas if admitidas else self.executando
+        lt = self.linha_do_tempo
+        if lt is not None:
+            for rs in admitidas:
+                lt.iniciar(self.ciclo, rs.dest)
+        continuam, conclusoes, enderecos = [], None, None
+        for rs in executando:
+            self._set(rs, 'tempo_restante', rs.tempo_restante - n)
+            if rs.tempo_restante == 0:
+                if rs.tipo == 'MEM':
+                    # Endereço pronto: segue para a LSQ (estágio de memória), não para o CDB
+                    if enderecos is None:
+                        enderecos = list(self.enderecos)
+                    heapq.heappush(enderecos, (self.ciclo + 1, rs.indice, rs))
+                else:
+                    if conclusoes is None:
+                        conclusoes = list(self.conclusoes)
+                    heapq.heappush(conclusoes, (self.ciclo + 1, rs.indice, rs))
+                if lt is not None: lt.terminar(self.ciclo, rs.dest)
+            else:
+                continuam.append(rs)
+        if conclusoes is not None:
+            self._set(self, 'conclusoes', conclusoes)
+        if enderecos is not None:
+            self._set(self, 'enderecos', enderecos)
+        if self.prontas:
+            self._set(self, 'prontas', espera)
+        self._set(self, 'executando', continuam)
+
     def esta_terminado(self):
-        return len(self.fila_instrucoes) == 0 and self.itens_no_rob == 0
+        return self.pc >= len(self.prog_original) and self.itens_no_rob == 0
     
     def limpar_estado_apos_rob(self, rob_id_commitado):
         """Limpa RS e RAT e resetta o ROB para o estado pós-BEQ."""
         
-        self.log(f"--- [FLUSH DETECTADO] ---")
+        if self.linha_do_tempo is not None:
+            mais_novas = [(rob_id_commitado + 1 + k) % self.tamanho_rob for k in range(self.itens_no_rob - 1)]
+            self.linha_do_tempo.descartar(self.ciclo, mais_novas)
 
         # 1. Limpa entradas do RAT que apontam para o ROB/RS
-        for reg in self.rat:
-            rob_ref = self.rat[reg]
+        for reg, rob_ref in enumerate(self.rat):
             if rob_ref is not None:
                 # Se o ROB for posterior ou igual ao BEQ, o RAT precisa ser limpo
                 # para que o próximo uso do registrador leia do Banco de Registradores
                 if rob_ref != rob_id_commitado: # O BEQ no Head será limpo no commit
-                     self.rat[reg] = None
+                     self._set_item(self.rat, reg, None)
+        
+        # 2. Limpa todas as Estações de Reserva (RS) e a LSQ (tudo nela é mais novo que o BEQ)
+        if self._banco_rs is not None:
+            self._banco_rs.limpar(self._set) # Reset das colunas em bloco
+        else:
+            for rs in self.rs_add + self.rs_mul + self.rs_mem:
+                self._liberar_rs(rs)
         
-        # 2. Limpa todas as Estações de Reserva (RS)
-        todas_rs = self.rs_add + self.rs_mul
-        for rs in todas_rs:
-            rs.__init__(rs.nome, rs.tipo)
+        for campo in ('consumidores', 'prontas', 'executando', 'conclusoes', 'enderecos', 'lsq'):
+            self._set(self, campo, {} if campo == 'consumidores' else [])
         
         # 3. Limpa entradas do ROB (exceto o que está no Head - que é o BEQ e será desocupado)
-        self.rob = [EntradaROB(i) for i in range(self.tamanho_rob)]
-        self.head = (rob_id_commitado + 1) % self.tamanho_rob
-        self.tail = self.head
-        self.itens_no_rob = 0
-        self.log(f"Estado Especulativo (RS, RAT, ROB) Limpo.")
+        if self._banco_rob is not None:
+            self._banco_rob.limpar(self._set)
+        else:
+            self._set(self, 'rob', [EntradaROB(i) for i in range(self.tamanho_rob)])
+        self._set(self, 'head', (rob_id_commitado + 1) % self.tamanho_rob)
+        self._set(self, 'tail', self.head)
+        self._set(self, 'itens_no_rob', 0)
+        if self.tracing: self._evento(Estagio.FLUSH, rob=rob_id_commitado)
 
-    def atualizar_fila_instrucoes(self, target_index):
-        """Atualiza a fila de instruções para continuar a partir do alvo do desvio."""
-        
-        try:
-            target_index = int(target_index)
-            if 0 <= target_index < len(self.prog_original):
-                self.fila_instrucoes = [copy.deepcopy(instr) for instr in self.prog_original[target_index:]]
-                self.log(f"Fila de Instruções atualizada. Próxima instrução a ser emitida é: {self.fila_instrucoes[0]}")
-            else:
-                self.fila_instrucoes = []
-                self.log("Fila de Instruções zerada. Alvo de salto fora do programa.")
-        except ValueError:
-            self.log(f"Erro: Alvo de salto inválido ({target_index}). Fila de Instruções não atualizada.")
+    _RS_LIVRE = EstacaoReserva(None, None)
+
+    def _liberar_rs(self, rs):
+        livre = self._RS_LIVRE
+        for campo in ('busy', 'op', 'vj', 'vk', 'qj', 'qk', 'dest', 'tempo_restante'):
+            if getattr(rs, campo) != getattr(livre, campo):
+                self._set(rs, campo, getattr(livre, campo))
+
+    def descartar_mais_novas(self, rob_id, inclusive=False):
+        """Squash seletivo: descarta o que foi emitido depois da entrada rob_id (e ela
+        própria, com inclusive) e restaura o RAT salvo nela (rat_salvo)."""
+        n = self.tamanho_rob
+        mantidas = (rob_id - self.head) % n + (0 if inclusive else 1) # Do head até o BEQ, inclusive
+        descartadas = set()
+        for k in range(mantidas, self.itens_no_rob):
+            i = (self.head + k) % n
+            descartadas.add(i)
+            self._set(self.rob[i], 'busy', False)
+            self._set(self.rob[i], 'pronto', False)
+
+        if self.linha_do_tempo is not None:
+            self.linha_do_tempo.descartar(self.ciclo, descartadas)
+
+        liberadas = set()
+        for rs in self.rs_add + self.rs_mul + self.rs_mem:
+            if rs.busy and rs.dest in descartadas:
+                liberadas.add(rs.indice)
+                self._liberar_rs(rs)
+
+        if liberadas:
+            self._set(self, 'prontas', [rs for rs in self.prontas if rs.indice not in liberadas])
+            self._set(self, 'executando', [rs for rs in self.executando if rs.indice not in liberadas])
+            conclusoes = [c for c in self.conclusoes if c[1] not in liberadas]
+            heapq.heapify(conclusoes)
+            self._set(self, 'conclusoes', conclusoes)
+            if self.enderecos:
+                enderecos = [c for c in self.enderecos if c[1] not in liberadas]
+                heapq.heapify(enderecos)
+                self._set(self, 'enderecos', enderecos)
+        if self.lsq:
+            self._set(self, 'lsq', [e for e in self.lsq if e.rob not in descartadas])
+        self._set(self, 'consumidores', {
+            tag: [(rs, lado) for rs, lado in espera if rs.indice not in liberadas]
+            for tag, espera in self.consumidores.items() if tag not in descartadas})
+
+        # O snapshot pode citar produtores que já fizeram commit: esses voltam a ler do banco de registradores
+        self._set(self, 'rat', [t if t is not None and self.rob[t].busy else None
+                                for t in self.rob[rob_id].rat_salvo])
+        self._set(self, 'tail', (self.head + mantidas) % n)
+        self._set(self, 'itens_no_rob', mantidas)
+        if self.tracing: self._evento(Estagio.SQUASH, rob=rob_id, valor=len(descartadas))
+
+    def _resolver_desvios(self, rob_ids):
+        """Confere os BEQs que terminaram neste WRITE, do mais velho para o mais novo."""
+        for rob_id in sorted(rob_ids, key=lambda i: (i - self.head) % self.tamanho_rob):
+            entrada = self.rob[rob_id]
+            if not entrada.busy:
+                continue # Descartado pelo squash de um BEQ mais velho
+            instr = entrada.instrucao
+            tomado = bool(entrada.valor)
+            if tomado == entrada.previsto:
+                continue
+            if self.tracing: self._evento(Estagio.MISPREDICT, rob=rob_id, instr=instr.pc, valor=int(tomado))
+            if self.linha_do_tempo is not None: self.linha_do_tempo.marcar_mispredict(rob_id)
+            self._set_item(self.metricas, 'flushes', self.metricas['flushes'] + 1)
+            self._set_item(self.metricas, 'ciclos_desperdicados',
+                           self.metricas['ciclos_desperdicados'] + self.ciclo - entrada.ciclo_emissao)
+            self.descartar_mais_novas(rob_id)
+            self.atualizar_pc(instr.imm if tomado else instr.pc + 1)
+
+    def _treinar_preditor(self, instr, tomado, previsto):
+        self._set_item(self.metricas, 'desvios', self.metricas['desvios'] + 1)
+        if tomado != previsto:
+            self._set_item(self.metricas, 'mispredicts', self.metricas['mispredicts'] + 1)
+        self.preditor.atualizar(instr.pc, tomado, self)
+        if tomado:
+            self.btb.atualizar(instr.pc, instr.imm, self)
+
+    # --- Loads e stores ---
+    def _estagio_memoria(self):
+        """Endereços vindos das estações MEM entram na LSQ. O SW fica pronto para o
+        commit (e confere os LWs mais novos); o LW acessa a memória na hora."""
+        while self.enderecos and self.enderecos[0][0] <= self.ciclo:
+            enderecos = list(self.enderecos)
+            rs = heapq.heappop(enderecos)[2]
+            self._set(self, 'enderecos', enderecos)
+            pos = next(i for i, e in enumerate(self.lsq) if e.rob == rs.dest)
+            entrada = self.lsq[pos]
+            self._set(entrada, 'endereco', int(rs.vj) + self.rob[rs.dest].instrucao.imm)
+            if entrada.load:
+                self._acessar_memoria(pos, rs)
+                continue
+            self._set(entrada, 'valor', rs.vk)
+            self._set(self.rob[rs.dest], 'valor', rs.vk)
+            self._set(self.rob[rs.dest], 'pronto', True)
+            if self.linha_do_tempo is not None: self.linha_do_tempo.escrever(self.ciclo, rs.dest)
+            self._liberar_rs(rs)
+            self._verificar_ordem(pos)
+
+    def _acessar_memoria(self, pos, rs):
+        """LW na posição pos da LSQ: usa o dado do SW mais novo com o mesmo endereço
+        ou lê a memória, mesmo com SWs anteriores de endereço ainda desconhecido."""
+        entrada = self.lsq[pos]
+        fonte, especulativo = None, False
+        for anterior in reversed(self.lsq[:pos]):
+            if anterior.load:
+                continue
+            if anterior.endereco is None:
+                especulativo = True
+            elif anterior.endereco == entrada.endereco:
+                fonte = anterior
+                break
+        m = self.metricas
+        instr = self.rob[entrada.rob].instrucao
+        if fonte is not None:
+            valor, latencia = fonte.valor, 1
+            self._set_item(m, 'loads_encaminhados', m['loads_encaminhados'] + 1)
+            if self.tracing: self._evento(Estagio.ENCAMINHAMENTO, rob=entrada.rob, rs=rs.nome, instr=instr.pc, valor=fonte.rob)
+        else:
+            valor, latencia = self.memoria.get(entrada.endereco, 0), self.latencia_memoria
+            if self.tracing: self._evento(Estagio.LOAD, rob=entrada.rob, rs=rs.nome, instr=instr.pc, valor=entrada.endereco)
+        if especulativo:
+            self._set_item(m, 'loads_especulativos', m['loads_especulativos'] + 1)
+        self._set(entrada, 'iniciado', True)
+        self._set(entrada, 'fonte', None if fonte is None else fonte.rob)
+        self._set(rs, 'vk', valor) # A estação guarda o valor lido até o WRITE
+        conclusoes = list(self.conclusoes)
+        heapq.heappush(conclusoes, (self.ciclo + latencia, rs.indice, rs))
+        self._set(self, 'conclusoes', conclusoes)
+        if self.linha_do_tempo is not None: self.linha_do_tempo.terminar(self.ciclo + latencia - 1, rs.dest)
+
+    def _verificar_ordem(self, pos):
+        """O SW em pos acabou de ter o endereço calculado: um LW mais novo que já leu
+        o mesmo endereço de uma fonte mais velha (memória ou SW anterior) leu um
+        valor velho e é refeito, junto com tudo o que veio depois dele."""
+        store = self.lsq[pos]
+        n, head = self.tamanho_rob, self.head
+        idade_store = (store.rob - head) % n
+        for entrada in self.lsq[pos + 1:]:
+            if not (entrada.load and entrada.iniciado and entrada.endereco == store.endereco):
+                continue
+            if entrada.fonte is not None and (entrada.fonte - head) % n > idade_store:
+                continue # Recebeu o dado de um SW mais novo que este: valor certo
+            instr = self.rob[entrada.rob].instrucao
+            if self.tracing: self._evento(Estagio.VIOLACAO, rob=entrada.rob, instr=instr.pc, valor=store.endereco)
+            self._set_item(self.metricas, 'flushes_memoria', self.metricas['flushes_memoria'] + 1)
+            self.descartar_mais_novas(entrada.rob, inclusive=True)
+            self.atualizar_pc(instr.pc)
+            return
+
+    def atualizar_pc(self, target_index):
+        """Desvia a busca para o alvo do desvio (O(1): só muda o PC)."""
+        if 0 <= target_index < len(self.prog_original):
+            self._set(self, 'pc', target_index)
+        else:
+            self._set(self, 'pc', len(self.prog_original))
+        if self.tracing: self._evento(Estagio.PC, valor=self.pc)
 
     def executar_ciclo(self):
         if self.esta_terminado():
-            return "Simulação Finalizada."
+            return []
+
+        instrumentacao = self.instrumentacao
+        marcas = [perf_counter()] if instrumentacao is not None and instrumentacao.tempo_estagios else None
 
-        self.salvar_estado()
-        self.ciclo += 1
-        self.log_msg = "" 
+        if self.gravar_historico:
+            self.salvar_estado()
+        self._set(self, 'ciclo', self.ciclo + 1)
+        if self.tracing or self.eventos:
+            self._set(self, 'eventos', [])
         
         # --- 1. COMMIT ---
-        if self.itens_no_rob > 0:
+        # Até largura_commit entradas prontas por ciclo, em ordem, a partir do head
+        for _ in range(self.largura_commit):
+            if self.itens_no_rob == 0:
+                break
             rob_entry = self.rob[self.head]
-            if rob_entry.busy and rob_entry.pronto:
-                instr = rob_entry.instrucao
+            if not (rob_entry.busy and rob_entry.pronto):
+                break
+            instr = rob_entry.instrucao
+            
+            # --- LÓGICA DE ESPECULAÇÃO/FLUSH ---
+            if instr.codigo == Op.BEQ and self.resolucao_desvio == 'execute':
+                # Já resolvido (e recuperado, se preciso) no WRITE: só treina o preditor e sai do ROB
+                tomado = bool(rob_entry.valor)
+                if self.tracing: self._evento(Estagio.DESVIO, rob=rob_entry.id, instr=instr.pc, valor=int(tomado))
+                if self.linha_do_tempo is not None: self.linha_do_tempo.aposentar(self.ciclo, rob_entry.id)
+                self._treinar_preditor(instr, tomado, rob_entry.previsto)
+                self._set_item(self.metricas, 'commits', self.metricas['commits'] + 1)
+                self._set(rob_entry, 'busy', False)
+                self._set(self, 'head', (self.head + 1) % self.tamanho_rob)
+                self._set(self, 'itens_no_rob', self.itens_no_rob - 1)
+
+            elif instr.codigo == Op.BEQ:
+                val_op1 = self.regs[instr.rd]
+                val_op2 = self.regs[instr.rs1]
+                target_index = instr.imm # Alvo de salto é o s2 da instrução BEQ
+                
+                condicao_verdadeira = (val_op1 == val_op2)
                 
-                # --- LÓGICA DE ESPECULAÇÃO/FLUSH ---
-                if instr.op == 'BEQ':                    
-                    val_op1 = self.regs.get(instr.dest, 0)
-                    val_op2 = self.regs.get(instr.s1, 0)
-                    target_index = instr.s2 # Alvo de salto é o s2 da instrução BEQ
+                # Treina o preditor com o resultado real
+                self._treinar_preditor(instr, condicao_verdadeira, rob_entry.previsto)
+                
+                if condicao_verdadeira != rob_entry.previsto:
+                    # Erro de Predição -> FLUSH
+                    if self.tracing: self._evento(Estagio.MISPREDICT, rob=rob_entry.id, instr=instr.pc, valor=int(condicao_verdadeira))
+                    if self.linha_do_tempo is not None: self.linha_do_tempo.aposentar(self.ciclo, rob_entry.id, mispredict=True)
+                    self._set_item(self.metricas, 'flushes', self.metricas['flushes'] + 1)
+                    self._set_item(self.metricas, 'ciclos_desperdicados',
+                                   self.metricas['ciclos_desperdicados'] + self.ciclo - rob_entry.ciclo_emissao)
+                    
+                    # A. Limpar estado especulativo
+                    self.limpar_estado_apos_rob(rob_entry.id)
                     
-                    condicao_verdadeira = (val_op1 == val_op2)
+                    # B. Mudar o fluxo de controle (PC) para o caminho correto
+                    self.atualizar_pc(target_index if condicao_verdadeira else instr.pc + 1)
+                    break
                     
-                    if condicao_verdadeira:
-                        # Erro de Predição (Predict Not Taken) -> FLUSH
-                        self.log(f"[FLUSH] Erro de Especulação na {instr}. {instr.dest}({val_op1}) == {instr.s1}({val_op2}).")
-                        self.metricas['flushes'] += 1
-                        
-                        # A. Limpar estado especulativo
-                        self.limpar_estado_apos_rob(rob_entry.id)
-                        
-                        # B. Mudar o fluxo de controle (PC)
-                        self.atualizar_fila_instrucoes(target_index)
-                        
-                    else:
-                        # Sucesso de Predição (Predict Not Taken estava correto) -> Commit normal
-                        self.log(f"[COMMIT] Sucesso na Especulação da {instr} (Não tomou desvio).")
-                        self.metricas['commits'] += 1
-                        rob_entry.busy = False
-                        self.head = (self.head + 1) % self.tamanho_rob
-                        self.itens_no_rob -= 1
-                        instr.estado = "COMMITADO"
-                        
                 else:
-                    # Instrução normal (ADD, MUL, etc)
-                    self.log(f"[COMMIT] Instr {instr.id} ({instr.op}) no ROB {rob_entry.id} -> Regs")
-                    self.metricas['commits'] += 1
+                    # Sucesso de Predição -> Commit normal
+                    if self.tracing: self._evento(Estagio.DESVIO, rob=rob_entry.id, instr=instr.pc, valor=int(condicao_verdadeira))
+                    if self.linha_do_tempo is not None: self.linha_do_tempo.aposentar(self.ciclo, rob_entry.id)
+                    self._set_item(self.metricas, 'commits', self.metricas['commits'] + 1)
+                    self._set(rob_entry, 'busy', False)
+                    self._set(self, 'head', (self.head + 1) % self.tamanho_rob)
+                    self._set(self, 'itens_no_rob', self.itens_no_rob - 1)
+                    
+            elif instr.codigo == Op.SW:
+                # O store só escreve na memória de dados no commit, em ordem
+                entrada = self.lsq[0]
+                if self.tracing: self._evento(Estagio.COMMIT, rob=rob_entry.id, instr=instr.pc, valor=entrada.valor)
+                if self.linha_do_tempo is not None: self.linha_do_tempo.aposentar(self.ciclo, rob_entry.id)
+                self._set_item(self.metricas, 'commits', self.metricas['commits'] + 1)
+                self._set_item(self.memoria, entrada.endereco, entrada.valor)
+                self._set(self, 'lsq', self.lsq[1:])
+                self._set(rob_entry, 'busy', False)
+                self._set(self, 'head', (self.head + 1) % self.tamanho_rob)
+                self._set(self, 'itens_no_rob', self.itens_no_rob - 1)
 
-                    if self.rat[rob_entry.dest] == rob_entry.id:
-                        self.rat[rob_entry.dest] = None
-                    self.regs[rob_entry.dest] = rob_entry.valor
-                
-                    rob_entry.busy = False
-                    self.head = (self.head + 1) % self.tamanho_rob
-                    self.itens_no_rob -= 1
-                    instr.estado = "COMMITADO"
+            else:
+                # Instrução normal (ADD, MUL, LW, etc)
+                if self.tracing: self._evento(Estagio.COMMIT, rob=rob_entry.id, instr=instr.pc, valor=rob_entry.valor)
+                if self.linha_do_tempo is not None: self.linha_do_tempo.aposentar(self.ciclo, rob_entry.id)
+                self._set_item(self.metricas, 'commits', self.metricas['commits'] + 1)
+
+                if self.rat[rob_entry.dest] == rob_entry.id:
+                    self._set_item(self.rat, rob_entry.dest, None)
+                self._set_item(self.regs, rob_entry.dest, rob_entry.valor)
+                if instr.codigo == Op.LW:
+                    self._set(self, 'lsq', self.lsq[1:])
+            
+                self._set(rob_entry, 'busy', False)
+                self._set(self, 'head', (self.head + 1) % self.tamanho_rob)
+                self._set(self, 'itens_no_rob', self.itens_no_rob - 1)
         
+        if marcas is not None: marcas.append(perf_counter())
+
         # --- 2. WRITE RESULT ---
-        todas_rs = self.rs_add + self.rs_mul
-        for rs in todas_rs:
-            if rs.busy and rs.tempo_restante == 0 and rs.op is not None:
+        # Só as RS cujo ciclo de término chegou; o broadcast visita apenas os consumidores da tag.
+        # Com num_cdb, a arbitragem segue a ordem da fila (término, índice da RS) e o resto espera.
+        if self.conclusoes and self.conclusoes[0][0] <= self.ciclo:
+            conclusoes = list(self.conclusoes)
+            prontas = list(self.prontas)
+            desvios = []
+            barramentos = self.num_cdb
+            while conclusoes and conclusoes[0][0] <= self.ciclo:
+                if barramentos is not None:
+                    if barramentos == 0:
+                        esperando = sum(1 for c in conclusoes if c[0] <= self.ciclo)
+                        self._set_item(self.metricas, 'conflitos_cdb', self.metricas['conflitos_cdb'] + esperando)
+                        break
+                    barramentos -= 1
+                rs = heapq.heappop(conclusoes)[2]
                 resultado = 0
                 vj = int(rs.vj) if rs.vj is not None else 0
                 vk = int(rs.vk) if rs.vk is not None else 0
@@ -231,86 +924,291 @@ class SimuladorTomasulo:
                 elif rs.op == 'SUB': resultado = vj - vk
                 elif rs.op == 'MUL': resultado = vj * vk
                 elif rs.op == 'DIV': resultado = int(vj / vk) if vk != 0 else 0
+                elif rs.op == 'LW': resultado = vk # Valor lido (ver _acessar_memoria)
+                elif rs.op == 'BEQ' and self.resolucao_desvio == 'execute':
+                    resultado = 1 if vj == vk else 0 # 1 = tomado
+                    desvios.append(rs.dest)
                 
-                self.log(f"[WRITE] {rs.nome} terminou. Val={resultado} -> ROB {rs.dest}")
+                if self.tracing: self._evento(Estagio.WRITE, rob=rs.dest, rs=rs.nome, instr=self.rob[rs.dest].instrucao.pc, valor=resultado)
+                if self.linha_do_tempo is not None: self.linha_do_tempo.escrever(self.ciclo, rs.dest)
                 
-                # Se for BEQ, o valor não importa, apenas a sinalização de pronto.
-                self.rob[rs.dest].valor = resultado
-                self.rob[rs.dest].pronto = True
+                # Com resolução no commit o valor do BEQ não importa, apenas a sinalização de pronto.
+                self._set(self.rob[rs.dest], 'valor', resultado)
+                self._set(self.rob[rs.dest], 'pronto', True)
                 
-                for outra_rs in todas_rs:
-                    if outra_rs.busy:
-                        if outra_rs.qj == rs.dest:
-                            outra_rs.vj = resultado
-                            outra_rs.qj = None
-                        if outra_rs.qk == rs.dest:
-                            outra_rs.vk = resultado
-                            outra_rs.qk = None
+                consumidores = self.consumidores.get(rs.dest)
+                if consumidores:
+                    for outra_rs, lado in consumidores:
+                        if lado == 'j':
+                            self._set(outra_rs, 'vj', resultado)
+                            self._set(outra_rs, 'qj', None)
+                        else:
+                            self._set(outra_rs, 'vk', resultado)
+                            self._set(outra_rs, 'qk', None)
+                        if outra_rs.qj is None and outra_rs.qk is None:
+                            prontas.append(outra_rs)
+                    self._set_item(self.consumidores, rs.dest, [])
                 
-                rs.busy = False
-                rs.op = None
+                self._set(rs, 'busy', False)
+                self._set(rs, 'op', None)
+            self._set(self, 'conclusoes', conclusoes)
+            self._set(self, 'prontas', prontas)
+            if desvios:
+                self._resolver_desvios(desvios)
+
+        # --- MEMÓRIA (LSQ) --- (o tempo conta no WRITE)
+        if self.enderecos and self.enderecos[0][0] <= self.ciclo:
+            self._estagio_memoria()
+
+        if marcas is not None: marcas.append(perf_counter())
 
         # --- 3. EXECUTE ---
-        for rs in todas_rs:
-            if rs.busy:
-                if rs.qj is None and rs.qk is None:
-                    if rs.tempo_restante > 0:
-                        rs.tempo_restante -= 1
+        if self.executando or self.prontas:
+            self._executar()
+        if marcas is not None: marcas.append(perf_counter())
 
         # --- 4. ISSUE ---
-        if self.fila_instrucoes:
+        # Até largura_issue instruções em ordem; para no primeiro travamento ou desvio previsto tomado
+        causa = ISSUE_OK
+        for k in range(self.largura_issue):
+            if self.pc >= len(self.prog_original):
+                if k == 0: causa = ISSUE_FIM
+                break
             tem_espaco_rob = self.itens_no_rob < self.tamanho_rob
-            instr = self.fila_instrucoes[0]
+            instr = self.prog_original[self.pc]
             rs_livre = self.get_rs_livre(instr.op)
+            memoria = instr.codigo in _OPS_MEMORIA
             
-            if not tem_espaco_rob or not rs_livre:
-                self.metricas['bolhas'] += 1
+            if not tem_espaco_rob or not rs_livre or (memoria and len(self.lsq) >= self.tamanho_lsq):
+                if not tem_espaco_rob: causa = ISSUE_ROB_CHEIO
+                elif not rs_livre: causa = 'rs_' + CLASSES_RS[instr.op]
+                else: causa = ISSUE_LSQ_CHEIO
+                self._contar_bolhas(causa)
+                break
             
-            if tem_espaco_rob and rs_livre:
-                self.fila_instrucoes.pop(0)
-                
-                rob_id = self.tail
-                self.rob[rob_id].busy = True
-                self.rob[rob_id].instrucao = instr
-                self.rob[rob_id].dest = instr.dest
-                self.rob[rob_id].pronto = False
-                self.rob[rob_id].tipo = instr.op
-                
-                self.tail = (self.tail + 1) % self.tamanho_rob
-                self.itens_no_rob += 1
-
-                rs_livre.busy = True
-                rs_livre.op = instr.op
-                rs_livre.dest = rob_id
-                rs_livre.tempo_restante = self.latencias.get(instr.op, 1)
-
-                if instr.s1 in self.rat and self.rat[instr.s1] is not None:
-                    rob_produtor = self.rat[instr.s1]
-                    if self.rob[rob_produtor].pronto:
-                        rs_livre.vj = self.rob[rob_produtor].valor
-                    else:
-                        rs_livre.qj = rob_produtor
+            self._set(self, 'pc', self.pc + 1)
+            
+            rob_id = self.tail
+            self._set(self.rob[rob_id], 'busy', True)
+            self._set(self.rob[rob_id], 'instrucao', instr)
+            self._set(self.rob[rob_id], 'dest', instr.rd)
+            self._set(self.rob[rob_id], 'pronto', False)
+            self._set(self.rob[rob_id], 'tipo', instr.op)
+            
+            self._set(self, 'tail', (self.tail + 1) % self.tamanho_rob)
+            self._set(self, 'itens_no_rob', self.itens_no_rob + 1)
+
+            self._set(rs_livre, 'busy', True)
+            self._set(rs_livre, 'op', instr.op)
+            self._set(rs_livre, 'dest', rob_id)
+            self._set(rs_livre, 'tempo_restante', self.latencias.get(instr.op, 1))
+
+            rob_produtor = self.rat[instr.rs1]
+            if rob_produtor is not None:
+                if self.rob[rob_produtor].pronto:
+                    self._set(rs_livre, 'vj', self.rob[rob_produtor].valor)
                 else:
-                    rs_livre.vj = self.regs.get(instr.s1, 0)
-
-                # O segundo operando (s2) pode ser um registrador, um literal (para ADD/MUL, etc) 
-                # ou o ALVO de salto (para BEQ).
-                if instr.s2 in self.rat and self.rat[instr.s2] is not None:
-                    rob_produtor = self.rat[instr.s2]
-                    if self.rob[rob_produtor].pronto:
-                        rs_livre.vk = self.rob[rob_produtor].valor
-                    else:
-                        rs_livre.qk = rob_produtor
-                elif instr.s2 in self.regs:
-                    rs_livre.vk = self.regs[instr.s2]
+                    self._set(rs_livre, 'qj', rob_produtor)
+                    self._esperar(rob_produtor, rs_livre, 'j')
+            else:
+                self._set(rs_livre, 'vj', self.regs[instr.rs1])
+
+            # O segundo operando (s2) pode ser um registrador, um literal (para ADD/MUL, etc) 
+            # ou o ALVO de salto (para BEQ); o decodificador já separou rs2 de imm.
+            # No LW, vk é o deslocamento; no SW, o dado a gravar (rd).
+            if (instr.codigo == Op.BEQ and self.resolucao_desvio == 'execute') or instr.codigo == Op.SW:
+                # Resolução no EXECUTE: o segundo operando comparado (rd) também é renomeado
+                rob_produtor = self.rat[instr.rd]
+                if rob_produtor is None:
+                    self._set(rs_livre, 'vk', self.regs[instr.rd])
+                elif self.rob[rob_produtor].pronto:
+                    self._set(rs_livre, 'vk', self.rob[rob_produtor].valor)
+                else:
+                    self._set(rs_livre, 'qk', rob_produtor)
+                    self._esperar(rob_produtor, rs_livre, 'k')
+            elif instr.rs2 is None:
+                self._set(rs_livre, 'vk', instr.imm)
+            elif self.rat[instr.rs2] is not None:
+                rob_produtor = self.rat[instr.rs2]
+                if self.rob[rob_produtor].pronto:
+                    self._set(rs_livre, 'vk', self.rob[rob_produtor].valor)
                 else:
-                    # Trata o s2 como um literal (valor) ou alvo de salto (para BEQ)
-                    try: rs_livre.vk = int(instr.s2)
-                    except: rs_livre.vk = 0
+                    self._set(rs_livre, 'qk', rob_produtor)
+                    self._esperar(rob_produtor, rs_livre, 'k')
+            else:
+                self._set(rs_livre, 'vk', self.regs[instr.rs2])
 
-                if instr.op != 'BEQ':
-                    self.rat[instr.dest] = rob_id
-                
-                self.log(f"[ISSUE] {instr.op} despachada p/ ROB {rob_id}")
+            if rs_livre.qj is None and rs_livre.qk is None:
+                self._set(self, 'prontas', self.prontas + [rs_livre])
+
+            if memoria:
+                self._set(self, 'lsq', self.lsq + [EntradaLSQ(rob_id, instr.codigo == Op.LW)])
+                if instr.codigo == Op.LW:
+                    self._set(self.rob[rob_id], 'rat_salvo', tuple(self.rat)) # Para refazer o LW numa violação
+            if instr.codigo != Op.BEQ:
+                if instr.codigo != Op.SW:
+                    self._set_item(self.rat, instr.rd, rob_id)
+            else:
+                # A busca segue o alvo previsto quando o BTB o conhece
+                alvo = self.btb.alvo(instr.pc) if self.preditor.prever(instr.pc) else None
+                self._set(self.rob[rob_id], 'previsto', alvo is not None)
+                self._set(self.rob[rob_id], 'ciclo_emissao', self.ciclo)
+                if self.resolucao_desvio == 'execute':
+                    self._set(self.rob[rob_id], 'rat_salvo', tuple(self.rat))
+                if alvo is not None:
+                    self._set(self, 'pc', alvo if 0 <= alvo < len(self.prog_original) else len(self.prog_original))
+            
+            if self.tracing: self._evento(Estagio.ISSUE, rob=rob_id, rs=rs_livre.nome, instr=instr.pc)
+            if self.linha_do_tempo is not None:
+                self.linha_do_tempo.emitir(self.ciclo, instr.pc, rob_id, rs_livre.qj, rs_livre.qk)
+            if instr.codigo == Op.BEQ and self.rob[rob_id].previsto:
+                break # A busca foi redirecionada para o alvo
                 
-        return self.log_msg
\ No newline at end of file
+
+        if instrumentacao is not None:
+            if marcas is not None:
+                marcas.append(perf_counter())
+                instrumentacao.cronometrar(marcas)
+            instrumentacao.amostrar(self, causa)
+        return self.eventos
+
+
+def _ler_pares(pares, conversor):
+    """Converte ['MUL=8', 'DIV=12'] em {'MUL': 8, 'DIV': 12}."""
+    resultado = {}
+    for par in pares:
+        chave, sep, valor = par.partition('=')
+        if not sep:
+            raise ValueError(f"Esperado CHAVE=VALOR, recebido '{par}'")
+        resultado[chave.strip().upper()] = conversor(valor)
+    return resultado
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog='python -m tomasulo_engine',
+                                     description='Executa um programa no simulador de Tomasulo sem interface gráfica.')
+    parser.add_argument('programa', nargs='?',
+                        help='arquivo .s (uma instrução por linha; rótulos, comentários e diretivas)')
+    parser.add_argument('--retomar', default=None, metavar='SNAPSHOT',
+                        help='continua de um snapshot em vez de carregar um programa (a máquina vem dele)')
+    parser.add_argument('--salvar-snapshot', default=None, metavar='ARQUIVO',
+                        help='grava um snapshot do estado quando a execução para (ex.: em --max-cycles)')
+    parser.add_argument('--sem-cache', action='store_true',
+                        help='não grava nem reaproveita o programa montado no cache em disco')
+    parser.add_argument('--lat', nargs='+', action='extend', default=[], metavar='OP=CICLOS',
+                        help='latência por operação, ex.: --lat MUL=8 DIV=12')
+    parser.add_argument('--reg', nargs='+', action='extend', default=[], metavar='RN=VALOR',
+                        help='valores iniciais dos registradores, ex.: --reg R1=10 R2=20')
+    parser.add_argument('--rob', type=int, default=None, help='tamanho do ROB')
+    parser.add_argument('--rs-add', type=int, default=None, help='estações da classe ADD')
+    parser.add_argument('--rs-mul', type=int, default=None, help='estações da classe MUL')
+    parser.add_argument('--rs-mem', type=int, default=None, help='estações da classe MEM (LW/SW)')
+    parser.add_argument('--lsq', type=int, default=None, help='entradas da fila de loads/stores')
+    parser.add_argument('--mem-lat', type=int, default=None, help='latência de um LW que lê a memória')
+    parser.add_argument('--mem', nargs='+', action='extend', default=[], metavar='ENDERECO=VALOR',
+                        help='valores iniciais da memória de dados')
+    parser.add_argument('--backend', choices=BACKENDS, default=None,
+                        help="'compacto' guarda ROB/RS em colunas (menos memória em máquinas grandes)")
+    parser.add_argument('--preditor', choices=list(PREDITORES), default=None,
+                        help='preditor de desvios (padrão: nao_tomado)')
+    parser.add_argument('--btb', type=int, default=None, help='entradas do BTB')
+    parser.add_argument('--resolucao', choices=RESOLUCOES, default=None,
+                        help="onde o BEQ é resolvido ('execute' recupera só as instruções mais novas)")
+    parser.add_argument('--issue', type=int, default=None, help='instruções emitidas por ciclo')
+    parser.add_argument('--commit', type=int, default=None, help='commits por ciclo')
+    parser.add_argument('--cdb', type=int, default=None, help='barramentos de resultado (0 = ilimitado)')
+    parser.add_argument('--uf-add', type=int, default=None, help='unidades funcionais ADD (0 = uma por estação)')
+    parser.add_argument('--uf-mul', type=int, default=None, help='unidades funcionais MUL (0 = uma por estação)')
+    parser.add_argument('--max-cycles', type=int, default=None)
+    parser.add_argument('--amostrar', type=int, default=None, metavar='INTERVALO',
+                        help='estima ciclos/IPC por amostragem: uma janela detalhada a cada INTERVALO '
+                             'instruções, o resto em modo funcional (ver tomasulo_amostragem)')
+    parser.add_argument('--aquecimento', type=int, default=2000,
+                        help='instruções detalhadas descartadas no início de cada janela')
+    parser.add_argument('--janela', type=int, default=10000, help='instruções medidas por janela')
+    parser.add_argument('--confianca', type=float, default=0.95, help='nível do intervalo de confiança')
+    parser.add_argument('--stats', action='store_true',
+                        help='inclui ocupação, uso de RS e causas de travamento no relatório')
+    parser.add_argument('--tempo-estagios', action='store_true',
+                        help='com --stats, mede o tempo de cada estágio do simulador')
+    parser.add_argument('--trace', default=None, metavar='ARQUIVO',
+                        help='grava os eventos da simulação (.jsonl ou binário compacto para outras extensões)')
+    parser.add_argument('--caminho-critico', action='store_true',
+                        help='inclui no relatório a divisão dos ciclos do caminho crítico')
+    parser.add_argument('--pipeline', type=int, default=None, metavar='N',
+                        help='imprime o diagrama de pipeline das N primeiras instruções')
+    parser.add_argument('--cache-resultados', nargs='?', const=tomasulo_resultados.ARQUIVO_PADRAO, default=None,
+                        metavar='ARQUIVO', help='reaproveita o resultado de uma execução idêntica já feita '
+                        '(sqlite; padrão: resultados.sqlite no cache de programas). Ignorado com opções que '
+                        'precisam da simulação (--stats, --trace, --replay, linha do tempo, --salvar-snapshot)')
+    parser.add_argument('--replay', default=None, metavar='ARQUIVO',
+                        help='grava o estado de cada ciclo para rever no GUI (python tomasulo_gui.py --replay ARQUIVO)')
+    parser.add_argument('--chrome-trace', default=None, metavar='ARQUIVO',
+                        help='grava a linha do tempo das instruções no formato Trace Event (chrome://tracing)')
+    args = parser.parse_args(argv)
+    if (args.programa is None) == (args.retomar is None):
+        parser.error("informe o programa ou --retomar SNAPSHOT")
+
+    try:
+        latencias = _ler_pares(args.lat, int)
+        regs = _ler_pares(args.reg, int)
+        memoria = {int(e): v for e, v in _ler_pares(args.mem, int).items()}
+    except ValueError as e:
+        parser.error(str(e))
+
+    sim = SimuladorTomasulo()
+    num_rs = {c: n for c, n in (('ADD', args.rs_add), ('MUL', args.rs_mul), ('MEM', args.rs_mem)) if n is not None}
+    num_ufs = {c: n for c, n in (('ADD', args.uf_add), ('MUL', args.uf_mul)) if n is not None}
+    sim.set_config(latencias, regs or sim.regs_iniciais, tamanho_rob=args.rob, num_rs=num_rs,
+                   backend=args.backend, preditor=args.preditor, tamanho_btb=args.btb,
+                   resolucao_desvio=args.resolucao, largura_issue=args.issue,
+                   largura_commit=args.commit, num_cdb=args.cdb, num_ufs=num_ufs,
+                   tamanho_lsq=args.lsq, latencia_memoria=args.mem_lat, memoria=memoria or None)
+    sim.reset()
+    if args.retomar:
+        sim.load_snapshot(args.retomar)
+    else:
+        sim.carregar_arquivo(args.programa, cache=not args.sem_cache)
+    if args.amostrar:
+        try:
+            print(json.dumps(amostrar(sim, args.amostrar, args.aquecimento, args.janela, args.confianca),
+                             allow_nan=False))
+        except ValueError as e:
+            parser.error(str(e))
+        return
+    if args.stats:
+        sim.instrumentacao = Instrumentacao(tempo_estagios=args.tempo_estagios)
+    if args.trace:
+        sim.sink = SinkJSONL(args.trace) if args.trace.endswith('.jsonl') else SinkBinario(args.trace)
+    if args.caminho_critico or args.pipeline or args.chrome_trace:
+        sim.linha_do_tempo = LinhaDoTempo()
+    try:
+        if args.replay:
+            relatorio = sim.gravar_replay(args.replay, max_cycles=args.max_cycles)
+        elif args.cache_resultados and not args.salvar_snapshot and tomasulo_resultados.cacheavel(sim):
+            cache = tomasulo_resultados.CacheResultados(args.cache_resultados)
+            try:
+                relatorio, _ = tomasulo_resultados.executar(sim, cache, max_cycles=args.max_cycles)
+            finally:
+                cache.fechar()
+        else:
+            relatorio = sim.run(max_cycles=args.max_cycles, log=args.trace is not None)
+    finally:
+        sim.sink.fechar()
+    if args.salvar_snapshot:
+        sim.save_snapshot(args.salvar_snapshot)
+    lt = sim.linha_do_tempo
+    if args.caminho_critico:
+        relatorio['caminho_critico'] = caminho_critico(lt, sim.ciclo)['categorias']
+    if args.chrome_trace:
+        exportar_chrome_trace(lt, sim.prog_original, args.chrome_trace)
+    if args.pipeline:
+        print(diagrama(lt, sim.prog_original, quantidade=args.pipeline))
+    print(json.dumps(relatorio))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 # tomasulo_gui.py
+import argparse
 import tkinter as tk
-from tkinter import ttk, messagebox, font
-from tomasulo_engine import SimuladorTomasulo
+from time import perf_counter
+from tkinter import ttk, messagebox, font, filedialog
+from tomasulo_engine import SimuladorTomasulo, RESOLUCOES
+from tomasulo_predictor import PREDITORES
+from tomasulo_trace import Estagio, formatar
+from tomasulo_stats import Instrumentacao
+from tomasulo_replay import Replay, linhas_exibicao
 
 # --- PALETA DE CORES (Modern UI) ---
 COLORS = {
@@ -17,13 +23,38 @@ COLORS = {
     'border': '#DCDFE3'         
 }
 
+# Modo "Executar": a simulação roda em lotes agendados com after(), e a tela é
+# redesenhada no máximo QUADROS_POR_SEGUNDO vezes por segundo
+QUADROS_POR_SEGUNDO = 30
+FRACAO_SIMULACAO = 0.8 # Parte de cada quadro gasta simulando (o resto fica para o Tk)
+
+# Tag (cor) do log para cada estágio
+TAGS_ESTAGIO = {
+    Estagio.ISSUE: "ISSUE",
+    Estagio.WRITE: "WRITE",
+    Estagio.COMMIT: "COMMIT",
+    Estagio.DESVIO: "COMMIT",
+    Estagio.MISPREDICT: "FLUSH",
+    Estagio.FLUSH: "FLUSH",
+    Estagio.SQUASH: "FLUSH",
+    Estagio.VIOLACAO: "FLUSH",
+}
+
 class TomasuloGUI:
     def __init__(self, root):
         self.sim = SimuladorTomasulo()
+        self.sim.instrumentacao = Instrumentacao() # Alimenta o detalhamento do relatório
         self.root = root
         self.root.title("Simulador Tomasulo - Architecture View")
         self.root.geometry("1280x850")
         self.root.configure(bg=COLORS['bg_app'])
+        self.rodando = None # id do after() do próximo lote enquanto "Executar" está ativo
+        self.alvo_execucao = None # Ciclo em que "Executar N" para (None = até o fim)
+        self.lote = 64 # Ciclos por chamada a run(), ajustado ao orçamento do quadro
+        self.linhas_tabela = {} # tabela -> [(iid, valores)] do último quadro desenhado
+        self.texto_programa = None # Fonte do último programa salvo (mantém rótulos, comentários e .data)
+        self.replay = None # Modo replay: mostra os quadros de um arquivo gravado em vez de self.sim
+        self.ciclo_replay = 0
         
         self.font_title = font.Font(family="Segoe UI", size=14, weight="bold")
         self.font_subtitle = font.Font(family="Segoe UI", size=11, weight="bold")
@@ -55,12 +86,29 @@ class TomasuloGUI:
         tk.Label(info_frame, text="Simulador Tomasulo", font=("Segoe UI", 18, "bold"), bg=COLORS['bg_app'], fg=COLORS['text']).pack(anchor="w")
         self.lbl_ciclo = tk.Label(info_frame, text="Ciclo: 0", font=("Segoe UI", 12), bg=COLORS['bg_app'], fg=COLORS['text_light'])
         self.lbl_ciclo.pack(anchor="w")
+        goto_frame = tk.Frame(info_frame, bg=COLORS['bg_app'])
+        goto_frame.pack(anchor="w", pady=(5, 0))
+        tk.Label(goto_frame, text="Ir para ciclo:", font=self.font_ui, bg=COLORS['bg_app'], fg=COLORS['text_light']).pack(side=tk.LEFT)
+        self.entry_ciclo = tk.Entry(goto_frame, width=8, relief="solid", bd=1)
+        self.entry_ciclo.pack(side=tk.LEFT, padx=5)
+        self.entry_ciclo.bind("<Return>", lambda e: self.goto_cycle())
+        self.create_button(goto_frame, "Ir", self.goto_cycle, COLORS['secondary'], COLORS['text'])
+        run_frame = tk.Frame(info_frame, bg=COLORS['bg_app'])
+        run_frame.pack(anchor="w", pady=(5, 0))
+        self.create_button(run_frame, "▶ Executar", self.executar, COLORS['success'], "white")
+        self.create_button(run_frame, "⏸ Pausar", self.pausar, COLORS['secondary'], COLORS['text'])
+        self.entry_n = tk.Entry(run_frame, width=8, relief="solid", bd=1)
+        self.entry_n.insert(0, "100")
+        self.entry_n.pack(side=tk.LEFT, padx=5)
+        self.entry_n.bind("<Return>", lambda e: self.executar_n())
+        self.create_button(run_frame, "Executar N", self.executar_n, COLORS['secondary'], COLORS['text'])
 
         btn_frame = tk.Frame(header_frame, bg=COLORS['bg_app'])
         btn_frame.pack(side=tk.RIGHT)
         self.create_button(btn_frame, "⚙ Config", self.open_config_window, COLORS['secondary'], COLORS['text'])
         self.create_button(btn_frame, "↺ Reset", self.reset_sim, COLORS['secondary'], COLORS['danger'])
         self.create_button(btn_frame, "📊 Relatório", self.mostrar_relatorio, COLORS['secondary'], COLORS['text'])
+        self.create_button(btn_frame, "📂 Replay", self.escolher_replay, COLORS['secondary'], COLORS['text'])
         tk.Frame(btn_frame, width=20, bg=COLORS['bg_app']).pack(side=tk.LEFT)
         self.create_button(btn_frame, "❮ Voltar", self.prev_step, "#FFC107", "#333") 
         self.create_button(btn_frame, "Avançar ❯", self.next_step, COLORS['primary'], "white", bold=True)
@@ -131,43 +179,175 @@ class TomasuloGUI:
         scroll.config(command=tree.yview)
         return tree
 
-    def log_msg(self, msg):
+    def log_msg(self, msg, tag="NORMAL"):
+        self.txt_log.config(state="normal")
+        self.txt_log.insert(tk.END, msg + "\n", tag)
+        self.txt_log.see(tk.END)
+        self.txt_log.config(state="disabled")
+
+    def log_eventos(self, eventos):
+        # O texto só é montado aqui; a cor vem do estágio do evento
         self.txt_log.config(state="normal")
-        lines = msg.split("\n")
-        for line in lines:
-            if not line: continue
-            tag = "NORMAL"
-            if "[ISSUE]" in line: tag = "ISSUE"
-            elif "[COMMIT]" in line: tag = "COMMIT"
-            elif "[FLUSH]" in line: tag = "FLUSH"
-            elif "[WRITE]" in line: tag = "WRITE"
-            self.txt_log.insert(tk.END, line + "\n", tag)
+        prog = self.sim.prog_original
+        for ev in eventos:
+            self.txt_log.insert(tk.END, formatar(ev, prog) + "\n", TAGS_ESTAGIO.get(ev.estagio, "NORMAL"))
         self.txt_log.see(tk.END)
         self.txt_log.config(state="disabled")
 
+    def log_eventos_replay(self, ciclo):
+        # No replay os eventos já vêm formatados, com o estágio para a cor
+        self.txt_log.config(state="normal")
+        for estagio, texto in self.replay.quadro(ciclo)[1]:
+            self.txt_log.insert(tk.END, texto + "\n", TAGS_ESTAGIO.get(Estagio(estagio), "NORMAL"))
+        self.txt_log.see(tk.END)
+        self.txt_log.config(state="disabled")
+
+    def limpar_log(self, msg=None):
+        self.txt_log.config(state="normal")
+        self.txt_log.delete(1.0, tk.END)
+        if msg: self.txt_log.insert(tk.END, f"--- {msg} ---\n", "WRITE")
+        self.txt_log.config(state="disabled")
+
+    def ciclo_atual(self):
+        return self.ciclo_replay if self.replay else self.sim.ciclo
+
+    def terminado(self):
+        if self.replay:
+            return self.ciclo_replay >= self.replay.ultimo_ciclo
+        return self.sim.esta_terminado()
+
+    def abrir_replay(self, caminho):
+        self.pausar()
+        try:
+            replay = Replay(caminho)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Replay inválido", str(e))
+            return
+        self.fechar_replay()
+        self.replay = replay
+        self.ciclo_replay = replay.primeiro_ciclo
+        self.limpar_log(f"Replay {caminho}: ciclos {replay.primeiro_ciclo} a {replay.ultimo_ciclo} (Reset volta à simulação)")
+        self.update_view()
+
+    def escolher_replay(self):
+        caminho = filedialog.askopenfilename(title="Abrir replay")
+        if caminho: self.abrir_replay(caminho)
+
+    def fechar_replay(self):
+        if self.replay is not None:
+            self.replay.fechar()
+            self.replay = None
+
     def next_step(self):
+        self.pausar()
+        if self.replay:
+            if self.terminado():
+                self.mostrar_relatorio()
+                return
+            self.ciclo_replay += 1
+            self.log_eventos_replay(self.ciclo_replay)
+            self.update_view()
+            return
         if self.sim.esta_terminado():
             self.mostrar_relatorio()
             return
-        msg = self.sim.executar_ciclo()
-        if msg: self.log_msg(msg)
+        eventos = self.sim.executar_ciclo()
+        if eventos: self.log_eventos(eventos)
         self.update_view()
         if self.sim.esta_terminado(): self.mostrar_relatorio()
 
     def prev_step(self):
-        msg = self.sim.voltar_ciclo()
-        if msg:
-            self.txt_log.config(state="normal")
-            self.txt_log.delete(1.0, tk.END) 
-            self.txt_log.insert(tk.END, f"--- {msg} ---\n", "WRITE")
-            self.txt_log.config(state="disabled")
+        self.pausar()
+        if self.replay:
+            if self.ciclo_replay > self.replay.primeiro_ciclo:
+                self.ciclo_replay -= 1
+                self.limpar_log(f"Voltou para Ciclo {self.ciclo_replay}")
+        else:
+            msg = self.sim.voltar_ciclo()
+            if msg: self.limpar_log(msg)
+        self.update_view()
+
+    def goto_cycle(self):
+        try:
+            alvo = int(self.entry_ciclo.get())
+        except ValueError:
+            messagebox.showerror("Ciclo inválido", "Informe um número de ciclo.")
+            return
+        self.pausar()
+        if self.replay:
+            # Só lê o arquivo: quadro-chave mais próximo + deltas, sem re-simular
+            ciclo = self.ciclo_replay = self.replay.ciclo_valido(alvo)
+        else:
+            ciclo = self.sim.goto_cycle(alvo)
+        self.limpar_log(f"Foi para Ciclo {ciclo}")
+        if self.replay: self.log_eventos_replay(ciclo)
+        self.update_view()
+
+    def executar(self, n=None):
+        if self.rodando is not None or self.terminado():
+            return
+        self.alvo_execucao = None if n is None else self.ciclo_atual() + n
+        self.log_msg(f"--- Executando a partir do Ciclo {self.ciclo_atual()} ---", "WRITE")
+        self.rodando = self.root.after(0, self._tocar_replay if self.replay else self._rodar_lote)
+
+    def executar_n(self):
+        try:
+            n = int(self.entry_n.get())
+        except ValueError:
+            messagebox.showerror("Valor inválido", "Informe quantos ciclos executar.")
+            return
+        if n > 0: self.executar(n)
+
+    def pausar(self):
+        if self.rodando is None:
+            return
+        self.root.after_cancel(self.rodando)
+        self.rodando = None
+        self.update_view()
+        self.log_msg(f"--- Pausado no Ciclo {self.ciclo_atual()} ---", "WRITE")
+
+    def _rodar_lote(self):
+        # Simula até esgotar a fatia do quadro, redesenha uma vez e agenda o próximo
+        inicio = perf_counter()
+        quadro = 1 / QUADROS_POR_SEGUNDO
+        limite = inicio + quadro * FRACAO_SIMULACAO
+        sim, alvo = self.sim, self.alvo_execucao
+        while not sim.esta_terminado() and (alvo is None or sim.ciclo < alvo) and perf_counter() < limite:
+            passo = self.lote if alvo is None else min(self.lote, alvo - sim.ciclo)
+            t0 = perf_counter()
+            sim.run(max_cycles=sim.ciclo + passo, checkpoints=True) # Headless, mas voltar/goto continuam valendo
+            dt = perf_counter() - t0
+            if dt < quadro / 8: self.lote *= 2
+            elif dt > quadro / 2 and self.lote > 1: self.lote //= 2
         self.update_view()
 
+        if sim.esta_terminado() or (alvo is not None and sim.ciclo >= alvo):
+            self.rodando = None
+            self.log_msg(f"--- Parou no Ciclo {sim.ciclo} ---", "WRITE")
+            if sim.esta_terminado(): self.mostrar_relatorio()
+            return
+        espera = max(1, int((inicio + quadro - perf_counter()) * 1000))
+        self.rodando = self.root.after(espera, self._rodar_lote)
+
+    def _tocar_replay(self):
+        # Replay: um ciclo por quadro, com os eventos no log
+        alvo = self.alvo_execucao
+        if not self.terminado() and (alvo is None or self.ciclo_replay < alvo):
+            self.ciclo_replay += 1
+            self.log_eventos_replay(self.ciclo_replay)
+            self.update_view()
+        if self.terminado() or (alvo is not None and self.ciclo_replay >= alvo):
+            self.rodando = None
+            self.log_msg(f"--- Parou no Ciclo {self.ciclo_replay} ---", "WRITE")
+            if self.terminado(): self.mostrar_relatorio()
+            return
+        self.rodando = self.root.after(int(1000 / QUADROS_POR_SEGUNDO), self._tocar_replay)
+
     def reset_sim(self):
+        self.pausar()
+        self.fechar_replay() # Sai do modo replay
         self.sim.reset()
-        self.txt_log.config(state="normal")
-        self.txt_log.delete(1.0, tk.END)
-        self.txt_log.config(state="disabled")
+        self.limpar_log()
         self.update_view()
 
     def load_example(self):
@@ -175,37 +355,41 @@ class TomasuloGUI:
         # Exemplo que demonstra um salto (o índice 4 é a instrução 'MUL R6, R4, R2')
         prog = ["ADD R1, R2, R3", "BEQ R2, R2, 4", "MUL R4, R1, R2", "DIV R6, R4, R2", "MUL R6, R4, R2", "SUB R5, R3, R1"]
         self.sim.carregar_instrucoes(prog)
+        self.texto_programa = None
         self.log_msg("Exemplo carregado.")
         self.update_view()
 
+    def sincronizar_tabela(self, tree, linhas):
+        """Atualiza só as células que mudaram desde o último quadro (sem apagar e reinserir linhas)."""
+        cache = self.linhas_tabela.setdefault(tree, [])
+        colunas = tree['columns']
+        for i, valores in enumerate(linhas):
+            if i == len(cache):
+                cache.append((tree.insert("", "end", values=valores), valores))
+                continue
+            iid, antigos = cache[i]
+            if antigos != valores:
+                for col, antigo, novo in zip(colunas, antigos, valores):
+                    if antigo != novo: tree.set(iid, col, novo)
+                cache[i] = (iid, valores)
+        for iid, _ in cache[len(linhas):]:
+            tree.delete(iid)
+        del cache[len(linhas):]
+
     def update_view(self):
-        self.lbl_ciclo.config(text=f"Ciclo Atual: {self.sim.ciclo}")
-        for t in [self.tree_rs, self.tree_rob, self.tree_rat, self.tree_reg]:
-            for item in t.get_children(): t.delete(item)
-
-        todas_rs = self.sim.rs_add + self.sim.rs_mul
-        for rs in todas_rs:
-            qj = rs.qj if rs.qj is not None else ""
-            qk = rs.qk if rs.qk is not None else ""
-            dest = rs.dest if rs.busy else ""
-            status_busy = "🔴 Busy" if rs.busy else "🟢 Free"
-            self.tree_rs.insert("", "end", values=(rs.nome, status_busy, rs.op if rs.op else "-", rs.vj if rs.vj is not None else "-", rs.vk if rs.vk is not None else "-", qj, qk, dest, rs.tempo_restante))
-
-        for rob in self.sim.rob:
-            if rob.busy:
-                pronto_icon = "✅ Sim" if rob.pronto else "⏳ Não"
-                self.tree_rob.insert("", "end", values=(rob.id, rob.tipo, rob.dest, rob.valor, pronto_icon, str(rob.instrucao)))
-
-        for i in range(16):
-            r = f"R{i}"
-            rat_val = self.sim.rat[r] if self.sim.rat[r] is not None else "-"
-            self.tree_rat.insert("", "end", values=(r, rat_val))
-            self.tree_reg.insert("", "end", values=(r, self.sim.regs[r]))
+        if self.replay:
+            self.lbl_ciclo.config(text=f"Ciclo Atual: {self.ciclo_replay} (replay, último {self.replay.ultimo_ciclo})")
+            tabelas = self.replay.quadro(self.ciclo_replay)[0]
+        else:
+            self.lbl_ciclo.config(text=f"Ciclo Atual: {self.sim.ciclo}")
+            tabelas = linhas_exibicao(self.sim)
+        for tree, linhas in zip((self.tree_rs, self.tree_rob, self.tree_rat, self.tree_reg), tabelas):
+            self.sincronizar_tabela(tree, linhas)
 
     def open_config_window(self):
         top = tk.Toplevel(self.root)
         top.title("Configurações")
-        top.geometry("500x600")
+        top.geometry("500x690")
         top.configure(bg=COLORS['bg_app'])
         
         def section_lbl(text):
@@ -225,20 +409,28 @@ class TomasuloGUI:
             c += 2
             if c > 2: c = 0; r += 1
 
+        section_lbl("Preditor de Desvios").pack(pady=(15, 5))
+        self.combo_preditor = ttk.Combobox(top, values=list(PREDITORES), state="readonly")
+        self.combo_preditor.set(self.sim.preditor_tipo)
+        self.combo_preditor.pack(padx=20, fill=tk.X)
+        self.combo_resolucao = ttk.Combobox(top, values=list(RESOLUCOES), state="readonly")
+        self.combo_resolucao.set(self.sim.resolucao_desvio)
+        self.combo_resolucao.pack(padx=20, pady=(5, 0), fill=tk.X)
+
         section_lbl("Registradores Iniciais").pack(pady=(15, 5))
         self.txt_regs = tk.Text(top, height=2, font=("Consolas", 10), relief="flat", bd=1)
         self.txt_regs.pack(padx=20, fill=tk.X)
         regs_str = ", ".join([f"{k}={v}" for k,v in self.sim.regs_iniciais.items()])
         self.txt_regs.insert(tk.END, regs_str)
 
-        section_lbl("Código do Programa (BEQ R1, R2, N - N é o índice da instrução)").pack(pady=(15, 5))
+        section_lbl("Código do Programa (BEQ R1, R2, rótulo|N; LW/SW R1, 8(R2); # comentários; .data/.word)").pack(pady=(15, 5))
         self.txt_prog = tk.Text(top, height=8, font=("Consolas", 10), relief="flat", bd=1)
         self.txt_prog.pack(padx=20, fill=tk.BOTH, expand=True)
-        prog_text = ""
-        # Reconstroi o texto do programa a partir de prog_original (se existir)
-        if self.sim.prog_original:
+        prog_text = self.texto_programa or ""
+        # Sem fonte salvo, reconstroi o texto do programa a partir de prog_original (se existir)
+        if not prog_text and self.sim.prog_original:
             for inst in self.sim.prog_original:
-                prog_text += f"{inst.op} {inst.dest}, {inst.s1}, {inst.s2}\n"
+                prog_text += f"{inst}\n"
         
         if not prog_text: prog_text = "ADD R1, R2, R3\nBEQ R2, R2, 4\nMUL R4, R1, R2\nDIV R6, R4, R2\nMUL R6, R4, R2\nSUB R5, R3, R1"
         self.txt_prog.insert(tk.END, prog_text)
@@ -258,27 +450,60 @@ class TomasuloGUI:
                 try: novos_regs[parts[0].strip().upper()] = int(parts[1])
                 except: pass
         prog = self.txt_prog.get("1.0", tk.END).strip().split("\n")
-        self.sim.set_config(novas_lat, novos_regs)
-        self.sim.reset()
-        self.sim.carregar_instrucoes(prog) # Usa o método atualizado
+        self.pausar()
+        try:
+            self.sim.set_config(novas_lat, novos_regs, preditor=self.combo_preditor.get(),
+                                 resolucao_desvio=self.combo_resolucao.get())
+            self.sim.reset()
+            self.sim.carregar_instrucoes(prog) # Decodifica; erros de sintaxe viram ValueError
+        except ValueError as e:
+            messagebox.showerror("Configuração inválida", str(e), parent=window)
+            return
+        self.texto_programa = "\n".join(prog)
+        self.fechar_replay()
         window.destroy()
         self.log_msg("Configuração atualizada.")
         self.update_view()
 
     def mostrar_relatorio(self):
-        m = self.sim.metricas
-        ciclos = self.sim.ciclo
-        ipc = m['commits'] / ciclos if ciclos > 0 else 0
+        if self.replay:
+            # O replay guarda o relatório do fim da gravação
+            meta = self.replay.meta
+            r, preditor, resolucao = meta['relatorio'], meta['preditor'], meta['resolucao_desvio']
+        else:
+            r, preditor, resolucao = self.sim.relatorio(), self.sim.preditor_tipo, self.sim.resolucao_desvio
         relatorio = (
-            f"Ciclos Totais: {ciclos}\n"
-            f"Instruções Commitadas: {m['commits']}\n"
-            f"IPC: {ipc:.2f}\n"
-            f"Bolhas (Stalls): {m['bolhas']}\n"
-            f"Flushes (Desvios): {m['flushes']}\n"
+            f"Ciclos Totais: {r['ciclos']}\n"
+            f"Instruções Commitadas: {r['commits']}\n"
+            f"IPC: {r['ipc']:.2f}\n"
+            f"Bolhas (Stalls): {r['bolhas']} (ROB cheio: {r['bolhas_rob']}, sem RS: {r['bolhas_rs']})\n"
+            f"Flushes (Desvios): {r['flushes']}\n"
+            f"Preditor: {preditor} (resolução no {resolucao.upper()})\n"
+            f"Precisão da Previsão: {r['precisao_previsao']:.1%} ({r['mispredicts']} de {r['desvios']} desvios errados)\n"
+            f"Ciclos Desperdiçados: {r['ciclos_desperdicados']}\n"
+            f"Conflitos CDB / UF: {r['conflitos_cdb']} / {r['conflitos_uf']}\n"
+            f"Loads encaminhados / especulativos: {r['loads_encaminhados']} / {r['loads_especulativos']}\n"
+            f"Flushes (Memória): {r['flushes_memoria']} (LSQ cheia: {r['bolhas_lsq']} bolhas)\n"
         )
+        inst = r.get('instrumentacao')
+        if inst and inst['ciclos_amostrados']:
+            total = inst['ciclos_amostrados']
+            rob = inst['ocupacao_rob']
+            relatorio += f"\nOcupação do ROB: média {rob['media']:.1f} / {rob['capacidade']} (máx. {rob['max']})\n"
+            for classe, rs in inst['rs_ocupadas'].items():
+                relatorio += f"RS {classe} ocupadas: média {rs['media']:.1f} / {rs['capacidade']}\n"
+            relatorio += "ISSUE: " + ", ".join(f"{c} {n / total:.0%}" for c, n in inst['causa_issue'].items()) + "\n"
+            relatorio += "Head do ROB: " + ", ".join(f"{c} {n / total:.0%}" for c, n in inst['estado_head'].items()) + "\n"
+            if inst['ciclos_sem_amostra']:
+                relatorio += f"({inst['ciclos_sem_amostra']} ciclos sem amostra fora das médias)\n"
         messagebox.showinfo("Resultados", relatorio)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='python tomasulo_gui.py')
+    parser.add_argument('--replay', default=None, metavar='ARQUIVO',
+                        help='abre um replay gravado com python -m tomasulo_engine --replay ARQUIVO')
+    args = parser.parse_args()
     root = tk.Tk()
     app = TomasuloGUI(root)
+    if args.replay: app.abrir_replay(args.replay)
     root.mainloop()
\ No newline at end of file
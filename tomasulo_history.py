@@ -0,0 +1,208 @@
+# tomasulo_history.py
+import mmap
+import pickle
+import tempfile
+from collections import deque
+
+# Tipos de registro do journal de desfazer
+ATRIBUTO = 0   # (ATRIBUTO, objeto, campo, valor_antigo)
+ITEM = 1       # (ITEM, dict/lista, chave, valor_antigo)
+
+AUSENTE = object()  # Marca chaves que não existiam antes da escrita
+
+# Atributos do simulador que não entram nos checkpoints. gravar_historico e
+# tracing são do modo de execução, não da máquina: os checkpoints gravados por
+# run() os têm desligados e restaurá-los deixaria o passo a passo mudo
+NAO_SALVAR = ('history', 'prog_original', '_journal', 'sink', 'instrumentacao', 'linha_do_tempo',
+              'gravar_historico', 'tracing')
+
+
+def serializar_estado(sim):
+    """Estado da máquina (sim.__dict__ sem NAO_SALVAR) serializado com pickle.
+
+    O programa decodificado é imutável e fica de fora, então só o estado é
+    copiado. Usado pelos checkpoints e por save_snapshot.
+    """
+    estado = {k: v for k, v in sim.__dict__.items() if k not in NAO_SALVAR}
+    return pickle.dumps(estado, pickle.HIGHEST_PROTOCOL)
+
+
+def restaurar_estado(sim, dados):
+    sim.__dict__.update(pickle.loads(dados))
+    sim._journal = None
+
+
+class ArquivoSpill:
+    """Arquivo só de acréscimo com os checkpoints que saíram da memória, lido via mmap.
+
+    caminho None usa um arquivo temporário anônimo. O arquivo só é criado no
+    primeiro acréscimo e é truncado por limpar() (o histórico recomeçou).
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho
+        self.tamanho = 0
+        self._f = None
+        self._mm = None
+
+    def acrescentar(self, dados):
+        """Grava dados no fim do arquivo e devolve a posição deles."""
+        if self._f is None:
+            self._f = open(self.caminho, 'w+b') if self.caminho else tempfile.TemporaryFile()
+        posicao = self.tamanho
+        self._f.seek(posicao)
+        self._f.write(dados)
+        self.tamanho += len(dados)
+        return posicao
+
+    def ler(self, posicao, tamanho):
+        if self._mm is None or len(self._mm) < posicao + tamanho:
+            # O arquivo cresceu desde o último mapeamento
+            self._f.flush()
+            if self._mm is not None:
+                self._mm.close()
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm[posicao:posicao + tamanho]
+
+    def limpar(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._f is not None:
+            self._f.truncate(0)
+        self.tamanho = 0
+
+    def fechar(self):
+        self.limpar()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class Historico:
+    """Journal de desfazer por ciclo + checkpoints completos a cada K ciclos.
+
+    Cada ciclo grava apenas os campos que os estágios alteraram. Quando o
+    journal passa de `limite_registros`, os ciclos mais antigos são descartados;
+    voltar para eles restaura o checkpoint anterior e re-simula até o ciclo alvo.
+    O journal aponta para os objetos vivos e por isso fica sempre na memória.
+
+    Os checkpoints são serializados (serializar_estado). Quando os que estão na
+    memória passam de `orcamento_memoria` bytes, os mais antigos vão para um
+    ArquivoSpill em `arquivo_spill` (None = temporário anônimo), então
+    qualquer ciclo continua a no máximo K ciclos de re-simulação (ver
+    goto_cycle) sem que a memória cresça com a execução. Com
+    `limite_checkpoints`, acima dele metade dos checkpoints é descartada e o
+    intervalo entre eles dobra, limitando também o disco.
+    """
+
+    def __init__(self, intervalo_checkpoint=64, limite_registros=200_000, limite_checkpoints=None,
+                 orcamento_memoria=32 << 20, arquivo_spill=None):
+        self.intervalo_inicial = intervalo_checkpoint
+        self.limite_registros = limite_registros
+        self.limite_checkpoints = limite_checkpoints
+        self.orcamento_memoria = orcamento_memoria
+        self.spill = ArquivoSpill(arquivo_spill)
+        self.limpar()
+
+    def limpar(self):
+        self.intervalo_checkpoint = self.intervalo_inicial
+        self.journal = deque()  # journal[i] desfaz o ciclo ciclo_base + i + 1
+        self.ciclo_base = 0
+        self.total_registros = 0
+        self.checkpoints = {}   # ciclo -> estado serializado no início do ciclo seguinte
+        self.em_disco = {}      # ciclo -> (posição, tamanho) no arquivo de spill
+        self.bytes_em_memoria = 0
+        self.spill.limpar()
+        self.proximo_checkpoint = 0
+
+    def __len__(self):
+        return len(self.journal)
+
+    def abrir_ciclo(self, sim):
+        """Chamado antes de cada ciclo. Devolve a lista que recebe os registros."""
+        if self.journal:
+            self.total_registros += len(self.journal[-1])
+        else:
+            self.ciclo_base = sim.ciclo
+        self.checkpoint_periodico(sim)
+
+        # Descarta os ciclos mais antigos enquanto o orçamento estiver estourado
+        while self.total_registros > self.limite_registros and self.journal:
+            self.total_registros -= len(self.journal.popleft())
+            self.ciclo_base += 1
+
+        registros = []
+        self.journal.append(registros)
+        return registros
+
+    def checkpoint_periodico(self, sim):
+        """Salva um checkpoint ao passar de uma marca de K ciclos. O modo headless
+        pula ciclos ociosos, então o checkpoint pode cair depois da marca."""
+        if sim.ciclo < self.proximo_checkpoint:
+            return
+        if sim.ciclo not in self.checkpoints and sim.ciclo not in self.em_disco:
+            self.salvar_checkpoint(sim)
+        self.proximo_checkpoint = (sim.ciclo // self.intervalo_checkpoint + 1) * self.intervalo_checkpoint
+
+    def salvar_checkpoint(self, sim):
+        dados = serializar_estado(sim)
+        self.checkpoints[sim.ciclo] = dados
+        self.bytes_em_memoria += len(dados)
+        if self.limite_checkpoints is not None and len(self.checkpoints) + len(self.em_disco) > self.limite_checkpoints:
+            self.intervalo_checkpoint *= 2
+            # Fica o primeiro checkpoint de cada bloco de K ciclos (o espaço no
+            # arquivo de spill não é reaproveitado: ele só cresce)
+            blocos = set()
+            for ciclo in sorted([*self.checkpoints, *self.em_disco]):
+                bloco = ciclo // self.intervalo_checkpoint
+                if bloco not in blocos:
+                    blocos.add(bloco)
+                elif ciclo in self.checkpoints:
+                    self.bytes_em_memoria -= len(self.checkpoints.pop(ciclo))
+                else:
+                    del self.em_disco[ciclo]
+        # Os mais antigos (ordem de gravação) saem da memória até caber no orçamento
+        while self.bytes_em_memoria > self.orcamento_memoria and len(self.checkpoints) > 1:
+            ciclo = next(iter(self.checkpoints))
+            dados = self.checkpoints.pop(ciclo)
+            self.bytes_em_memoria -= len(dados)
+            self.em_disco[ciclo] = (self.spill.acrescentar(dados), len(dados))
+
+    def checkpoint_anterior(self, ciclo_alvo):
+        """Ciclo do checkpoint mais próximo <= ciclo_alvo (None se não houver)."""
+        return max((c for c in (*self.checkpoints, *self.em_disco) if c <= ciclo_alvo), default=None)
+
+    def restaurar_checkpoint(self, sim, ciclo_alvo):
+        """Restaura o checkpoint mais próximo <= ciclo_alvo. Zera o journal, pois
+        os registros antigos apontam para objetos que deixam de ser os vivos."""
+        ciclo = self.checkpoint_anterior(ciclo_alvo)
+        if ciclo is None:
+            return False
+        dados = self.checkpoints.get(ciclo)
+        restaurar_estado(sim, dados if dados is not None else self.spill.ler(*self.em_disco[ciclo]))
+        self.journal.clear()
+        self.total_registros = 0
+        self.ciclo_base = ciclo
+        return True
+
+    def descartar_journal(self):
+        """Esquece o journal (mantém os checkpoints, que continuam válidos)."""
+        self.journal.clear()
+        self.total_registros = 0
+
+    def desfazer_ultimo(self):
+        registros = self.journal.pop()
+        if self.journal:
+            self.total_registros -= len(self.journal[-1])
+        desfazer(registros)
+
+
+def desfazer(registros):
+    for tipo, alvo, chave, antigo in reversed(registros):
+        if tipo == ATRIBUTO:
+            setattr(alvo, chave, antigo)
+        elif antigo is AUSENTE:
+            del alvo[chave]
+        else:
+            alvo[chave] = antigo
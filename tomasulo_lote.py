@@ -0,0 +1,431 @@
+# tomasulo_lote.py
+import copy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from tomasulo_engine import SimuladorTomasulo
+from tomasulo_program import NUM_REGS, Op, indice_registrador
+from tomasulo_asm import Programa, montar
+
+# Motor em lote: B instâncias do mesmo programa, cada uma numa linha de arrays
+# NumPy, avançadas juntas com operações vetorizadas. Cada instância tem a sua
+# configuração (latências, ROB, estações, registradores iniciais) e termina com
+# o mesmo relatório (e o mesmo banco de registradores) do SimuladorTomasulo.
+#
+# Cobre a máquina padrão do motor escalar: preditor nao_tomado com resolução no
+# commit, larguras 1/1, CDB e unidades funcionais ilimitados e programas sem
+# LW/SW (ver motivo_nao_suportado). Nela a ordem dos WRITEs de um mesmo ciclo
+# não muda nada, então cada estação guarda só o ciclo do seu WRITE (fim) em vez
+# de tempo_restante e das filas prontas/executando/conclusoes.
+#
+# Como no run() escalar, ciclos ociosos (sem commit, sem WRITE e com o ISSUE
+# travado) são pulados, cada instância no seu próprio relógio.
+
+# Valores em int64; a partir daqui int(vj / vk) em float e o int do Python podem
+# divergir. Instâncias que chegam lá terminam no motor escalar.
+LIMITE_EXATO = 2 ** 53
+
+_CLASSE_OP = (0, 0, 1, 1, 0, 2, 2) # Op -> 0 (ADD/SUB/BEQ), 1 (MUL/DIV) ou 2 (LW/SW, nunca chegam aqui)
+_SEM = -1 # "None" nos campos inteiros (qj, qk, rat)
+_NUNCA = np.iinfo(np.int64).max if np is not None else None # rs_fim de estação livre ou esperando operandos
+
+
+def motivo_nao_suportado(sim, programa=()):
+    """None se o motor em lote reproduz `sim` (já configurado) rodando `programa`;
+    senão, o motivo."""
+    if sim.preditor_tipo != 'nao_tomado':
+        return f"preditor {sim.preditor_tipo}"
+    if sim.resolucao_desvio != 'commit':
+        return f"resolução no {sim.resolucao_desvio}"
+    if sim.largura_issue != 1 or sim.largura_commit != 1:
+        return "largura de issue/commit maior que 1"
+    if sim.num_cdb is not None:
+        return "CDB limitado"
+    if any(n is not None for n in sim.num_ufs.values()):
+        return "unidades funcionais limitadas"
+    if any(i.codigo in (Op.LW, Op.SW) for i in programa):
+        return "programa com LW/SW"
+    return None
+
+
+def configurar(config, molde=None):
+    """SimuladorTomasulo configurado a partir de um dict com 'latencias', 'regs'
+    e os demais argumentos de set_config.
+
+    Com `molde`, devolve uma cópia rasa dele só com a configuração trocada: bem
+    mais barata que um simulador novo (sem o checkpoint do reset), mas que não
+    pode ser executada.
+    """
+    config = dict(config)
+    if molde is None:
+        sim = SimuladorTomasulo()
+    else:
+        sim = copy.copy(molde)
+        sim.latencias, sim.num_rs, sim.num_ufs = dict(molde.latencias), dict(molde.num_rs), dict(molde.num_ufs)
+    sim.set_config(config.pop('latencias', {}), config.pop('regs', sim.regs_iniciais), **config)
+    return sim
+
+
+class SimuladorLote:
+    """Roda o mesmo programa em várias configurações de uma vez.
+
+    configs: dicts com 'latencias' e 'regs' (como os dois primeiros argumentos
+    de set_config) e os demais argumentos nomeados de set_config. Configurações
+    fora do que o motor em lote cobre dão ValueError ou, com estrito=False,
+    rodam no motor escalar.
+    """
+
+    # Arrays com uma linha por instância (compactados quando instâncias terminam)
+    _CAMPOS = ('linha', 'ciclo', 'pc', 'head', 'tail', 'itens', 'tam_rob', 'lat', 'rs_existe',
+               'regs', 'rat', 'rob_busy', 'rob_pronto', 'rob_valor', 'rob_pc', 'rob_emissao',
+               'rs_busy', 'rs_op', 'rs_vj', 'rs_vk', 'rs_qj', 'rs_qk', 'rs_dest', 'rs_fim',
+               'commits', 'bolhas', 'bolhas_rob', 'bolhas_rs', 'flushes', 'desvios',
+               'mispredicts', 'ciclos_desperdicados')
+
+    def __init__(self, linhas, configs, estrito=True):
+        if np is None:
+            raise ImportError("O motor em lote requer o pacote 'numpy' (pip install numpy)")
+        # linhas: lista de linhas ou um Programa já montado (tomasulo_asm)
+        self.montado = linhas if isinstance(linhas, Programa) else montar(list(linhas))
+        self.programa = tuple(self.montado.instrucoes)
+        self.configs = list(configs)
+        molde = SimuladorTomasulo()
+        self.sims = [configurar(c, molde) for c in self.configs]
+        fora = []
+        for sim in self.sims:
+            motivo = motivo_nao_suportado(sim, self.programa)
+            if motivo and estrito:
+                raise ValueError(f"Configuração fora do motor em lote: {motivo}")
+            fora.append(motivo is not None)
+        self.resultados = [None] * len(self.sims)
+        self.regs_finais = [None] * len(self.sims)
+        self._montar(np.array(fora, dtype=bool))
+
+    def _montar(self, fora):
+        prog, sims = self.programa, self.sims
+        B = len(sims)
+        self.n_instr = len(prog)
+        self._ultimo = max(self.n_instr - 1, 0)
+        self.p_op = np.array([i.codigo for i in prog] or [0], dtype=np.int64)
+        self.p_rd = np.array([i.rd for i in prog] or [0], dtype=np.int64)
+        self.p_rs1 = np.array([i.rs1 for i in prog] or [0], dtype=np.int64)
+        self.p_rs2 = np.array([_SEM if i.rs2 is None else i.rs2 for i in prog] or [0], dtype=np.int64)
+        self.p_imm = np.array([i.imm or 0 for i in prog] or [0], dtype=np.int64)
+        self.p_classe = np.array(_CLASSE_OP, dtype=np.int64)[self.p_op]
+        # Alvo do BEQ já limitado ao fim do programa (como atualizar_pc)
+        self.p_alvo = np.where((self.p_imm >= 0) & (self.p_imm < self.n_instr), self.p_imm, self.n_instr)
+
+        R = max(s.tamanho_rob for s in sims) if sims else 1
+        n_add = np.array([s.num_rs['ADD'] for s in sims], dtype=np.int64)
+        n_mul = np.array([s.num_rs['MUL'] for s in sims], dtype=np.int64)
+        Sa, Sm = int(n_add.max(initial=1)), int(n_mul.max(initial=1))
+        self.rs_classe = np.array([0] * Sa + [1] * Sm, dtype=np.int64)
+        coluna = np.concatenate([np.arange(Sa), np.arange(Sm)])
+        self.rs_existe = coluna[None, :] < np.where(self.rs_classe == 0, n_add[:, None], n_mul[:, None])
+
+        self.linha = np.arange(B)
+        self.ciclo = np.zeros(B, dtype=np.int64)
+        self.pc = np.zeros(B, dtype=np.int64)
+        self.head = np.zeros(B, dtype=np.int64)
+        self.tail = np.zeros(B, dtype=np.int64)
+        self.itens = np.zeros(B, dtype=np.int64)
+        self.tam_rob = np.array([s.tamanho_rob for s in sims], dtype=np.int64)
+        self.lat = np.array([[s.latencias.get(op.name, 1) for op in Op] for s in sims],
+                            dtype=np.int64).reshape(B, len(Op))
+
+        self.regs = np.zeros((B, NUM_REGS), dtype=np.int64)
+        for b, s in enumerate(sims):
+            for reg, val in s.regs_iniciais.items():
+                i = indice_registrador(reg)
+                if i is not None:
+                    self.regs[b, i] = val
+        self.rat = np.full((B, NUM_REGS), _SEM, dtype=np.int64)
+
+        self.rob_busy = np.zeros((B, R), dtype=bool)
+        self.rob_pronto = np.zeros((B, R), dtype=bool)
+        self.rob_valor = np.zeros((B, R), dtype=np.int64)
+        self.rob_pc = np.zeros((B, R), dtype=np.int64)
+        self.rob_emissao = np.zeros((B, R), dtype=np.int64)
+
+        S = Sa + Sm
+        self.rs_busy = np.zeros((B, S), dtype=bool)
+        self.rs_op = np.zeros((B, S), dtype=np.int64)
+        self.rs_vj = np.zeros((B, S), dtype=np.int64)
+        self.rs_vk = np.zeros((B, S), dtype=np.int64)
+        self.rs_qj = np.full((B, S), _SEM, dtype=np.int64)
+        self.rs_qk = np.full((B, S), _SEM, dtype=np.int64)
+        self.rs_dest = np.zeros((B, S), dtype=np.int64)
+        self.rs_fim = np.full((B, S), _NUNCA, dtype=np.int64) # Ciclo do WRITE
+
+        for campo in ('commits', 'bolhas', 'bolhas_rob', 'bolhas_rs', 'flushes', 'desvios',
+                      'mispredicts', 'ciclos_desperdicados'):
+            setattr(self, campo, np.zeros(B, dtype=np.int64))
+
+        # Valores iniciais fora da faixa exata também vão direto para o motor escalar
+        fora |= np.abs(self.regs).max(axis=1, initial=0) >= LIMITE_EXATO
+        if len(prog) and np.abs(self.p_imm).max() >= LIMITE_EXATO:
+            fora[:] = True
+        self._escalar = set()
+        if fora.any():
+            self._retirar(fora, escalar=True)
+
+    def _manter(self, manter):
+        for campo in self._CAMPOS:
+            setattr(self, campo, getattr(self, campo)[manter])
+
+    def _retirar(self, mascara, escalar=False):
+        """Tira as linhas da máscara do lote, guardando o resultado (ou marcando-as
+        para o motor escalar)."""
+        for r in np.flatnonzero(mascara):
+            b = int(self.linha[r])
+            if escalar:
+                self._escalar.add(b)
+            else:
+                self.resultados[b] = self._relatorio(r)
+                self.regs_finais[b] = self.regs[r].tolist()
+        self._manter(~mascara)
+
+    def _relatorio(self, r):
+        ciclos, commits = int(self.ciclo[r]), int(self.commits[r])
+        desvios, mispredicts = int(self.desvios[r]), int(self.mispredicts[r])
+        return {
+            'ciclos': ciclos,
+            'commits': commits,
+            'ipc': commits / ciclos if ciclos > 0 else 0,
+            'bolhas': int(self.bolhas[r]),
+            'bolhas_rob': int(self.bolhas_rob[r]),
+            'bolhas_rs': int(self.bolhas_rs[r]),
+            'flushes': int(self.flushes[r]),
+            'desvios': desvios,
+            'mispredicts': mispredicts,
+            'precisao_previsao': 1 - mispredicts / desvios if desvios > 0 else 1.0,
+            'ciclos_desperdicados': int(self.ciclos_desperdicados[r]),
+            'conflitos_cdb': 0,
+            'conflitos_uf': 0,
+            'bolhas_lsq': 0,
+            'loads_encaminhados': 0,
+            'loads_especulativos': 0,
+            'flushes_memoria': 0,
+        }
+
+    def run(self, max_cycles=None):
+        """Executa todas as instâncias até o fim (ou max_cycles) e devolve os
+        relatórios, na ordem de configs."""
+        while len(self.linha):
+            terminou = (self.pc >= self.n_instr) & (self.itens == 0)
+            if max_cycles is not None:
+                terminou |= self.ciclo >= max_cycles
+            if terminou.any():
+                self._retirar(terminou)
+                if not len(self.linha):
+                    break
+            head_pronto = self._pular_ociosos(max_cycles)
+            if max_cycles is not None and (self.ciclo >= max_cycles).any():
+                continue # Quem chegou ao limite pulando sai na próxima volta
+            self._ciclo(head_pronto)
+
+        for b in sorted(self._escalar):
+            sim = configurar(self.configs[b])
+            sim.reset()
+            sim.carregar_programa(self.montado)
+            self.resultados[b] = sim.run(max_cycles=max_cycles)
+            self.regs_finais[b] = list(sim.regs)
+        self._escalar.clear()
+        return self.resultados
+
+    # --- Um ciclo de todas as linhas ---
+    # Os acessos [linha, coluna] usam índices planos (linha * largura + coluna) com
+    # take/put, bem mais baratos que a indexação avançada em duas dimensões.
+    def _livre(self, classe):
+        """(tem estação livre da classe, coluna da primeira livre) por linha."""
+        livres = np.where(classe[:, None] == 0, self._existe_add, self._existe_mul) & ~self.rs_busy
+        coluna = livres.argmax(axis=1)
+        return livres.reshape(-1)[self._base_rs + coluna], coluna
+
+    def _indices(self):
+        """Índices planos e máscaras que dependem das linhas presentes no lote."""
+        B, R, S = len(self.linha), self.rob_busy.shape[1], self.rs_busy.shape[1]
+        self._base_rob = np.arange(B) * R
+        self._base_rs = np.arange(B) * S
+        self._existe_add = self.rs_existe & (self.rs_classe == 0)
+        self._existe_mul = self.rs_existe & (self.rs_classe == 1)
+
+    def _pular_ociosos(self, max_cycles):
+        """Avança de uma vez as linhas ociosas até o próximo WRITE (ver ciclos_ociosos).
+        Devolve, por linha, se o head do ROB está pronto para o commit."""
+        self._indices()
+        h = self._base_rob + self.head
+        head_pronto = (self.itens > 0) & self.rob_busy.reshape(-1)[h] & self.rob_pronto.reshape(-1)[h]
+        proximo = self.rs_fim.min(axis=1)
+        tem_instr = self.pc < self.n_instr
+        tem_rs, _ = self._livre(self.p_classe[np.minimum(self.pc, self._ultimo)])
+        rob_cheio = self.itens >= self.tam_rob
+        ocioso = ~head_pronto & ~(tem_instr & ~rob_cheio & tem_rs) & (proximo > self.ciclo + 1) & (proximo < _NUNCA)
+        if ocioso.any():
+            n = np.where(ocioso, proximo - self.ciclo - 1, 0)
+            if max_cycles is not None:
+                n = np.minimum(n, np.maximum(max_cycles - self.ciclo, 0))
+            self.ciclo += n
+            travado = np.where(tem_instr, n, 0)
+            self.bolhas += travado
+            self.bolhas_rob += np.where(rob_cheio, travado, 0)
+            self.bolhas_rs += np.where(rob_cheio, 0, travado)
+        return head_pronto
+
+    def _ciclo(self, pode):
+        B = len(self.linha)
+        self.ciclo += 1
+        ciclo = self.ciclo
+        base_rob = self._base_rob
+        rob_busy, rob_pronto = self.rob_busy.reshape(-1), self.rob_pronto.reshape(-1)
+        rob_valor = self.rob_valor.reshape(-1)
+
+        # --- 1. COMMIT ---
+        if pode.any():
+            h = self.head
+            hf = base_rob + h
+            pcs = self.rob_pc.reshape(-1)[hf]
+            beq = pode & (self.p_op[pcs] == Op.BEQ)
+            regs = self.regs.reshape(-1)
+            base_regs = np.arange(B) * NUM_REGS
+            tomado = beq & (regs[base_regs + self.p_rd[pcs]] == regs[base_regs + self.p_rs1[pcs]])
+            self.desvios += beq
+            # Previsão sempre "não toma": todo BEQ tomado é um mispredict
+            self.mispredicts += tomado
+            self.flushes += tomado
+            self.ciclos_desperdicados += np.where(tomado, ciclo - self.rob_emissao.reshape(-1)[hf], 0)
+            sai = pode & ~tomado
+            self.commits += sai
+
+            r = np.flatnonzero(pode & ~beq)
+            if len(r):
+                destino = base_regs[r] + self.p_rd[pcs[r]]
+                rat = self.rat.reshape(-1)
+                rat[destino] = np.where(rat[destino] == h[r], _SEM, rat[destino])
+                regs[destino] = rob_valor[hf[r]]
+
+            rob_busy[hf[sai]] = False
+            self.head = np.where(pode, (h + 1) % self.tam_rob, h)
+            self.itens -= sai
+
+            if tomado.any():
+                # Flush: RAT, estações e ROB limpos; a busca segue pelo alvo
+                self.rat[tomado] = _SEM
+                self.rs_busy[tomado] = False
+                self.rs_qj[tomado] = _SEM
+                self.rs_qk[tomado] = _SEM
+                self.rs_fim[tomado] = _NUNCA
+                self.rob_busy[tomado] = False
+                self.rob_pronto[tomado] = False
+                self.tail = np.where(tomado, self.head, self.tail)
+                self.itens[tomado] = 0
+                self.pc = np.where(tomado, self.p_alvo[pcs], self.pc)
+
+        # --- 2. WRITE (e wakeup dos consumidores) ---
+        escreve = np.flatnonzero(self.rs_fim == ciclo[:, None])
+        if len(escreve):
+            op = self.rs_op.reshape(-1)[escreve]
+            vj, vk = self.rs_vj.reshape(-1)[escreve], self.rs_vk.reshape(-1)[escreve]
+            produto = vj.astype(np.float64) * vk
+            quociente = np.trunc(vj / np.where(vk == 0, 1, vk)).astype(np.int64)
+            estouro = np.abs(produto) >= LIMITE_EXATO
+            resultado = np.where(op == Op.ADD, vj + vk,
+                        np.where(op == Op.SUB, vj - vk,
+                        np.where(op == Op.MUL, np.where(estouro, 0, vj * vk),
+                        np.where((op == Op.DIV) & (vk != 0), quociente, 0))))
+            estouro = ((op == Op.MUL) & estouro) | (np.abs(resultado) >= LIMITE_EXATO)
+
+            linha = escreve // self.rs_busy.shape[1]
+            dest = base_rob[linha] + self.rs_dest.reshape(-1)[escreve]
+            rob_valor[dest] = resultado
+            rob_pronto[dest] = True
+            self.rs_busy.reshape(-1)[escreve] = False
+            self.rs_fim.reshape(-1)[escreve] = _NUNCA
+
+            # Quem espera uma tag (q >= 0) acorda quando a entrada do ROB fica pronta:
+            # isso só acontece no WRITE do produtor
+            acordou = None
+            for q, v in ((self.rs_qj, self.rs_vj), (self.rs_qk, self.rs_vk)):
+                tag = base_rob[:, None] + q
+                chega = (q >= 0) & rob_pronto.take(tag, mode='clip')
+                if chega.any():
+                    v[chega] = rob_valor[tag[chega]]
+                    q[chega] = _SEM
+                    acordou = chega if acordou is None else acordou | chega
+            if acordou is not None:
+                pronta = np.flatnonzero(acordou & (self.rs_qj < 0) & (self.rs_qk < 0))
+                if len(pronta):
+                    # Começa no EXECUTE deste mesmo ciclo: o WRITE vem `lat` ciclos depois
+                    rr = pronta // self.rs_busy.shape[1]
+                    self.rs_fim.reshape(-1)[pronta] = ciclo[rr] + self.lat[rr, self.rs_op.reshape(-1)[pronta]]
+
+            if estouro.any():
+                self._retirar(np.isin(np.arange(B), linha[estouro]), escalar=True)
+                if not len(self.linha):
+                    return
+                self._indices()
+                return self._issue()
+
+        # --- 3. EXECUTE: nada a fazer, o fim de cada estação já está em rs_fim ---
+        self._issue()
+
+    def _issue(self):
+        # --- 4. ISSUE ---
+        tem_instr = self.pc < self.n_instr
+        if not tem_instr.any():
+            return
+        pc = np.minimum(self.pc, self._ultimo)
+        op = self.p_op[pc]
+        tem_rs, coluna = self._livre(self.p_classe[pc])
+        rob_cheio = self.itens >= self.tam_rob
+        travado = tem_instr & (rob_cheio | ~tem_rs)
+        self.bolhas += travado
+        self.bolhas_rob += travado & rob_cheio
+        self.bolhas_rs += travado & ~rob_cheio
+
+        r = np.flatnonzero(tem_instr & ~travado)
+        if not len(r):
+            return
+        pc, op, rid = pc[r], op[r], self.tail[r]
+        ciclo = self.ciclo[r]
+        rf = self._base_rob[r] + rid
+        sf = self._base_rs[r] + coluna[r]
+        self.pc[r] += 1
+        self.rob_busy.reshape(-1)[rf] = True
+        self.rob_pronto.reshape(-1)[rf] = False
+        self.rob_pc.reshape(-1)[rf] = pc
+        self.rob_emissao.reshape(-1)[rf] = ciclo
+        self.tail[r] = (rid + 1) % self.tam_rob[r]
+        self.itens[r] += 1
+
+        self.rs_busy.reshape(-1)[sf] = True
+        self.rs_op.reshape(-1)[sf] = op
+        self.rs_dest.reshape(-1)[sf] = rid
+        base_regs = r * NUM_REGS
+        rat, regs = self.rat.reshape(-1), self.regs.reshape(-1)
+        rob_pronto, rob_valor = self.rob_pronto.reshape(-1), self.rob_valor.reshape(-1)
+        esperando = np.zeros(len(r), dtype=bool)
+        for fonte, q, v in ((self.p_rs1[pc], self.rs_qj, self.rs_vj), (self.p_rs2[pc], self.rs_qk, self.rs_vk)):
+            registrador = fonte >= 0
+            reg = base_regs + np.maximum(fonte, 0)
+            produtor = np.where(registrador, rat[reg], _SEM)
+            tag = self._base_rob[r] + produtor
+            pronto = (produtor >= 0) & rob_pronto.take(tag, mode='clip')
+            espera = (produtor >= 0) & ~pronto
+            v.reshape(-1)[sf] = np.where(pronto, rob_valor.take(tag, mode='clip'),
+                                         np.where(registrador, regs[reg], self.p_imm[pc]))
+            q.reshape(-1)[sf] = np.where(espera, produtor, _SEM)
+            esperando |= espera
+        # Operandos prontos no ISSUE: começa no EXECUTE do próximo ciclo
+        self.rs_fim.reshape(-1)[sf] = np.where(esperando, _NUNCA, ciclo + 1 + self.lat[r, op])
+
+        escreve_rat = op != Op.BEQ
+        rat[base_regs[escreve_rat] + self.p_rd[pc[escreve_rat]]] = rid[escreve_rat]
+
+
+def executar_lote(linhas, configs, max_cycles=None, estrito=True):
+    """Relatórios de `linhas` em cada configuração (ver SimuladorLote)."""
+    return SimuladorLote(linhas, configs, estrito).run(max_cycles)
@@ -0,0 +1,147 @@
+# tomasulo_predictor.py
+
+# Preditores de desvio consultados no ISSUE do BEQ e treinados quando o desvio
+# resolve. Toda escrita nas tabelas passa por `sim._set`/`sim._set_item`, para
+# que o journal de desfazer (voltar_ciclo) também restaure o estado do preditor.
+
+
+class Preditor:
+    nome = None
+
+    def prever(self, pc):
+        """True se o desvio em `pc` deve ser tomado."""
+        raise NotImplementedError
+
+    def atualizar(self, pc, tomado, sim):
+        pass
+
+
+class PreditorEstatico(Preditor):
+    def __init__(self, tomado=False):
+        self.tomado = tomado
+        self.nome = 'tomado' if tomado else 'nao_tomado'
+
+    def prever(self, pc):
+        return self.tomado
+
+
+class Preditor1Bit(Preditor):
+    """Lembra o último resultado de cada desvio."""
+    nome = '1bit'
+
+    def __init__(self, tamanho=1024):
+        self.tabela = [False] * tamanho
+
+    def prever(self, pc):
+        return self.tabela[pc % len(self.tabela)]
+
+    def atualizar(self, pc, tomado, sim):
+        i = pc % len(self.tabela)
+        if self.tabela[i] != tomado:
+            sim._set_item(self.tabela, i, tomado)
+
+
+def _saturar(contador, tomado):
+    return min(contador + 1, 3) if tomado else max(contador - 1, 0)
+
+
+class Preditor2Bits(Preditor):
+    """Contadores saturantes de 2 bits (0-1 não toma, 2-3 toma)."""
+    nome = '2bits'
+
+    def __init__(self, tamanho=1024):
+        self.tabela = [1] * tamanho  # Começa em "fracamente não tomado"
+
+    def prever(self, pc):
+        return self.tabela[pc % len(self.tabela)] >= 2
+
+    def atualizar(self, pc, tomado, sim):
+        i = pc % len(self.tabela)
+        novo = _saturar(self.tabela[i], tomado)
+        if novo != self.tabela[i]:
+            sim._set_item(self.tabela, i, novo)
+
+
+class PreditorGshare(Preditor):
+    """Contadores de 2 bits indexados por PC xor histórico global."""
+    nome = 'gshare'
+
+    def __init__(self, tamanho=1024, bits_historia=8):
+        self.tabela = [1] * tamanho
+        self.mascara = (1 << bits_historia) - 1
+        self.historia = 0
+
+    def _indice(self, pc):
+        return (pc ^ self.historia) % len(self.tabela)
+
+    def prever(self, pc):
+        return self.tabela[self._indice(pc)] >= 2
+
+    def atualizar(self, pc, tomado, sim):
+        i = self._indice(pc)
+        novo = _saturar(self.tabela[i], tomado)
+        if novo != self.tabela[i]:
+            sim._set_item(self.tabela, i, novo)
+        sim._set(self, 'historia', ((self.historia << 1) | tomado) & self.mascara)
+
+
+class PreditorTorneio(Preditor):
+    """Escolhe, por PC, entre um preditor local de 2 bits e o gshare."""
+    nome = 'torneio'
+
+    def __init__(self, tamanho=1024, bits_historia=8):
+        self.local = Preditor2Bits(tamanho)
+        self.global_ = PreditorGshare(tamanho, bits_historia)
+        self.escolha = [1] * tamanho  # 0-1 prefere o local, 2-3 o global
+
+    def prever(self, pc):
+        if self.escolha[pc % len(self.escolha)] >= 2:
+            return self.global_.prever(pc)
+        return self.local.prever(pc)
+
+    def atualizar(self, pc, tomado, sim):
+        acerto_local = self.local.prever(pc) == tomado
+        acerto_global = self.global_.prever(pc) == tomado
+        if acerto_local != acerto_global:
+            i = pc % len(self.escolha)
+            novo = _saturar(self.escolha[i], acerto_global)
+            if novo != self.escolha[i]:
+                sim._set_item(self.escolha, i, novo)
+        self.local.atualizar(pc, tomado, sim)
+        self.global_.atualizar(pc, tomado, sim)
+
+
+class BTB:
+    """Branch target buffer de mapeamento direto: pc -> alvo do último desvio tomado."""
+
+    def __init__(self, tamanho=64):
+        self.tags = [None] * tamanho
+        self.alvos = [0] * tamanho
+
+    def alvo(self, pc):
+        i = pc % len(self.tags)
+        return self.alvos[i] if self.tags[i] == pc else None
+
+    def atualizar(self, pc, alvo, sim):
+        i = pc % len(self.tags)
+        if self.tags[i] != pc:
+            sim._set_item(self.tags, i, pc)
+        if self.alvos[i] != alvo:
+            sim._set_item(self.alvos, i, alvo)
+
+
+PREDITORES = {
+    'nao_tomado': lambda tamanho: PreditorEstatico(False),
+    'tomado': lambda tamanho: PreditorEstatico(True),
+    '1bit': Preditor1Bit,
+    '2bits': Preditor2Bits,
+    'gshare': PreditorGshare,
+    'torneio': PreditorTorneio,
+}
+
+
+def criar_preditor(nome, tamanho=1024):
+    try:
+        return PREDITORES[nome](tamanho)
+    except KeyError:
+        raise ValueError(f"Preditor desconhecido: {nome} (opções: {', '.join(PREDITORES)})") from None
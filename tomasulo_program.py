@@ -0,0 +1,130 @@
+# tomasulo_program.py
+import re
+from collections import namedtuple
+from enum import IntEnum
+
+NUM_REGS = 32
+
+
+class Op(IntEnum):
+    ADD = 0
+    SUB = 1
+    MUL = 2
+    DIV = 3
+    BEQ = 4
+    LW = 5
+    SW = 6
+
+
+class Instrucao(namedtuple('Instrucao', 'id op dest s1 s2 codigo rd rs1 rs2 imm pc')):
+    """Instrução já decodificada (imutável).
+
+    op/dest/s1/s2 guardam o texto original para exibição; codigo, rd, rs1, rs2
+    e imm são o que o motor usa. rs2 é None quando o segundo operando é
+    imediato (imm). No BEQ, rd e rs1 são os registradores comparados e imm é o
+    índice da instrução alvo. Em LW/SW (`LW R1, 8(R2)`), rs1 é a base e imm o
+    deslocamento; rd é o destino do LW ou o registrador com o dado do SW.
+    pc é a posição da instrução no programa.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        if self.codigo in (Op.LW, Op.SW):
+            return f"{self.op} {self.dest}, {self.s2}({self.s1})"
+        return f"{self.op} {self.dest}, {self.s1}, {self.s2}"
+
+
+def indice_registrador(nome):
+    """'R5' -> 5; None se não for um registrador válido."""
+    nome = nome.strip().upper()
+    if len(nome) < 2 or nome[0] != 'R' or not nome[1:].isdigit():
+        return None
+    i = int(nome[1:])
+    return i if i < NUM_REGS else None
+
+
+_ENDERECO = re.compile(r'^(-?\w*)\((\w+)\)$')  # deslocamento(base), ex.: 8(R2), -4(R3), (R1), vetor(R0)
+
+
+def ler_inteiro(txt, rotulos=None):
+    """Inteiro de um imediato, um deslocamento ou uma diretiva, nos dois formatos
+    de programa: decimal (zeros à esquerda aceitos), 0x, 0o ou 0b, ou um rótulo
+    de `rotulos` (nome -> índice/endereço). ValueError se nenhum."""
+    try:
+        return int(txt, 0)
+    except ValueError:
+        pass
+    try:
+        return int(txt)
+    except ValueError:
+        if rotulos and txt in rotulos:
+            return rotulos[txt]
+        raise
+
+
+def _decodificar_memoria(partes, id, pc, rotulos=None):
+    op, dest, endereco = partes[0].upper(), partes[1], partes[2]
+    rd = indice_registrador(dest)
+    if rd is None:
+        raise ValueError(f"Linha {id}: registrador inválido '{dest}'")
+    m = _ENDERECO.match(endereco.replace(' ', ''))
+    if m is None:
+        raise ValueError(f"Linha {id}: endereço inválido '{endereco}' (esperado deslocamento(Rn))")
+    base = indice_registrador(m.group(2))
+    if base is None:
+        raise ValueError(f"Linha {id}: registrador inválido '{m.group(2)}'")
+    try:
+        deslocamento = ler_inteiro(m.group(1) or '0', rotulos)
+    except ValueError:
+        raise ValueError(f"Linha {id}: deslocamento inválido '{m.group(1)}'") from None
+    return Instrucao(id, op, dest, m.group(2).upper(), str(deslocamento), Op[op], rd, base, None, deslocamento, pc)
+
+
+def decodificar_linha(txt, id, pc=None, rotulos=None):
+    """Decodifica uma linha; devolve None para linhas vazias.
+
+    Linhas incompletas ou com operandos a mais são ValueError. Imediatos e
+    alvos de BEQ podem ser rótulos de `rotulos` (ver tomasulo_asm); o texto
+    exibido (s2) passa a ser o valor resolvido.
+    """
+    partes = txt.replace(',', ' ').split()
+    if not partes:
+        return None
+    if len(partes) == 3 and partes[0].upper() in ('LW', 'SW'):
+        return _decodificar_memoria(partes, id, pc, rotulos)
+    if len(partes) != 4:
+        raise ValueError(f"Linha {id}: instrução malformada '{txt.strip()}' (esperado OP Rd, Rs, Rt|imediato)")
+    op, dest, s1, s2 = partes[0].upper(), partes[1], partes[2], partes[3]
+    if op not in Op.__members__:
+        raise ValueError(f"Linha {id}: operação desconhecida '{partes[0]}'")
+    codigo = Op[op]
+    if codigo in (Op.LW, Op.SW):
+        raise ValueError(f"Linha {id}: {op} usa o formato '{op} Rn, deslocamento(Rn)'")
+
+    rd = indice_registrador(dest)
+    if rd is None:
+        raise ValueError(f"Linha {id}: registrador inválido '{dest}'")
+    rs1 = indice_registrador(s1)
+    if rs1 is None:
+        raise ValueError(f"Linha {id}: registrador inválido '{s1}'")
+
+    rs2 = None if codigo == Op.BEQ else indice_registrador(s2)
+    imm = None
+    if rs2 is None:
+        try:
+            imm = ler_inteiro(s2, rotulos)
+        except ValueError:
+            tipo = "alvo de salto" if codigo == Op.BEQ else "operando"
+            raise ValueError(f"Linha {id}: {tipo} inválido '{s2}'") from None
+        s2 = str(imm)
+    return Instrucao(id, op, dest, s1, s2, codigo, rd, rs1, rs2, imm, pc)
+
+
+def decodificar(linhas):
+    """Decodifica o programa inteiro numa tupla de Instrucao (indexada pelo PC)."""
+    programa = []
+    for i, txt in enumerate(linhas):
+        instr = decodificar_linha(txt, i, len(programa))
+        if instr is not None:
+            programa.append(instr)
+    return tuple(programa)
@@ -0,0 +1,208 @@
+# tomasulo_replay.py
+import bisect
+import json
+import mmap
+import struct
+import zlib
+from collections import OrderedDict
+from tomasulo_trace import formatar
+
+# Gravação de uma execução para ser revista sem re-simular (GUI em modo
+# replay). A simulação roda uma vez, ciclo a ciclo, e cada ciclo vira um
+# quadro com o que o GUI mostra: as linhas das tabelas (RS, ROB, RAT e
+# registradores, já formatadas) e os eventos do ciclo. Formato:
+#   cabeçalho  mágico, versão (u32), reservado (u32), posição do índice (u64)
+#   blocos     zlib(JSON [quadro-chave, delta, delta, ...]), um a cada
+#              `intervalo` ciclos consecutivos
+#   índice     JSON com a versão, os metadados (relatório final, preditor,
+#              ...) e [primeiro ciclo, posição, tamanho] de cada bloco
+# O quadro-chave traz as tabelas inteiras; o delta, por tabela, o novo
+# tamanho e só as linhas que mudaram. Ir para um ciclo lê o índice (busca
+# binária), descomprime um bloco e aplica no máximo `intervalo` - 1 deltas.
+
+VERSAO = 2
+_MAGICO = b'TOMREPL\x00'
+_CABECALHO = struct.Struct('<8sIIQ')
+_BLOCOS_EM_MEMORIA = 4
+REGISTRADORES_EXIBIDOS = 16
+
+
+def linhas_exibicao(sim):
+    """Linhas das tabelas do GUI (rs, rob, rat, regs) no ciclo atual de sim."""
+    rs = []
+    for e in sim.rs_add + sim.rs_mul + sim.rs_mem:
+        rs.append((e.nome, "🔴 Busy" if e.busy else "🟢 Free", e.op if e.op else "-",
+                   e.vj if e.vj is not None else "-", e.vk if e.vk is not None else "-",
+                   e.qj if e.qj is not None else "", e.qk if e.qk is not None else "",
+                   e.dest if e.busy else "", e.tempo_restante))
+    rob = []
+    for e in sim.rob:
+        if e.busy:
+            destino = "Mem" if e.tipo == 'SW' else f"R{e.dest}"
+            rob.append((e.id, e.tipo, destino, e.valor, "✅ Sim" if e.pronto else "⏳ Não", str(e.instrucao)))
+    rat = [(f"R{i}", sim.rat[i] if sim.rat[i] is not None else "-") for i in range(REGISTRADORES_EXIBIDOS)]
+    regs = [(f"R{i}", sim.regs[i]) for i in range(REGISTRADORES_EXIBIDOS)]
+    return rs, rob, rat, regs
+
+
+def _delta(antigas, novas):
+    return len(novas), [(i, linha) for i, linha in enumerate(novas) if i >= len(antigas) or antigas[i] != linha]
+
+
+def _aplicar(antigas, delta):
+    tamanho, mudancas = delta
+    novas = antigas[:tamanho]
+    novas.extend([None] * (tamanho - len(novas)))
+    for i, linha in mudancas:
+        novas[i] = linha
+    return novas
+
+
+class GravadorReplay:
+    """Escreve os quadros de uma execução, um ciclo por chamada a quadro()."""
+
+    def __init__(self, caminho, intervalo=256):
+        if intervalo < 1:
+            raise ValueError("intervalo entre quadros-chave deve ser >= 1")
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self._f = open(caminho, 'wb')
+        self._f.write(_CABECALHO.pack(_MAGICO, VERSAO, 0, 0)) # posição 0 = sem índice até fechar()
+        self._bloco = []
+        self._blocos = [] # [primeiro ciclo, posição, tamanho]
+        self._anteriores = None
+        self.ultimo_ciclo = None
+
+    def quadro(self, sim, eventos):
+        """Grava o ciclo atual de sim; eventos são os devolvidos por executar_ciclo."""
+        if self.ultimo_ciclo is not None and sim.ciclo != self.ultimo_ciclo + 1:
+            raise ValueError("o replay precisa de ciclos consecutivos")
+        tabelas = [list(t) for t in linhas_exibicao(sim)]
+        textos = [(int(ev.estagio), formatar(ev, sim.prog_original)) for ev in eventos]
+        if not self._bloco or len(self._bloco) >= self.intervalo:
+            self._descarregar(sim.ciclo)
+            self._bloco.append((tabelas, textos))
+        else:
+            self._bloco.append(([_delta(a, n) for a, n in zip(self._anteriores, tabelas)], textos))
+        self._anteriores = tabelas
+        self.ultimo_ciclo = sim.ciclo
+
+    def _descarregar(self, proximo_ciclo):
+        if self._bloco:
+            dados = zlib.compress(json.dumps(self._bloco, separators=(',', ':')).encode())
+            self._blocos[-1][1:] = [self._f.tell(), len(dados)]
+            self._f.write(dados)
+            self._bloco = []
+        if proximo_ciclo is not None:
+            self._blocos.append([proximo_ciclo, 0, 0])
+
+    def fechar(self, meta=None):
+        """Grava o último bloco, o índice e o cabeçalho. meta vai junto do índice."""
+        self._descarregar(None)
+        posicao = self._f.tell()
+        indice = {'versao': VERSAO, 'meta': meta or {}, 'ultimo_ciclo': self.ultimo_ciclo, 'blocos': self._blocos}
+        self._f.write(json.dumps(indice, default=str).encode())
+        self._f.seek(0)
+        self._f.write(_CABECALHO.pack(_MAGICO, VERSAO, 0, posicao))
+        self._f.close()
+
+    def abortar(self):
+        """Fecha sem gravar o índice: o cabeçalho fica com a posição 0 e
+        Replay recusa o arquivo como incompleto."""
+        self._f.close()
+
+
+def gravar(sim, caminho, max_cycles=None, intervalo=256):
+    """Roda o programa carregado em sim ciclo a ciclo (sem pular ciclos ociosos,
+    que também aparecem no replay), gravando um quadro por ciclo. Devolve o
+    relatorio() final, que também fica nos metadados do arquivo. Se a gravação
+    falhar ou for interrompida, o arquivo fica sem índice (incompleto)."""
+    gravador = GravadorReplay(caminho, intervalo)
+    gravar_historico, tracing = sim.gravar_historico, sim.tracing
+    sim.gravar_historico, sim.tracing = False, True
+    sim.history.descartar_journal()
+    try:
+        gravador.quadro(sim, [])
+        while not sim.esta_terminado() and (max_cycles is None or sim.ciclo < max_cycles):
+            gravador.quadro(sim, sim.executar_ciclo())
+    except BaseException:
+        # Erro ou interrupção: o arquivo fica sem índice, não como uma gravação completa
+        gravador.abortar()
+        raise
+    finally:
+        sim.gravar_historico, sim.tracing = gravar_historico, tracing
+        sim._journal = None
+    relatorio = sim.relatorio()
+    gravador.fechar({'relatorio': relatorio, 'preditor': sim.preditor_tipo,
+                     'resolucao_desvio': sim.resolucao_desvio, 'terminado': sim.esta_terminado()})
+    return relatorio
+
+
+class Replay:
+    """Leitura de um arquivo de gravar(), só leitura via mmap.
+
+    quadro(ciclo) devolve (tabelas, eventos) do ciclo, com tabelas como em
+    linhas_exibicao e eventos [(estágio, texto)]. Os últimos blocos
+    decodificados ficam em memória, então andar ciclo a ciclo não
+    descomprime nada de novo na maior parte das vezes.
+    """
+
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _CABECALHO.size or self._mm[:len(_MAGICO)] != _MAGICO:
+            raise ValueError(f"{caminho}: não é um replay do simulador")
+        _, versao, _, posicao = _CABECALHO.unpack_from(self._mm)
+        if versao != VERSAO:
+            raise ValueError(f"{caminho}: replay na versão {versao} do formato (esperada {VERSAO})")
+        if posicao == 0:
+            raise ValueError(f"{caminho}: replay incompleto (a gravação não terminou)")
+        try:
+            indice = json.loads(self._mm[posicao:])
+        except ValueError:
+            raise ValueError(f"{caminho}: índice do replay inválido") from None
+        if indice.get('versao') != VERSAO:
+            raise ValueError(f"{caminho}: índice na versão {indice.get('versao')} do formato (esperada {VERSAO})")
+        self.caminho = caminho
+        self.meta = indice['meta']
+        self._blocos = indice['blocos']
+        self._inicios = [b[0] for b in self._blocos]
+        self.primeiro_ciclo = self._inicios[0]
+        self.ultimo_ciclo = indice['ultimo_ciclo']
+        self._cache = OrderedDict()
+
+    def quadro(self, ciclo):
+        """Quadro do ciclo, limitado ao intervalo gravado (ver ciclo_valido)."""
+        ciclo = self.ciclo_valido(ciclo)
+        b = bisect.bisect_right(self._inicios, ciclo) - 1
+        return self._bloco(b)[ciclo - self._inicios[b]]
+
+    def ciclo_valido(self, ciclo):
+        return min(max(ciclo, self.primeiro_ciclo), self.ultimo_ciclo)
+
+    def _bloco(self, b):
+        quadros = self._cache.get(b)
+        if quadros is not None:
+            self._cache.move_to_end(b)
+            return quadros
+        _, posicao, tamanho = self._blocos[b]
+        try:
+            registros = json.loads(zlib.decompress(self._mm[posicao:posicao + tamanho]))
+        except (ValueError, zlib.error) as e:
+            raise ValueError(f"{self.caminho}: bloco {b} do replay inválido ({e})") from None
+        # O JSON devolve listas; linhas e eventos voltam a ser tuplas, como em linhas_exibicao
+        tabelas, eventos = registros[0]
+        tabelas = [[tuple(linha) for linha in t] for t in tabelas]
+        quadros = [(tabelas, [tuple(ev) for ev in eventos])]
+        for deltas, eventos in registros[1:]:
+            deltas = [(tamanho, [(i, tuple(linha)) for i, linha in mudancas]) for tamanho, mudancas in deltas]
+            tabelas = [_aplicar(t, d) for t, d in zip(tabelas, deltas)]
+            quadros.append((tabelas, [tuple(ev) for ev in eventos]))
+        self._cache[b] = quadros
+        if len(self._cache) > _BLOCOS_EM_MEMORIA:
+            self._cache.popitem(last=False)
+        return quadros
+
+    def fechar(self):
+        self._cache.clear()
+        self._mm.close()
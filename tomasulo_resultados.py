@@ -0,0 +1,221 @@
+# tomasulo_resultados.py
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import weakref
+from tomasulo_asm import DIRETORIO_CACHE, hash_programa
+from tomasulo_trace import SinkNulo
+
+# Cache persistente de resultados: uma execução completa (do ciclo 0 até o
+# fim ou max_cycles) é determinada pelo programa e pela configuração da
+# máquina, então o relatorio() e o banco de registradores final podem ser
+# reaproveitados sem simular. A chave é o sha256 de:
+#   - versao_motor(): hash das fontes de MODULOS_MOTOR, os que definem o
+#     resultado de uma execução (mudar o simulador invalida o que foi gravado
+#     antes; GUI, varredura, benchmarks etc. não entram);
+#   - hash_programa do programa decodificado e da imagem do .data;
+#   - os atributos de CAMPOS_CONFIG e o max_cycles.
+# Fica num sqlite (padrão: resultados.sqlite no diretório do cache de
+# programas) com descarte LRU quando o total passa de `limite_bytes`. Cada
+# linha guarda a versão do motor que a produziu e só é lida por essa versão,
+# então checkouts diferentes podem dividir o arquivo; as de outras versões
+# saem pelo LRU ou por podar() (python -m tomasulo_resultados --podar).
+
+CAMPOS_CONFIG = ('latencias', 'regs_iniciais', 'tamanho_rob', 'num_rs', 'tamanho_lsq', 'latencia_memoria',
+                 'memoria_inicial', 'backend', 'preditor_tipo', 'tamanho_preditor', 'tamanho_btb',
+                 'resolucao_desvio', 'largura_issue', 'largura_commit', 'num_cdb', 'num_ufs')
+# Módulos cujo código muda relatorio() ou os registradores finais (o motor em
+# lote entra porque a varredura grava os resultados dele)
+MODULOS_MOTOR = ('tomasulo_engine', 'tomasulo_compact', 'tomasulo_lote', 'tomasulo_predictor', 'tomasulo_program',
+                 'tomasulo_asm', 'tomasulo_resultados')
+ARQUIVO_PADRAO = os.path.join(DIRETORIO_CACHE, 'resultados.sqlite')
+
+_versao = None
+_hashes = weakref.WeakKeyDictionary() # instrucoes (ProgramaMapeado) -> {memória: hash}
+
+
+def versao_motor():
+    """Hash das fontes de MODULOS_MOTOR, calculado uma vez por processo."""
+    global _versao
+    if _versao is None:
+        h = hashlib.sha256()
+        diretorio = os.path.dirname(os.path.abspath(__file__))
+        for modulo in MODULOS_MOTOR:
+            h.update(modulo.encode() + b'\x00')
+            with open(os.path.join(diretorio, modulo + '.py'), 'rb') as f:
+                h.update(f.read())
+        _versao = h.hexdigest()
+    return _versao
+
+
+def _hash_programa(instrucoes, memoria):
+    # ProgramaMapeado aceita weakref e costuma ser grande: o hash fica memorizado
+    try:
+        por_memoria = _hashes.setdefault(instrucoes, {})
+    except TypeError:
+        return hash_programa(instrucoes, memoria)
+    chave = json.dumps(sorted(memoria.items()))
+    if chave not in por_memoria:
+        por_memoria[chave] = hash_programa(instrucoes, memoria)
+    return por_memoria[chave]
+
+
+def chave(sim, max_cycles=None, programa=None):
+    """Chave do resultado de sim.run(max_cycles) a partir do ciclo 0.
+
+    programa (tomasulo_asm.Programa) substitui o programa carregado em sim,
+    para calcular a chave com uma cópia só configurada (ver tomasulo_sweep).
+    """
+    if programa is None:
+        instrucoes, memoria = sim.prog_original, sim.memoria_programa
+    else:
+        instrucoes, memoria = programa.instrucoes, programa.memoria
+    config = {campo: getattr(sim, campo) for campo in CAMPOS_CONFIG}
+    config['memoria_inicial'] = sorted(config['memoria_inicial'].items())
+    texto = json.dumps([versao_motor(), _hash_programa(instrucoes, memoria), config, max_cycles], sort_keys=True)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def cacheavel(sim):
+    """Se a próxima execução de sim pode vir do cache: a máquina está no estado
+    inicial que a chave descreve (em_estado_inicial: nada simulado, avançado
+    por avancar_funcional ou editado sem reset) e nada depende de simular de
+    fato (instrumentação, linha do tempo, eventos)."""
+    return (sim.instrumentacao is None and sim.linha_do_tempo is None and isinstance(sim.sink, SinkNulo)
+            and sim.em_estado_inicial())
+
+
+class CacheResultados:
+    """Resultados gravados em sqlite, chaveados por chave().
+
+    Os acessos atualizam a ordem de uso (LRU) em lote, em guardar() e em
+    fechar(). Só as entradas da versao_motor() atual são lidas; as outras
+    ficam até o LRU ou podar(). Vários processos e checkouts podem usar o
+    mesmo arquivo (modo WAL).
+    """
+
+    def __init__(self, caminho=ARQUIVO_PADRAO, limite_bytes=64 << 20):
+        if caminho != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        self.acertos = self.falhas = 0
+        self._usados = {} # chave -> instante do último acesso, ainda não gravado
+        self._con = sqlite3.connect(caminho, timeout=60)
+        self._con.execute('PRAGMA journal_mode=WAL')
+        self._con.execute('PRAGMA synchronous=NORMAL')
+        with self._con:
+            self._con.execute('CREATE TABLE IF NOT EXISTS resultados (chave TEXT PRIMARY KEY, versao TEXT NOT NULL, '
+                              'dados BLOB NOT NULL, tamanho INTEGER NOT NULL, uso INTEGER NOT NULL)')
+            self._con.execute('CREATE INDEX IF NOT EXISTS resultados_uso ON resultados (uso)')
+        self._total = self._somar()
+
+    def _somar(self):
+        return self._con.execute('SELECT COALESCE(SUM(tamanho), 0) FROM resultados').fetchone()[0]
+
+    def __len__(self):
+        return self._con.execute('SELECT COUNT(*) FROM resultados').fetchone()[0]
+
+    def buscar(self, chave):
+        """{'relatorio': ..., 'regs': [...]} gravado para a chave, ou None."""
+        linha = self._con.execute('SELECT dados FROM resultados WHERE chave = ? AND versao = ?',
+                                  (chave, versao_motor())).fetchone()
+        if linha is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        self._usados[chave] = time.time_ns()
+        return json.loads(linha[0])
+
+    def guardar(self, chave, relatorio, regs):
+        dados = json.dumps({'relatorio': relatorio, 'regs': list(regs)}).encode()
+        with self._con:
+            self._registrar_usos()
+            antigo = self._con.execute('SELECT tamanho FROM resultados WHERE chave = ?', (chave,)).fetchone()
+            self._con.execute('INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?, ?)',
+                              (chave, versao_motor(), dados, len(dados), time.time_ns()))
+            self._total += len(dados) - (antigo[0] if antigo else 0)
+            if self._total > self.limite_bytes:
+                self._descartar()
+
+    def _registrar_usos(self):
+        if self._usados:
+            self._con.executemany('UPDATE resultados SET uso = ? WHERE chave = ?',
+                                  [(uso, chave) for chave, uso in self._usados.items()])
+            self._usados.clear()
+
+    def _descartar(self):
+        # Outros processos também gravam: o total é recontado antes de apagar
+        self._total = self._somar()
+        excesso = self._total - self.limite_bytes
+        if excesso <= 0:
+            return
+        apagar = []
+        for chave, tamanho in self._con.execute('SELECT chave, tamanho FROM resultados ORDER BY uso'):
+            if excesso <= 0:
+                break
+            apagar.append((chave,))
+            excesso -= tamanho
+            self._total -= tamanho
+        self._con.executemany('DELETE FROM resultados WHERE chave = ?', apagar)
+
+    def podar(self):
+        """Apaga as entradas de outras versões do motor e devolve quantas eram."""
+        with self._con:
+            apagadas = self._con.execute('DELETE FROM resultados WHERE versao != ?', (versao_motor(),)).rowcount
+        self._total = self._somar()
+        return apagadas
+
+    def limpar(self):
+        with self._con:
+            self._con.execute('DELETE FROM resultados')
+        self._usados.clear()
+        self._total = 0
+
+    def fechar(self):
+        with self._con:
+            self._registrar_usos()
+        self._con.close()
+
+
+def executar(sim, cache, max_cycles=None):
+    """sim.run(max_cycles) com cache: devolve (relatorio, registradores finais).
+
+    Num acerto nada é simulado e sim continua no ciclo 0. Fora de cacheavel(sim)
+    simula sempre, sem consultar nem gravar o cache.
+    """
+    if not cacheavel(sim):
+        return sim.run(max_cycles=max_cycles), list(sim.regs)
+    k = chave(sim, max_cycles)
+    resultado = cache.buscar(k)
+    if resultado is not None:
+        return resultado['relatorio'], resultado['regs']
+    relatorio = sim.run(max_cycles=max_cycles)
+    cache.guardar(k, relatorio, sim.regs)
+    return relatorio, list(sim.regs)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m tomasulo_resultados',
+                                     description='Manutenção do cache de resultados.')
+    parser.add_argument('arquivo', nargs='?', default=ARQUIVO_PADRAO)
+    parser.add_argument('--podar', action='store_true', help='apaga os resultados de outras versões do motor')
+    parser.add_argument('--limpar', action='store_true', help='apaga todos os resultados')
+    args = parser.parse_args(argv)
+    cache = CacheResultados(args.arquivo)
+    try:
+        if args.limpar:
+            cache.limpar()
+        elif args.podar:
+            print(f"{cache.podar()} resultados de outras versões apagados")
+        print(f"{args.arquivo}: {len(cache)} resultados, {cache._total} bytes (versão {versao_motor()[:12]})")
+    finally:
+        cache.fechar()
+
+
+if __name__ == "__main__":
+    main()
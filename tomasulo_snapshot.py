@@ -0,0 +1,292 @@
+# tomasulo_snapshot.py
+import json
+import mmap
+import struct
+import zlib
+from tomasulo_asm import ProgramaMapeado, TAMANHO_REGISTRO, empacotar
+from tomasulo_history import NAO_SALVAR
+from tomasulo_predictor import BTB, Preditor
+from tomasulo_program import NUM_REGS
+
+# Snapshot de uma simulação pausada (save_snapshot/load_snapshot), para retomar
+# em outro processo ou compartilhar. Formato, little-endian:
+#   cabeçalho  mágico, versão (u16), reservado (u16), crc32 do resto (u32),
+#              ciclo (u64), número de instruções do programa (u64)
+#   programa   um registro de tomasulo_asm.empacotar por instrução
+#   estado     JSON comprimido (zlib), até o fim do arquivo: configuração,
+#              registradores, RAT, memória, ROB, RS, LSQ, filas de wakeup,
+#              PC, métricas, preditor e BTB (ver _estado)
+# O estado tem só campos explícitos com valores simples, validados na leitura:
+# abrir um snapshot não executa código e não depende de nomes de classes. O
+# programa volta como ProgramaMapeado sobre o próprio arquivo. A versão muda
+# sempre que o layout ou o conjunto de campos do estado mudar.
+
+VERSAO = 2
+_MAGICO = b'TOMSNAP\x00'
+_MAX_TAMANHO_PREDITOR = 1 << 24
+_CABECALHO = struct.Struct('<8sHHIQQ')
+_BLOCO_ESCRITA = 1 << 20
+
+_CAMPOS_ROB = ('tipo', 'dest', 'valor', 'pronto', 'instrucao', 'busy', 'previsto', 'ciclo_emissao', 'rat_salvo')
+_CAMPOS_RS = ('busy', 'op', 'vj', 'vk', 'qj', 'qk', 'dest', 'tempo_restante')
+_CAMPOS_LSQ = ('rob', 'load', 'endereco', 'valor', 'iniciado', 'fonte')
+_CAMPOS_PREDITOR = ('tabela', 'historia', 'escolha', 'local', 'global_')
+_OPS = ('ADD', 'SUB', 'MUL', 'DIV', 'BEQ', 'LW', 'SW')
+
+
+def _preditor(p):
+    return {campo: _preditor(v) if isinstance(v, Preditor) else v
+            for campo, v in vars(p).items() if campo in _CAMPOS_PREDITOR}
+
+
+def _campo_rob(entrada, campo):
+    if campo == 'instrucao':
+        return None if entrada.instrucao is None else entrada.instrucao.pc # Volta como prog_original[pc]
+    return getattr(entrada, campo)
+
+
+def _estado(sim):
+    """Estado da máquina como dict de valores simples (JSON)."""
+    todas_rs = sim.rs_add + sim.rs_mul + sim.rs_mem
+    return {
+        'config': {
+            'latencias': sim.latencias, 'regs_iniciais': sim.regs_iniciais, 'tamanho_rob': sim.tamanho_rob,
+            'num_rs': sim.num_rs, 'tamanho_lsq': sim.tamanho_lsq, 'latencia_memoria': sim.latencia_memoria,
+            'memoria_inicial': list(sim.memoria_inicial.items()), 'backend': sim.backend,
+            'preditor': sim.preditor_tipo, 'tamanho_preditor': sim.tamanho_preditor,
+            'tamanho_btb': sim.tamanho_btb, 'resolucao_desvio': sim.resolucao_desvio,
+            'largura_issue': sim.largura_issue, 'largura_commit': sim.largura_commit,
+            'num_cdb': sim.num_cdb or 0, 'num_ufs': {c: n or 0 for c, n in sim.num_ufs.items()},
+        },
+        'memoria_programa': list(sim.memoria_programa.items()),
+        'ciclo': sim.ciclo, 'pc': sim.pc, 'head': sim.head, 'tail': sim.tail, 'itens_no_rob': sim.itens_no_rob,
+        'regs': list(sim.regs), 'rat': list(sim.rat), 'memoria': list(sim.memoria.items()),
+        'metricas': sim.metricas,
+        'rob': [[_campo_rob(e, c) for c in _CAMPOS_ROB] for e in sim.rob],
+        'rs': [[getattr(rs, c) for c in _CAMPOS_RS] for rs in todas_rs],
+        'lsq': [[getattr(e, c) for c in _CAMPOS_LSQ] for e in sim.lsq],
+        'consumidores': [[tag, [[rs.indice, lado] for rs, lado in espera]] for tag, espera in sim.consumidores.items()],
+        'prontas': [rs.indice for rs in sim.prontas],
+        'executando': [rs.indice for rs in sim.executando],
+        'conclusoes': [[ciclo, indice] for ciclo, indice, _ in sim.conclusoes],
+        'enderecos': [[ciclo, indice] for ciclo, indice, _ in sim.enderecos],
+        'preditor': _preditor(sim.preditor),
+        'btb': {'tags': sim.btb.tags, 'alvos': sim.btb.alvos},
+    }
+
+
+def salvar(sim, caminho):
+    estado = zlib.compress(json.dumps(_estado(sim), separators=(',', ':')).encode())
+    with open(caminho, 'wb') as f:
+        f.write(bytes(_CABECALHO.size)) # Regravado no fim, com o crc
+        crc = 0
+        buffer = bytearray()
+        for instr in sim.prog_original:
+            buffer += empacotar(instr)
+            if len(buffer) >= _BLOCO_ESCRITA:
+                f.write(buffer)
+                crc = zlib.crc32(buffer, crc)
+                buffer.clear()
+        f.write(buffer)
+        f.write(estado)
+        crc = zlib.crc32(estado, zlib.crc32(buffer, crc))
+        f.seek(0)
+        f.write(_CABECALHO.pack(_MAGICO, VERSAO, 0, crc, sim.ciclo, len(sim.prog_original)))
+
+
+def _desempacotar_cabecalho(dados, caminho):
+    if len(dados) < _CABECALHO.size or dados[:len(_MAGICO)] != _MAGICO:
+        raise ValueError(f"{caminho}: não é um snapshot do simulador")
+    campos = _CABECALHO.unpack_from(dados)
+    if campos[1] != VERSAO:
+        raise ValueError(f"{caminho}: snapshot na versão {campos[1]} do formato (esperada {VERSAO})")
+    return campos
+
+
+class _Invalido(ValueError):
+    pass
+
+
+def _inteiro(v, campo, minimo=None, maximo=None, nulo=False):
+    if v is None and nulo:
+        return None
+    if type(v) is not int or (minimo is not None and v < minimo) or (maximo is not None and v > maximo):
+        raise _Invalido(f"campo '{campo}' inválido: {v!r}")
+    return v
+
+
+def _booleano(v, campo):
+    if type(v) is not bool:
+        raise _Invalido(f"campo '{campo}' inválido: {v!r}")
+    return v
+
+
+def _lista(v, campo, tamanho=None, largura=None):
+    if type(v) is not list or (tamanho is not None and len(v) != tamanho):
+        raise _Invalido(f"campo '{campo}' inválido")
+    if largura is not None and any(type(item) is not list or len(item) != largura for item in v):
+        raise _Invalido(f"campo '{campo}' inválido")
+    return v
+
+
+def _dict(v, campo, chaves=None):
+    if type(v) is not dict or (chaves is not None and set(v) != set(chaves)):
+        raise _Invalido(f"campo '{campo}' inválido")
+    return v
+
+
+def _restaurar_preditor(p, dados):
+    for campo, valor in _dict(dados, 'preditor').items():
+        if campo not in _CAMPOS_PREDITOR or not hasattr(p, campo):
+            raise _Invalido(f"campo 'preditor.{campo}' inválido")
+        atual = getattr(p, campo)
+        if isinstance(atual, Preditor):
+            _restaurar_preditor(atual, valor)
+        elif isinstance(atual, list):
+            tipo = type(atual[0]) if atual else int
+            _lista(valor, f'preditor.{campo}', len(atual))
+            for v in valor:
+                if type(v) is not tipo:
+                    raise _Invalido(f"campo 'preditor.{campo}' inválido")
+            setattr(p, campo, valor)
+        else:
+            setattr(p, campo, _inteiro(valor, f'preditor.{campo}', 0))
+
+
+def _restaurar(sim, d, programa):
+    """Aplica o estado d (de _estado) em sim, validando tipos e faixas."""
+    from tomasulo_engine import EntradaLSQ # tomasulo_engine importa este módulo
+
+    _dict(d, 'estado')
+    c = _dict(d.get('config'), 'config')
+    try:
+        latencias = {str(op): _inteiro(v, 'latencias', 1) for op, v in _dict(c['latencias'], 'latencias').items()}
+        regs_iniciais = {str(r): _inteiro(v, 'regs_iniciais') for r, v in _dict(c['regs_iniciais'], 'regs_iniciais').items()}
+        memoria_inicial = {_inteiro(e, 'memoria_inicial'): _inteiro(v, 'memoria_inicial')
+                           for e, v in _lista(c['memoria_inicial'], 'memoria_inicial', largura=2)}
+        # Os tamanhos alocam as estruturas em reset(): conferidos com as listas
+        # gravadas antes de alocar, para um arquivo adulterado não pedir um ROB
+        # de bilhões de entradas
+        tamanho_rob = _inteiro(c['tamanho_rob'], 'tamanho_rob', 1)
+        num_rs = {k: _inteiro(v, 'num_rs', 1) for k, v in _dict(c['num_rs'], 'num_rs', ('ADD', 'MUL', 'MEM')).items()}
+        tamanho_btb = _inteiro(c['tamanho_btb'], 'tamanho_btb', 1)
+        _lista(d.get('rob'), 'rob', tamanho_rob)
+        _lista(d.get('rs'), 'rs', sum(num_rs.values()))
+        _lista(_dict(d.get('btb'), 'btb').get('tags'), 'btb.tags', tamanho_btb)
+        sim.set_config(latencias, regs_iniciais, tamanho_rob=tamanho_rob, num_rs=num_rs,
+                       backend=c['backend'], preditor=c['preditor'], tamanho_btb=tamanho_btb,
+                       resolucao_desvio=c['resolucao_desvio'],
+                       largura_issue=_inteiro(c['largura_issue'], 'largura_issue'),
+                       largura_commit=_inteiro(c['largura_commit'], 'largura_commit'),
+                       num_cdb=_inteiro(c['num_cdb'], 'num_cdb'),
+                       num_ufs={k: _inteiro(v, 'num_ufs') for k, v in _dict(c['num_ufs'], 'num_ufs', ('ADD', 'MUL')).items()},
+                       tamanho_lsq=_inteiro(c['tamanho_lsq'], 'tamanho_lsq'),
+                       latencia_memoria=_inteiro(c['latencia_memoria'], 'latencia_memoria'),
+                       memoria=memoria_inicial)
+        sim.tamanho_preditor = _inteiro(c['tamanho_preditor'], 'tamanho_preditor', 1, _MAX_TAMANHO_PREDITOR)
+    except KeyError as e:
+        raise _Invalido(f"configuração sem o campo {e}") from None
+
+    # reset() monta ROB, RS, preditor e BTB da configuração; o resto é preenchido por cima
+    sim.memoria_programa = {_inteiro(e, 'memoria_programa'): _inteiro(v, 'memoria_programa')
+                            for e, v in _lista(d['memoria_programa'], 'memoria_programa', largura=2)}
+    sim.prog_original = programa
+    sim.reset()
+    n_rob, n_instr = sim.tamanho_rob, len(programa)
+    todas_rs = sim.rs_add + sim.rs_mul + sim.rs_mem
+
+    sim.ciclo = _inteiro(d['ciclo'], 'ciclo', 0)
+    sim.pc = _inteiro(d['pc'], 'pc', 0, n_instr)
+    sim.head = _inteiro(d['head'], 'head', 0, n_rob - 1)
+    sim.tail = _inteiro(d['tail'], 'tail', 0, n_rob - 1)
+    sim.itens_no_rob = _inteiro(d['itens_no_rob'], 'itens_no_rob', 0, n_rob)
+    sim.regs = [_inteiro(v, 'regs') for v in _lista(d['regs'], 'regs', NUM_REGS)]
+    sim.rat = [_inteiro(v, 'rat', 0, n_rob - 1, nulo=True) for v in _lista(d['rat'], 'rat', NUM_REGS)]
+    sim.memoria = {_inteiro(e, 'memoria'): _inteiro(v, 'memoria') for e, v in _lista(d['memoria'], 'memoria', largura=2)}
+    sim.metricas = {k: _inteiro(v, f'metricas.{k}', 0) for k, v in _dict(d['metricas'], 'metricas', sim.metricas).items()}
+
+    for entrada, valores in zip(sim.rob, _lista(d['rob'], 'rob', n_rob, len(_CAMPOS_ROB))):
+        tipo, dest, valor, pronto, pc, busy, previsto, emissao, rat_salvo = valores
+        if tipo is not None and tipo not in _OPS:
+            raise _Invalido(f"campo 'rob.tipo' inválido: {tipo!r}")
+        entrada.tipo = tipo
+        entrada.dest = _inteiro(dest, 'rob.dest', 0, NUM_REGS - 1, nulo=True)
+        entrada.valor = _inteiro(valor, 'rob.valor', nulo=True)
+        entrada.pronto = _booleano(pronto, 'rob.pronto')
+        entrada.instrucao = None if pc is None else programa[_inteiro(pc, 'rob.instrucao', 0, n_instr - 1)]
+        entrada.busy = _booleano(busy, 'rob.busy')
+        entrada.previsto = _booleano(previsto, 'rob.previsto')
+        entrada.ciclo_emissao = _inteiro(emissao, 'rob.ciclo_emissao', 0)
+        entrada.rat_salvo = None if rat_salvo is None else tuple(
+            _inteiro(v, 'rob.rat_salvo', 0, n_rob - 1, nulo=True) for v in _lista(rat_salvo, 'rob.rat_salvo', NUM_REGS))
+
+    for rs, valores in zip(todas_rs, _lista(d['rs'], 'rs', len(todas_rs), len(_CAMPOS_RS))):
+        busy, op, vj, vk, qj, qk, dest, tempo = valores
+        if op is not None and op not in _OPS:
+            raise _Invalido(f"campo 'rs.op' inválido: {op!r}")
+        rs.busy = _booleano(busy, 'rs.busy')
+        rs.op = op
+        rs.vj = _inteiro(vj, 'rs.vj', nulo=True)
+        rs.vk = _inteiro(vk, 'rs.vk', nulo=True)
+        rs.qj = _inteiro(qj, 'rs.qj', 0, n_rob - 1, nulo=True)
+        rs.qk = _inteiro(qk, 'rs.qk', 0, n_rob - 1, nulo=True)
+        rs.dest = _inteiro(dest, 'rs.dest', 0, n_rob - 1, nulo=True)
+        rs.tempo_restante = _inteiro(tempo, 'rs.tempo_restante')
+
+    sim.lsq = []
+    for rob, load, endereco, valor, iniciado, fonte in _lista(d['lsq'], 'lsq', largura=len(_CAMPOS_LSQ)):
+        entrada = EntradaLSQ(_inteiro(rob, 'lsq.rob', 0, n_rob - 1), _booleano(load, 'lsq.load'))
+        entrada.endereco = _inteiro(endereco, 'lsq.endereco', nulo=True)
+        entrada.valor = _inteiro(valor, 'lsq.valor', nulo=True)
+        entrada.iniciado = _booleano(iniciado, 'lsq.iniciado')
+        entrada.fonte = _inteiro(fonte, 'lsq.fonte', 0, n_rob - 1, nulo=True)
+        sim.lsq.append(entrada)
+    if len(sim.lsq) > sim.tamanho_lsq:
+        raise _Invalido("LSQ maior que tamanho_lsq")
+
+    def estacao(indice, campo):
+        return todas_rs[_inteiro(indice, campo, 0, len(todas_rs) - 1)]
+    sim.consumidores = {}
+    for tag, espera in _lista(d['consumidores'], 'consumidores', largura=2):
+        lados = []
+        for indice, lado in _lista(espera, 'consumidores', largura=2):
+            if lado not in ('j', 'k'):
+                raise _Invalido(f"campo 'consumidores' inválido: {lado!r}")
+            lados.append((estacao(indice, 'consumidores'), lado))
+        sim.consumidores[_inteiro(tag, 'consumidores', 0, n_rob - 1)] = lados
+    sim.prontas = [estacao(i, 'prontas') for i in _lista(d['prontas'], 'prontas')]
+    sim.executando = [estacao(i, 'executando') for i in _lista(d['executando'], 'executando')]
+    # As listas foram gravadas na ordem de heap e continuam sendo heaps válidos
+    sim.conclusoes = [(_inteiro(ciclo, 'conclusoes', 0), rs.indice, rs) for ciclo, rs in
+                      ((ciclo, estacao(i, 'conclusoes')) for ciclo, i in _lista(d['conclusoes'], 'conclusoes', largura=2))]
+    sim.enderecos = [(_inteiro(ciclo, 'enderecos', 0), rs.indice, rs) for ciclo, rs in
+                     ((ciclo, estacao(i, 'enderecos')) for ciclo, i in _lista(d['enderecos'], 'enderecos', largura=2))]
+
+    _restaurar_preditor(sim.preditor, d['preditor'])
+    btb = _dict(d['btb'], 'btb', ('tags', 'alvos'))
+    sim.btb = BTB(sim.tamanho_btb)
+    sim.btb.tags = [_inteiro(v, 'btb.tags', 0, n_instr, nulo=True) for v in _lista(btb['tags'], 'btb.tags', sim.tamanho_btb)]
+    sim.btb.alvos = [_inteiro(v, 'btb.alvos') for v in _lista(btb['alvos'], 'btb.alvos', sim.tamanho_btb)]
+    sim.eventos = []
+
+
+def carregar(sim, caminho):
+    """Restaura estado e programa de `caminho` em sim (ValueError se inválido)."""
+    with open(caminho, 'rb') as f:
+        # O cabeçalho é conferido antes do mmap, que falha em arquivo vazio
+        _, _, _, crc, _, n = _desempacotar_cabecalho(f.read(_CABECALHO.size), caminho)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    fim_programa = _CABECALHO.size + n * TAMANHO_REGISTRO
+    if fim_programa > len(mm) or zlib.crc32(memoryview(mm)[_CABECALHO.size:]) != crc:
+        raise ValueError(f"{caminho}: snapshot corrompido (tamanho ou crc não conferem)")
+    estado = mm[fim_programa:]
+    # Restaura num simulador novo e só copia para sim se tudo for válido
+    novo = type(sim)()
+    try:
+        _restaurar(novo, json.loads(zlib.decompress(estado)), ProgramaMapeado(mm, n, _CABECALHO.size))
+    except (ValueError, KeyError, TypeError, zlib.error) as e:
+        raise ValueError(f"{caminho}: snapshot inválido ({e})") from None
+    # Fora NAO_SALVAR (o modo de execução e o que não é da máquina), tudo vem do arquivo
+    sim.__dict__.update((k, v) for k, v in novo.__dict__.items() if k not in NAO_SALVAR)
+    sim.prog_original = novo.prog_original
+    sim._journal = None
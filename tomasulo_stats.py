@@ -0,0 +1,250 @@
+# tomasulo_stats.py
+from bisect import bisect_right
+
+# Instrumentação opcional do simulador: `sim.instrumentacao = Instrumentacao()`
+# faz o motor chamar amostrar() no fim de cada ciclo (ou uma vez com peso n
+# quando pular_ciclos avança n ciclos ociosos). Não faz parte do estado
+# simulado, mas acompanha a posição no tempo como o histórico: as amostras dos
+# ciclos desfeitos por voltar_ciclo/goto_cycle ficam guardadas (a simulação é
+# determinística, então refazer esses ciclos daria as mesmas amostras) e o
+# relatório só lê até a posição atual (posicionar). Ciclos simulados sem
+# amostrar, como os re-simulados a partir de um checkpoint além do que já foi
+# amostrado, entram como SEM_AMOSTRA. reset() limpa tudo; quando o histórico
+# recomeça sem voltar ao ciclo 0 (avancar_funcional), as amostras depois do
+# ciclo atual são descartadas (truncar).
+
+# Causas de travamento no ISSUE
+ISSUE_OK = 'ok'              # Emitiu até a largura (ou parou num desvio previsto tomado)
+ISSUE_ROB_CHEIO = 'rob_cheio'
+ISSUE_FIM = 'fim'            # Nada para buscar (PC no fim do programa)
+ISSUE_LSQ_CHEIO = 'lsq_cheio' # LW/SW sem entrada livre na fila de loads/stores
+# ... e 'rs_<CLASSE>' quando não há estação livre daquela classe
+
+# Estado da entrada no head do ROB ao fim do ciclo
+HEAD_VAZIO = 'vazio'
+HEAD_PRONTO = 'pronto'       # Faz commit no próximo ciclo
+HEAD_OPERANDOS = 'operandos' # RS esperando operandos (qj/qk)
+HEAD_EXECUCAO = 'execucao'   # Esperando unidade funcional ou executando
+HEAD_CDB = 'cdb'             # Terminou mas perdeu a arbitragem do CDB
+
+ESTAGIOS = ('commit', 'write', 'execute', 'issue')
+
+SEM_AMOSTRA = None # Valor dos ciclos que passaram sem amostra
+_PASSO_MARCA = 512 # Trechos entre contagens acumuladas de uma Serie
+
+
+class Serie:
+    """Série temporal em run-length: [[valor, ciclos], ...].
+
+    Mantém a contagem por valor da série inteira e, a cada _PASSO_MARCA
+    trechos, a contagem acumulada até ali: o histograma de qualquer prefixo
+    (relatório depois de voltar no tempo) percorre no máximo esse tanto de
+    trechos, não a série toda.
+    """
+
+    def __init__(self):
+        self.trechos = []
+        self.total = 0 # Ciclos na série
+        self._contagem = {} # valor -> ciclos
+        self._marcas = [] # contagem antes do trecho k * _PASSO_MARCA
+        self._ciclos_marcas = [] # ciclos antes do trecho k * _PASSO_MARCA
+
+    def adicionar(self, valor, n=1):
+        if self.trechos and self.trechos[-1][0] == valor:
+            self.trechos[-1][1] += n
+        else:
+            if len(self.trechos) % _PASSO_MARCA == 0:
+                self._marcas.append(dict(self._contagem))
+                self._ciclos_marcas.append(self.total)
+            self.trechos.append([valor, n])
+        self.total += n
+        self._contagem[valor] = self._contagem.get(valor, 0) + n
+
+    def _percorrer(self, n):
+        """(trechos que cobrem os n primeiros ciclos, ciclos do último deles que
+        entram, contagem dos n primeiros ciclos), partindo da última marca antes de n."""
+        k = max(bisect_right(self._ciclos_marcas, n) - 1, 0)
+        i, ciclos, contagem = k * _PASSO_MARCA, self._ciclos_marcas[k], dict(self._marcas[k])
+        parte = 0
+        while ciclos < n:
+            valor, c = self.trechos[i]
+            parte = min(c, n - ciclos)
+            contagem[valor] = contagem.get(valor, 0) + parte
+            ciclos += parte
+            i += 1
+        return i, parte, contagem
+
+    def contagem(self, n=None):
+        """Ciclos por valor nos n primeiros ciclos (na série toda, se n for None)."""
+        if n is None or n >= self.total:
+            return dict(self._contagem)
+        return self._percorrer(max(n, 0))[2]
+
+    def truncar(self, n):
+        """Mantém só os n primeiros ciclos."""
+        if n >= self.total:
+            return
+        n = max(n, 0)
+        i, parte, contagem = self._percorrer(n)
+        del self.trechos[i:]
+        if parte:
+            self.trechos[-1][1] = parte
+        marcas = -(-i // _PASSO_MARCA)
+        del self._marcas[marcas:]
+        del self._ciclos_marcas[marcas:]
+        self.total, self._contagem = n, contagem
+
+    def prefixo(self, n):
+        """Trechos dos n primeiros ciclos."""
+        trechos = []
+        for valor, ciclos in self.trechos:
+            if n <= 0:
+                break
+            trechos.append([valor, min(ciclos, n)])
+            n -= ciclos
+        return trechos
+
+    def histograma(self, n=None):
+        """Ciclos por valor (só os n primeiros, se n for dado), sem SEM_AMOSTRA."""
+        return dict(sorted((v, c) for v, c in self.contagem(n).items() if v is not SEM_AMOSTRA))
+
+    def valores(self):
+        """Expande a série (um valor por ciclo)."""
+        for valor, n in self.trechos:
+            for _ in range(n):
+                yield valor
+
+
+def _resumo(serie, n=None):
+    h = serie.histograma(n)
+    total = sum(h.values())
+    return {
+        'media': sum(v * n for v, n in h.items()) / total if total else 0,
+        'max': max(h) if h else 0,
+        'histograma': h,
+    }
+
+
+def estado_head(sim):
+    """Por que o head do ROB não faz commit (HEAD_*)."""
+    if sim.itens_no_rob == 0:
+        return HEAD_VAZIO
+    head = sim.rob[sim.head]
+    if head.pronto:
+        return HEAD_PRONTO
+    for rs in sim.rs_add + sim.rs_mul + sim.rs_mem:
+        if rs.busy and rs.dest == sim.head:
+            if rs.qj is not None or rs.qk is not None:
+                return HEAD_OPERANDOS
+            if any(c[2] is rs and c[0] <= sim.ciclo for c in sim.conclusoes):
+                return HEAD_CDB
+            return HEAD_EXECUCAO
+    return HEAD_EXECUCAO
+
+
+class Instrumentacao:
+    def __init__(self, tempo_estagios=False):
+        self.tempo_estagios = tempo_estagios # Cronometra cada estágio de executar_ciclo
+        self.limpar()
+
+    def limpar(self):
+        self.ciclo_inicial = None # Ciclo do simulador antes da primeira amostra
+        self.gravados = 0 # Ciclos nas séries a partir de ciclo_inicial (podem passar da posição)
+        self.posicao = 0 # Ciclo atual do simulador: o relatório lê as amostras até ele
+        self.ocupacao_rob = Serie()
+        self.rs_ocupadas = {}  # classe -> Serie de estações busy
+        self.causa_issue = Serie()
+        self.estado_head = Serie()
+        self.tempos = dict.fromkeys(ESTAGIOS, 0.0)
+
+    def _series(self):
+        return (self.ocupacao_rob, self.causa_issue, self.estado_head, *self.rs_ocupadas.values())
+
+    def amostrar(self, sim, causa_issue, n=1):
+        if self.ciclo_inicial is None or (not self.gravados and sim.ciclo - n < self.ciclo_inicial):
+            self.ciclo_inicial = sim.ciclo - n
+        self.posicao = sim.ciclo
+        fim = self.ciclo_inicial + self.gravados
+        novos = min(n, sim.ciclo - fim)
+        if novos <= 0:
+            return # Ciclos já amostrados antes de voltar no tempo
+        if novos < sim.ciclo - fim:
+            lacuna = sim.ciclo - fim - novos
+            for serie in self._series():
+                serie.adicionar(SEM_AMOSTRA, lacuna)
+            self.gravados += lacuna
+        self.gravados += novos
+        self.ocupacao_rob.adicionar(sim.itens_no_rob, novos)
+        for classe, estacoes in (('ADD', sim.rs_add), ('MUL', sim.rs_mul), ('MEM', sim.rs_mem)):
+            serie = self.rs_ocupadas.get(classe)
+            if serie is None:
+                serie = self.rs_ocupadas[classe] = Serie()
+            serie.adicionar(sum(1 for rs in estacoes if rs.busy), novos)
+        self.causa_issue.adicionar(causa_issue, novos)
+        self.estado_head.adicionar(estado_head(sim), novos)
+
+    def posicionar(self, ciclo):
+        """O simulador está em `ciclo` sem ter amostrado até ali (voltar_ciclo,
+        goto_cycle). Se ainda não há amostras, elas contam a partir daqui: o que
+        for pulado depois fica SEM_AMOSTRA."""
+        if self.ciclo_inicial is None:
+            self.ciclo_inicial = ciclo
+        self.posicao = ciclo
+
+    def truncar(self, ciclo):
+        """Descarta as amostras dos ciclos depois de `ciclo`, que deixaram de
+        valer (o histórico recomeçou ali). Os tempos de cronometrar() ficam."""
+        self.posicao = ciclo
+        if self.ciclo_inicial is None:
+            return
+        manter = min(max(ciclo - self.ciclo_inicial, 0), self.gravados)
+        if manter == self.gravados:
+            return
+        self.gravados = manter
+        for serie in self._series():
+            serie.truncar(manter)
+        if manter == 0:
+            self.ciclo_inicial = None
+
+    def _lidos(self):
+        """Ciclos das séries até a posição atual."""
+        if self.ciclo_inicial is None:
+            return 0
+        return min(max(self.posicao - self.ciclo_inicial, 0), self.gravados)
+
+    def cronometrar(self, marcas):
+        """marcas: perf_counter() no início e depois de cada estágio."""
+        for estagio, inicio, fim in zip(ESTAGIOS, marcas, marcas[1:]):
+            self.tempos[estagio] += fim - inicio
+
+    def relatorio(self, sim=None):
+        n = self._lidos()
+        sem_amostra = self.ocupacao_rob.contagem(n).get(SEM_AMOSTRA, 0)
+        alem = 0 if self.ciclo_inicial is None else max(self.posicao - self.ciclo_inicial - self.gravados, 0)
+        r = {
+            'ciclos_amostrados': n - sem_amostra,
+            'ciclos_sem_amostra': sem_amostra + alem,
+            'ocupacao_rob': _resumo(self.ocupacao_rob, n),
+            'rs_ocupadas': {classe: _resumo(s, n) for classe, s in self.rs_ocupadas.items()},
+            'causa_issue': self.causa_issue.histograma(n),
+            'estado_head': self.estado_head.histograma(n),
+        }
+        if sim is not None:
+            r['ocupacao_rob']['capacidade'] = sim.tamanho_rob
+            for classe, resumo in r['rs_ocupadas'].items():
+                resumo['capacidade'] = sim.num_rs[classe]
+        if self.tempo_estagios:
+            r['tempo_estagios'] = dict(self.tempos)
+        return r
+
+    def series(self):
+        """Séries temporais em run-length até a posição atual, prontas para
+        serializar (SEM_AMOSTRA vira null)."""
+        n = self._lidos()
+        s = {
+            'ocupacao_rob': self.ocupacao_rob.prefixo(n),
+            'causa_issue': self.causa_issue.prefixo(n),
+            'estado_head': self.estado_head.prefixo(n),
+        }
+        s.update((f'rs_{classe}', serie.prefixo(n)) for classe, serie in self.rs_ocupadas.items())
+        return s
@@ -0,0 +1,386 @@
+# tomasulo_sweep.py
+import csv
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from tomasulo_engine import SimuladorTomasulo
+from tomasulo_asm import montar_arquivo
+import tomasulo_resultados
+
+# Colunas de resultado gravadas depois das colunas de configuração
+CAMPOS_RESULTADO = ('ciclos', 'commits', 'ipc', 'bolhas', 'bolhas_rob', 'bolhas_rs', 'flushes',
+                    'precisao_previsao')
+
+# Eixos aceitos numa configuração: 'programa', 'tamanho_rob', 'rs_add', 'rs_mul',
+# 'rs_mem', 'uf_add', 'uf_mul', 'largura_issue', 'largura_commit', 'num_cdb',
+# 'tamanho_lsq', 'latencia_memoria', 'preditor', 'resolucao_desvio' e 'lat_<OP>'
+# (ex.: 'lat_MUL').
+
+
+def grade(programas, **eixos):
+    """Produto cartesiano dos eixos para cada programa.
+
+    Ex.: grade(['a.s'], tamanho_rob=[4, 8], lat_MUL=[4, 8, 16])
+    """
+    nomes = sorted(eixos)
+    for programa in programas:
+        for valores in itertools.product(*(eixos[n] for n in nomes)):
+            config = {'programa': programa}
+            config.update(zip(nomes, valores))
+            yield config
+
+
+def amostra(programas, n, seed=None, **eixos):
+    """n configurações distintas sorteadas da mesma grade."""
+    rng = random.Random(seed)
+    nomes = sorted(eixos)
+    vistas = set()
+    tentativas = 0
+    while len(vistas) < n and tentativas < 20 * n:
+        tentativas += 1
+        config = {'programa': rng.choice(programas)}
+        for nome in nomes:
+            config[nome] = rng.choice(eixos[nome])
+        chave = _chave(config)
+        if chave not in vistas:
+            vistas.add(chave)
+            yield config
+
+
+def _chave(config, nomes=None):
+    """Identifica a configuração; valores viram str para casar com o que é lido do CSV."""
+    nomes = sorted(config) if nomes is None else nomes
+    return tuple((k, str(config.get(k))) for k in nomes)
+
+
+_programas = {}  # Programas montados, por processo de trabalho (o cache em disco é compartilhado)
+
+
+def _ler_programa(caminho):
+    programa = _programas.get(caminho)
+    if programa is None:
+        programa = _programas[caminho] = montar_arquivo(caminho)
+    return programa
+
+
+def _maquina(config):
+    """Configuração no formato de tomasulo_lote.configurar ('latencias' + argumentos
+    nomeados de set_config). Execução escalar, em lote e chave do cache partem dela."""
+    latencias = {k[4:].upper(): int(v) for k, v in config.items() if k.startswith('lat_')}
+    num_rs = {k[3:].upper(): int(v) for k, v in config.items() if k.startswith('rs_')}
+    num_ufs = {k[3:].upper(): int(v) for k, v in config.items() if k.startswith('uf_')}
+    maquina = {k: int(config[k]) for k in ('tamanho_rob', 'largura_issue', 'largura_commit', 'num_cdb',
+                                           'tamanho_lsq', 'latencia_memoria')
+               if config.get(k) is not None}
+    return dict(maquina, latencias=latencias, num_rs=num_rs, num_ufs=num_ufs, preditor=config.get('preditor'),
+                resolucao_desvio=config.get('resolucao_desvio'))
+
+
+def _linha(config, resultado):
+    linha = dict(config)
+    linha.update((campo, resultado[campo]) for campo in CAMPOS_RESULTADO)
+    return linha
+
+
+def _resultado_config(config, max_cycles=None):
+    """(relatorio, registradores finais) de uma configuração no modo headless."""
+    from tomasulo_lote import configurar
+
+    sim = configurar(_maquina(config))
+    sim.reset()
+    sim.carregar_programa(_ler_programa(config['programa']))
+    return sim.run(max_cycles=max_cycles), list(sim.regs)
+
+
+def executar_config(config, max_cycles=None):
+    """Roda uma configuração no modo headless e devolve a linha de resultado."""
+    return _linha(config, _resultado_config(config, max_cycles)[0])
+
+
+def _resultados_lote(configs, max_cycles=None):
+    """(relatorio, registradores finais) de cada configuração, em ordem (ver executar_lote)."""
+    from tomasulo_lote import SimuladorLote
+
+    por_programa = {}
+    for i, config in enumerate(configs):
+        por_programa.setdefault(config['programa'], []).append(i)
+    resultados = [None] * len(configs)
+    for caminho, indices in por_programa.items():
+        lote = SimuladorLote(_ler_programa(caminho), [_maquina(configs[i]) for i in indices], estrito=False)
+        for i, resultado, regs in zip(indices, lote.run(max_cycles), lote.regs_finais):
+            resultados[i] = (resultado, regs)
+    return resultados
+
+
+def executar_lote(configs, max_cycles=None):
+    """Roda várias configurações e devolve as linhas de resultado (em ordem).
+
+    As do mesmo programa vão juntas para o motor em lote (tomasulo_lote, requer
+    numpy); as que ele não cobre rodam no motor escalar.
+    """
+    return [_linha(c, r) for c, (r, _) in zip(configs, _resultados_lote(configs, max_cycles))]
+
+
+def _executar_tarefa(configs, max_cycles, lote):
+    if lote:
+        return _resultados_lote(configs, max_cycles)
+    return [_resultado_config(c, max_cycles) for c in configs]
+
+
+def _chave_resultado(config, molde, max_cycles):
+    """Chave do cache de resultados sem montar um simulador executável: uma
+    cópia rasa de molde só com a configuração trocada (tomasulo_lote.configurar)."""
+    from tomasulo_lote import configurar
+
+    sim = configurar(_maquina(config), molde)
+    return tomasulo_resultados.chave(sim, max_cycles, programa=_ler_programa(config['programa']))
+
+
+def _fim_da_ultima_linha(f, bloco=1 << 16):
+    """Posição logo depois do último '\n' do arquivo binário f (0 se não houver)."""
+    fim = f.seek(0, os.SEEK_END)
+    while fim > 0:
+        inicio = max(fim - bloco, 0)
+        f.seek(inicio)
+        i = f.read(fim - inicio).rfind(b'\n')
+        if i >= 0:
+            return inicio + i + 1
+        fim = inicio
+    return 0
+
+
+class _EscritorCSV:
+    def __init__(self, caminho, campos):
+        if os.path.exists(caminho):
+            # Uma varredura interrompida pode ter deixado a última linha pela
+            # metade: ela sai antes de acrescentar (e não conta como feita, ver
+            # _ler_existentes)
+            with open(caminho, 'r+b') as f:
+                f.truncate(_fim_da_ultima_linha(f))
+        novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        self.arquivo = open(caminho, 'a', newline='')
+        self.writer = csv.DictWriter(self.arquivo, fieldnames=campos)
+        if novo:
+            self.writer.writeheader()
+
+    def escrever(self, linha):
+        self.writer.writerow(linha)
+        self.arquivo.flush()
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+class _EscritorParquet:
+    """Grava um diretório de partes .parquet; cada parte é um lote de linhas terminadas."""
+
+    def __init__(self, diretorio, campos, linhas_por_parte=256):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Saída Parquet requer o pacote 'pyarrow' (pip install pyarrow)") from None
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.campos = campos
+        self.linhas_por_parte = linhas_por_parte
+        self.buffer = []
+        self.parte = len([n for n in os.listdir(diretorio) if n.endswith('.parquet')])
+
+    def escrever(self, linha):
+        self.buffer.append(linha)
+        if len(self.buffer) >= self.linhas_por_parte:
+            self._descarregar()
+
+    def _descarregar(self):
+        if not self.buffer:
+            return
+        tabela = self.pa.Table.from_pylist(self.buffer)
+        caminho = os.path.join(self.diretorio, f'parte-{self.parte:05d}.parquet')
+        self.pq.write_table(tabela.select(self.campos), caminho + '.tmp')
+        os.replace(caminho + '.tmp', caminho)  # Parte só aparece completa
+        self.parte += 1
+        self.buffer = []
+
+    def fechar(self):
+        self._descarregar()
+
+
+def _ler_existentes(saida, formato):
+    if not os.path.exists(saida):
+        return []
+    if formato == 'csv':
+        with open(saida, newline='') as f:
+            texto = f.read()
+        # Só linhas completas: o resto é de uma gravação interrompida
+        return list(csv.DictReader(texto[:texto.rfind('\n') + 1].splitlines(keepends=True)))
+    import pyarrow.parquet
+    partes = sorted(n for n in os.listdir(saida) if n.endswith('.parquet'))
+    linhas = []
+    for nome in partes:
+        linhas.extend(pyarrow.parquet.read_table(os.path.join(saida, nome)).to_pylist())
+    return linhas
+
+
+def _tarefas(pendentes, nomes, lote):
+    """Listas de uma configuração ou, com `lote`, de até `lote`."""
+    grupo = []
+    for config in pendentes:
+        if sorted(config) != nomes:
+            raise ValueError("Todas as configurações da varredura devem ter os mesmos eixos")
+        grupo.append(config)
+        if len(grupo) >= (lote or 1):
+            yield grupo
+            grupo = []
+    if grupo:
+        yield grupo
+
+
+def _gravar(escritor, cache, configs, chaves, resultados):
+    for config, k, (relatorio, regs) in zip(configs, chaves, resultados):
+        if cache is not None:
+            cache.guardar(k, relatorio, regs)
+        escritor.escrever(_linha(config, relatorio))
+    return len(configs)
+
+
+def varrer(configs, saida, processos=None, max_cycles=None, formato=None, lote=None, cache=None):
+    """Executa as configurações em paralelo e grava uma linha por execução assim que termina.
+
+    Configurações que já estão em `saida` são puladas, então uma varredura
+    interrompida continua de onde parou. `formato` é 'csv' ou 'parquet' (neste
+    caso `saida` é um diretório); por padrão é deduzido da extensão. Com
+    `lote`, cada tarefa leva até `lote` configurações para executar_lote.
+    Com `cache` (tomasulo_resultados.CacheResultados), configurações já
+    simuladas antes saem do cache sem passar pelos processos de trabalho, e
+    as novas são gravadas nele. Devolve quantas execuções foram gravadas.
+    """
+    formato = formato or ('parquet' if saida.endswith('.parquet') else 'csv')
+    if formato not in ('csv', 'parquet'):
+        raise ValueError(f"Formato desconhecido: {formato}")
+
+    configs = iter(configs)
+    primeira = next(configs, None)
+    if primeira is None:
+        return 0
+    nomes = sorted(primeira)
+    campos = ['programa'] + [n for n in nomes if n != 'programa'] + list(CAMPOS_RESULTADO)
+
+    existentes = _ler_existentes(saida, formato)
+    if existentes and sorted(existentes[0]) != sorted(campos):
+        raise ValueError(f"{saida} tem outras colunas; use outro arquivo de saída para estes eixos")
+    feitas = {_chave(linha, nomes) for linha in existentes}
+    pendentes = (c for c in itertools.chain([primeira], configs) if _chave(c, nomes) not in feitas)
+
+    processos = processos or os.cpu_count() or 1
+    escritor = _EscritorCSV(saida, campos) if formato == 'csv' else _EscritorParquet(saida, campos)
+    executadas = 0
+    molde = SimuladorTomasulo() if cache is not None else None
+    pool = None # Só é criado quando alguma configuração não está no cache
+    try:
+        em_voo = {} # futuro -> (configurações, chaves)
+        for tarefa in _tarefas(pendentes, nomes, lote):
+            chaves = [None] * len(tarefa)
+            if cache is not None:
+                chaves = [_chave_resultado(c, molde, max_cycles) for c in tarefa]
+                faltam = []
+                for config, k in zip(tarefa, chaves):
+                    resultado = cache.buscar(k)
+                    if resultado is None:
+                        faltam.append((config, k))
+                    else:
+                        escritor.escrever(_linha(config, resultado['relatorio']))
+                        executadas += 1
+                if not faltam:
+                    continue
+                tarefa, chaves = [c for c, _ in faltam], [k for _, k in faltam]
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=processos)
+            em_voo[pool.submit(_executar_tarefa, tarefa, max_cycles, lote)] = (tarefa, chaves)
+            # Limita as tarefas pendentes para grades enormes não ocuparem memória
+            if len(em_voo) >= 4 * processos:
+                prontas, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+                for futuro in prontas:
+                    executadas += _gravar(escritor, cache, *em_voo.pop(futuro), futuro.result())
+        for futuro in as_completed(em_voo):
+            executadas += _gravar(escritor, cache, *em_voo[futuro], futuro.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        escritor.fechar()
+    return executadas
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m tomasulo_sweep',
+                                     description='Varredura de latências, largura da máquina, ROB, estações de reserva e preditores.')
+    parser.add_argument('programas', nargs='+')
+    parser.add_argument('--rob', nargs='+', type=int, help='tamanhos de ROB')
+    parser.add_argument('--rs-add', nargs='+', type=int, help='quantidades de estações ADD')
+    parser.add_argument('--rs-mul', nargs='+', type=int, help='quantidades de estações MUL')
+    parser.add_argument('--rs-mem', nargs='+', type=int, help='quantidades de estações MEM (LW/SW)')
+    parser.add_argument('--uf-add', nargs='+', type=int, help='unidades funcionais ADD (0 = uma por estação)')
+    parser.add_argument('--uf-mul', nargs='+', type=int, help='unidades funcionais MUL (0 = uma por estação)')
+    parser.add_argument('--issue', nargs='+', type=int, help='larguras de issue')
+    parser.add_argument('--commit', nargs='+', type=int, help='larguras de commit')
+    parser.add_argument('--cdb', nargs='+', type=int, help='quantidades de CDBs (0 = ilimitado)')
+    parser.add_argument('--lsq', nargs='+', type=int, help='tamanhos da fila de loads/stores')
+    parser.add_argument('--mem-lat', nargs='+', type=int, help='latências da memória de dados')
+    parser.add_argument('--preditor', nargs='+', help='preditores de desvio (ver tomasulo_predictor)')
+    parser.add_argument('--resolucao', nargs='+', help="onde resolver o BEQ: 'commit' e/ou 'execute'")
+    parser.add_argument('--lat', nargs='+', action='extend', default=[], metavar='OP=V1,V2',
+                        help='latências a varrer, ex.: --lat MUL=4,8 DIV=10,20')
+    parser.add_argument('--amostras', type=int, default=None,
+                        help='sorteia N configurações em vez de percorrer a grade inteira')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--saida', required=True, help='arquivo .csv ou diretório .parquet')
+    parser.add_argument('-j', '--processos', type=int, default=None)
+    parser.add_argument('--max-cycles', type=int, default=None)
+    parser.add_argument('--lote', type=int, default=None, metavar='N',
+                        help='roda até N configurações por tarefa no motor em lote (requer numpy)')
+    parser.add_argument('--cache-resultados', nargs='?', const=tomasulo_resultados.ARQUIVO_PADRAO, default=None,
+                        metavar='ARQUIVO', help='reaproveita resultados de execuções idênticas (sqlite; padrão: '
+                        'resultados.sqlite no cache de programas)')
+    args = parser.parse_args(argv)
+
+    eixos = {}
+    if args.rob: eixos['tamanho_rob'] = args.rob
+    if args.rs_add: eixos['rs_add'] = args.rs_add
+    if args.rs_mul: eixos['rs_mul'] = args.rs_mul
+    if args.rs_mem: eixos['rs_mem'] = args.rs_mem
+    if args.uf_add: eixos['uf_add'] = args.uf_add
+    if args.uf_mul: eixos['uf_mul'] = args.uf_mul
+    if args.issue: eixos['largura_issue'] = args.issue
+    if args.commit: eixos['largura_commit'] = args.commit
+    if args.cdb: eixos['num_cdb'] = args.cdb
+    if args.lsq: eixos['tamanho_lsq'] = args.lsq
+    if args.mem_lat: eixos['latencia_memoria'] = args.mem_lat
+    if args.preditor: eixos['preditor'] = args.preditor
+    if args.resolucao: eixos['resolucao_desvio'] = args.resolucao
+    for item in args.lat:
+        op, sep, valores = item.partition('=')
+        if not sep:
+            parser.error(f"Esperado OP=V1,V2, recebido '{item}'")
+        eixos[f'lat_{op.strip().upper()}'] = [int(v) for v in valores.split(',')]
+
+    if args.amostras is not None:
+        configs = amostra(args.programas, args.amostras, seed=args.seed, **eixos)
+    else:
+        configs = grade(args.programas, **eixos)
+    cache = tomasulo_resultados.CacheResultados(args.cache_resultados) if args.cache_resultados else None
+    try:
+        n = varrer(configs, args.saida, processos=args.processos, max_cycles=args.max_cycles, lote=args.lote,
+                   cache=cache)
+    finally:
+        if cache is not None:
+            cache.fechar()
+    print(f"{n} execuções gravadas em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
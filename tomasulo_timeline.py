@@ -0,0 +1,242 @@
+# tomasulo_timeline.py
+import json
+from array import array
+from collections import namedtuple
+
+# Linha do tempo por instrução dinâmica: `sim.linha_do_tempo = LinhaDoTempo()`
+# faz o motor registrar, para cada instrução emitida, os ciclos de issue,
+# início e fim da execução, write e commit, além dos produtores (RAW) que ela
+# esperou no ISSUE. Os dados ficam em colunas array('q') (≈ 70 bytes por
+# instrução). Ao contrário da instrumentação, não é desfeita por voltar_ciclo. Pode ser
+# ligada no meio da execução: só entram as instruções emitidas dali em diante.
+
+NENHUM = -1
+
+DESCARTADA = 1  # Squash/flush: o ciclo fica na coluna commit
+MISPREDICT = 2  # BEQ mal previsto
+
+Registro = namedtuple('Registro', 'seq pc rob emissao inicio fim escrita commit prod_j prod_k flags')
+
+_COLUNAS = ('pc', 'rob', 'emissao', 'inicio', 'fim', 'escrita', 'commit', 'prod_j', 'prod_k')
+
+
+class LinhaDoTempo:
+    def __init__(self):
+        self.limpar()
+
+    def limpar(self):
+        for nome in _COLUNAS:
+            setattr(self, nome, array('q'))
+        self.flags = bytearray()
+        self._seq_do_rob = {}  # Instrução dinâmica que ocupa cada entrada do ROB
+
+    def __len__(self):
+        return len(self.pc)
+
+    def registro(self, seq):
+        return Registro(seq, *(getattr(self, nome)[seq] for nome in _COLUNAS), self.flags[seq])
+
+    def __iter__(self):
+        return (self.registro(seq) for seq in range(len(self)))
+
+    # --- Chamadas pelo motor ---
+    def emitir(self, ciclo, pc, rob, qj, qk):
+        seq = len(self.pc)
+        self._seq_do_rob[rob] = seq
+        self.pc.append(pc)
+        self.rob.append(rob)
+        self.emissao.append(ciclo)
+        for coluna in (self.inicio, self.fim, self.escrita, self.commit):
+            coluna.append(NENHUM)
+        self.prod_j.append(NENHUM if qj is None else self._seq_do_rob.get(qj, NENHUM))
+        self.prod_k.append(NENHUM if qk is None else self._seq_do_rob.get(qk, NENHUM))
+        self.flags.append(0)
+
+    # Instruções emitidas antes de a linha do tempo ser ligada (ou de limpar())
+    # não estão em _seq_do_rob: os eventos delas são ignorados
+    def iniciar(self, ciclo, rob):
+        seq = self._seq_do_rob.get(rob)
+        if seq is not None:
+            self.inicio[seq] = ciclo
+
+    def terminar(self, ciclo, rob):
+        seq = self._seq_do_rob.get(rob)
+        if seq is not None:
+            self.fim[seq] = ciclo
+
+    def escrever(self, ciclo, rob):
+        seq = self._seq_do_rob.get(rob)
+        if seq is not None:
+            self.escrita[seq] = ciclo
+
+    def aposentar(self, ciclo, rob, mispredict=False):
+        seq = self._seq_do_rob.pop(rob, None)
+        if seq is None:
+            return
+        self.commit[seq] = ciclo
+        if mispredict:
+            self.flags[seq] |= MISPREDICT
+
+    def marcar_mispredict(self, rob):
+        seq = self._seq_do_rob.get(rob)
+        if seq is not None:
+            self.flags[seq] |= MISPREDICT
+
+    def descartar(self, ciclo, robs):
+        for rob in robs:
+            seq = self._seq_do_rob.pop(rob, None)
+            if seq is not None:
+                self.commit[seq] = ciclo
+                self.flags[seq] |= DESCARTADA
+
+
+# --- Caminho crítico ---
+
+CATEGORIAS = ('dependencia', 'execucao', 'estrutural', 'flush', 'issue', 'commit', 'incompleto')
+
+
+def caminho_critico(lt, ciclos=None):
+    """Atribui os ciclos da execução ao caminho crítico, andando de trás para frente.
+
+    Parte do commit da última instrução aposentada e, em cada nó, segue a
+    restrição que determinou aquele ciclo:
+    commit <- write da própria instrução ou commit da anterior (em ordem);
+    write <- início da execução (latência; espera por CDB é estrutural);
+    início <- write do produtor RAW mais tardio ou o próprio issue (espera por
+    unidade funcional é estrutural); issue <- issue da instrução anterior
+    (banda de issue, travamento estrutural, ou flush se a anterior for um BEQ
+    mal previsto). A latência de quem foi alcançado por uma aresta RAW conta
+    como 'dependencia'; a das demais, como 'execucao'. Como os pesos são
+    diferenças de ciclo ao longo do caminho, a soma é o total de ciclos.
+    """
+    aposentadas = [seq for seq in range(len(lt)) if not lt.flags[seq] & DESCARTADA and lt.commit[seq] != NENHUM]
+    categorias = dict.fromkeys(CATEGORIAS, 0)
+    caminho = []
+    if not aposentadas:
+        return {'total': ciclos or 0, 'categorias': categorias, 'caminho': caminho}
+    anterior = {seq: ant for ant, seq in zip(aposentadas, aposentadas[1:])}
+
+    def somar(seq, no, peso, categoria):
+        categorias[categoria] += peso
+        caminho.append((seq, no, peso, categoria))
+
+    seq, no, via_raw = aposentadas[-1], 'commit', False
+    total = lt.commit[seq]
+    while seq is not None:
+        ant = anterior.get(seq)
+        if no == 'commit':
+            c, w = lt.commit[seq], lt.escrita[seq]
+            if c == w + 1 or ant is None:
+                somar(seq, no, c - w, 'commit')
+                no = 'escrita'
+            else:
+                somar(seq, no, c - lt.commit[ant], 'commit')
+                seq = ant
+        elif no == 'escrita':
+            s, f, w = lt.inicio[seq], lt.fim[seq], lt.escrita[seq]
+            somar(seq, no, f - s + 1, 'dependencia' if via_raw else 'execucao')
+            if w - f - 1:
+                somar(seq, 'cdb', w - f - 1, 'estrutural')
+            no, via_raw = 'inicio', False
+        elif no == 'inicio':
+            s, pronto, produtor = lt.inicio[seq], lt.emissao[seq] + 1, None
+            for p in (lt.prod_j[seq], lt.prod_k[seq]):
+                if p != NENHUM and lt.escrita[p] >= pronto:
+                    pronto, produtor = lt.escrita[p], p
+            if s > pronto:
+                somar(seq, 'uf', s - pronto, 'estrutural')
+            if produtor is not None:
+                seq, no, via_raw = produtor, 'escrita', True
+            else:
+                somar(seq, no, 1, 'issue')
+                no = 'emissao'
+        else:  # emissao
+            i = lt.emissao[seq]
+            if ant is None:
+                somar(seq, no, i, 'issue')
+                seq = None
+                continue
+            d = i - lt.emissao[ant]
+            if lt.flags[ant] & MISPREDICT:
+                somar(seq, no, d, 'flush')
+            else:
+                somar(seq, no, d, 'issue' if d <= 1 else 'estrutural')
+            seq = ant
+
+    if ciclos is not None and ciclos > total:
+        categorias['incompleto'] = ciclos - total
+        total = ciclos
+    caminho.reverse()
+    return {'total': total, 'categorias': categorias, 'caminho': caminho}
+
+
+# --- Exportações ---
+
+def _texto(programa, pc):
+    return str(programa[pc]) if 0 <= pc < len(programa) else f"pc {pc}"
+
+
+def diagrama(lt, programa, primeiro=0, quantidade=30):
+    """Tabela de pipeline: uma linha por instrução dinâmica, uma coluna por ciclo.
+
+    I = issue, - = esperando, E = executando, W = write, . = esperando commit,
+    C = commit, X = descartada (squash/flush).
+    """
+    seqs = range(primeiro, min(primeiro + quantidade, len(lt)))
+    if not seqs:
+        return ""
+    inicio = min(lt.emissao[s] for s in seqs)
+    fim = max(max(lt.commit[s], lt.escrita[s], lt.emissao[s]) for s in seqs)
+    largura = max(len(_texto(programa, lt.pc[s])) for s in seqs)
+
+    linhas = [" " * (largura + 7) + "".join(str(c % 10) for c in range(inicio, fim + 1))]
+    for s in seqs:
+        r = lt.registro(s)
+        celulas = []
+        for c in range(inicio, fim + 1):
+            if c == r.emissao: ch = 'I'
+            elif r.commit != NENHUM and c == r.commit: ch = 'X' if r.flags & DESCARTADA else 'C'
+            elif r.commit != NENHUM and c > r.commit: ch = ' '
+            elif r.escrita != NENHUM and c == r.escrita: ch = 'W'
+            elif r.inicio != NENHUM and r.inicio <= c and (r.fim == NENHUM or c <= r.fim): ch = 'E'
+            elif r.escrita != NENHUM and c > r.escrita: ch = '.'
+            elif c > r.emissao: ch = '-'
+            else: ch = ' '
+            celulas.append(ch)
+        linhas.append(f"{s:5d} {_texto(programa, r.pc):<{largura}} " + "".join(celulas).rstrip())
+    return "\n".join(linhas)
+
+
+def exportar_chrome_trace(lt, programa, arquivo):
+    """Grava um JSON no formato Trace Event (chrome://tracing, Perfetto).
+
+    1 ciclo = 1 µs; cada entrada do ROB é uma linha (tid) e cada instrução
+    vira fatias de espera, execução, CDB e espera pelo commit.
+    """
+    with open(arquivo, 'w') as f:
+        f.write('{"displayTimeUnit": "ns", "traceEvents": [\n')
+        primeiro = True
+        for r in lt:
+            nome = _texto(programa, r.pc)
+            fim_vida = r.commit if r.commit != NENHUM else max(r.escrita, r.fim, r.inicio, r.emissao) + 1
+            fases = []
+            if r.inicio != NENHUM:
+                fases.append(('espera', r.emissao, r.inicio))
+                fim_exec = r.fim + 1 if r.fim != NENHUM else fim_vida
+                fases.append(('execucao', r.inicio, fim_exec))
+                if r.escrita != NENHUM:
+                    fases.append(('cdb', fim_exec, r.escrita))
+                    fases.append(('rob', r.escrita, fim_vida))
+            else:
+                fases.append(('espera', r.emissao, fim_vida))
+            args = {'seq': r.seq, 'pc': r.pc}
+            if r.flags & DESCARTADA: args['descartada'] = True
+            if r.flags & MISPREDICT: args['mispredict'] = True
+            for fase, ini, fim in fases:
+                if fim <= ini:
+                    continue
+                ev = {'name': nome, 'cat': fase, 'ph': 'X', 'ts': ini, 'dur': fim - ini,
+                      'pid': 0, 'tid': r.rob, 'args': args}
+                f.write(('' if primeiro else ',\n') + json.dumps(ev))
+                primeiro = False
+        f.write('\n]}\n')
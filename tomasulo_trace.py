@@ -0,0 +1,242 @@
+# tomasulo_trace.py
+import json
+import mmap
+import os
+from collections import namedtuple
+from enum import IntEnum
+
+# Stream de eventos do simulador. O motor só monta tuplas Evento quando
+# `sim.tracing` está ligado; o texto legível é gerado sob demanda (formatar),
+# e os sinks gravam o stream em JSONL ou num formato binário compacto.
+
+
+class Estagio(IntEnum):
+    ISSUE = 0       # rob, rs, instr
+    WRITE = 1       # rob, rs, instr, valor = resultado
+    COMMIT = 2      # rob, instr, valor = valor gravado no registrador
+    DESVIO = 3      # rob, instr, valor = 1 se tomou (commit de BEQ)
+    MISPREDICT = 4  # rob, instr, valor = 1 se tomou
+    FLUSH = 5       # rob = BEQ que esvaziou o ROB
+    SQUASH = 6      # rob = BEQ, valor = entradas descartadas
+    PC = 7          # valor = novo PC (len(programa) = fim)
+    LOAD = 8        # rob, rs, instr, valor = endereço lido da memória
+    ENCAMINHAMENTO = 9 # rob, rs, instr, valor = ROB do SW que forneceu o dado
+    VIOLACAO = 10   # rob = LW refeito, instr, valor = endereço
+
+
+class Evento(namedtuple('Evento', 'ciclo estagio rob rs instr valor')):
+    """Um evento de um estágio; campos que não se aplicam ficam None.
+
+    instr é o PC da instrução (índice em prog_original) e rs o nome da estação.
+    """
+    __slots__ = ()
+
+
+def formatar(ev, programa=()):
+    """Texto legível do evento (o que o log do GUI mostra)."""
+    e = ev.estagio
+    instr = programa[ev.instr] if ev.instr is not None and ev.instr < len(programa) else None
+    if e == Estagio.ISSUE:
+        return f"[ISSUE] {instr.op if instr else '?'} despachada p/ ROB {ev.rob} ({ev.rs})"
+    if e == Estagio.WRITE:
+        return f"[WRITE] {ev.rs} terminou. Val={ev.valor} -> ROB {ev.rob}"
+    if e == Estagio.COMMIT and instr is not None and instr.op == 'SW':
+        return f"[COMMIT] Instr {instr.id} (SW) no ROB {ev.rob} -> Memória"
+    if e == Estagio.COMMIT:
+        return f"[COMMIT] Instr {instr.id if instr else ev.instr} ({instr.op if instr else '?'}) no ROB {ev.rob} -> Regs"
+    if e == Estagio.DESVIO:
+        return f"[COMMIT] Desvio {instr} ({'Tomou' if ev.valor else 'Não tomou'} desvio)."
+    if e == Estagio.MISPREDICT:
+        return f"[FLUSH] Erro de Especulação na {instr} ({'tomou' if ev.valor else 'não tomou'} desvio)."
+    if e == Estagio.FLUSH:
+        return "[FLUSH] Estado Especulativo (RS, RAT, ROB) Limpo."
+    if e == Estagio.SQUASH:
+        return f"[FLUSH] Squash de {ev.valor} entradas do ROB após ROB {ev.rob}."
+    if e == Estagio.LOAD:
+        return f"[MEM] {ev.rs} lendo Mem[{ev.valor}] p/ ROB {ev.rob}"
+    if e == Estagio.ENCAMINHAMENTO:
+        return f"[MEM] {ev.rs} recebeu o dado do SW no ROB {ev.valor} p/ ROB {ev.rob}"
+    if e == Estagio.VIOLACAO:
+        return f"[FLUSH] {instr} leu Mem[{ev.valor}] antes de um SW anterior; refazendo a partir do ROB {ev.rob}."
+    if e == Estagio.PC:
+        if ev.valor < len(programa):
+            return f"PC atualizado. Próxima instrução a ser emitida é: {programa[ev.valor]}"
+        return "Fim do programa. Alvo de salto fora do programa."
+    return str(ev)
+
+
+class SinkNulo:
+    """Descarta tudo; com tracing desligado o motor nem chega a chamá-lo."""
+
+    def emitir(self, ev):
+        pass
+
+    def fechar(self):
+        pass
+
+
+class SinkLista:
+    def __init__(self):
+        self.eventos = []
+
+    def emitir(self, ev):
+        self.eventos.append(ev)
+
+    def fechar(self):
+        pass
+
+
+class SinkJSONL:
+    """Um objeto JSON por linha: {"ciclo": 3, "estagio": "WRITE", ...}."""
+
+    def __init__(self, arquivo):
+        self.arquivo = open(arquivo, 'w') if isinstance(arquivo, str) else arquivo
+
+    def emitir(self, ev):
+        d = ev._asdict()
+        d['estagio'] = ev.estagio.name
+        self.arquivo.write(json.dumps(d) + "\n")
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+def ler_jsonl(arquivo):
+    with open(arquivo) as f:
+        for linha in f:
+            d = json.loads(linha)
+            d['estagio'] = Estagio[d['estagio']]
+            yield Evento(**d)
+
+
+# --- Formato binário ---
+# Cabeçalho MAGICO + versão; cada evento é: estágio (1 byte), delta do ciclo,
+# rob, id da RS, instr e valor como varints. Campos opcionais são gravados
+# como v+1 (0 = None); valor e delta (que fica negativo depois de um
+# voltar_ciclo) usam zigzag. Nomes de RS viram ids na primeira
+# aparição (id novo seguido do nome em UTF-8 com tamanho).
+
+MAGICO = b'TMSE'
+VERSAO = 1
+
+
+def _varint(n, saida):
+    while n > 0x7F:
+        saida.append((n & 0x7F) | 0x80)
+        n >>= 7
+    saida.append(n)
+
+
+def _zigzag(v):
+    return v * 2 if v >= 0 else -v * 2 - 1
+
+
+def _unzigzag(z):
+    return z // 2 if z % 2 == 0 else -(z + 1) // 2
+
+
+class SinkBinario:
+    def __init__(self, arquivo, buffer=1 << 16):
+        self.arquivo = open(arquivo, 'wb') if isinstance(arquivo, str) else arquivo
+        self.arquivo.write(MAGICO + bytes([VERSAO]))
+        self.buf = bytearray()
+        self.limite = buffer
+        self.ultimo_ciclo = 0
+        self.ids_rs = {}
+
+    def emitir(self, ev):
+        b = self.buf
+        b.append(ev.estagio)
+        _varint(_zigzag(ev.ciclo - self.ultimo_ciclo), b)
+        self.ultimo_ciclo = ev.ciclo
+        _varint(0 if ev.rob is None else ev.rob + 1, b)
+        if ev.rs is None:
+            _varint(0, b)
+        else:
+            i = self.ids_rs.get(ev.rs)
+            if i is None:
+                i = self.ids_rs[ev.rs] = len(self.ids_rs)
+                _varint(i + 1, b)
+                nome = ev.rs.encode()
+                _varint(len(nome), b)
+                b += nome
+            else:
+                _varint(i + 1, b)
+        _varint(0 if ev.instr is None else ev.instr + 1, b)
+        _varint(0 if ev.valor is None else _zigzag(int(ev.valor)) + 1, b)
+        if len(b) >= self.limite:
+            self.arquivo.write(b)
+            self.buf = bytearray()
+
+    def fechar(self):
+        self.arquivo.write(self.buf)
+        self.buf = bytearray()
+        self.arquivo.close()
+
+
+def ler_binario(arquivo):
+    """Gerador de Evento a partir de um arquivo gravado por SinkBinario.
+
+    O arquivo é lido via mmap e os eventos são decodificados sob demanda, então
+    traces maiores que a memória podem ser percorridos.
+    """
+    with open(arquivo, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < len(MAGICO) + 1:
+            raise ValueError(f"{arquivo} não é um trace binário do simulador")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+            yield from _decodificar(dados, arquivo)
+
+
+def _decodificar(dados, arquivo):
+    if dados[:4] != MAGICO:
+        raise ValueError(f"{arquivo} não é um trace binário do simulador")
+    if dados[4] != VERSAO:
+        raise ValueError(f"Versão de trace não suportada: {dados[4]}")
+
+    pos = 5
+    fim = len(dados)
+    def varint():
+        nonlocal pos
+        n = shift = 0
+        while True:
+            if pos >= fim:
+                raise ValueError(f"{arquivo}: trace truncado (evento incompleto no byte {pos})")
+            byte = dados[pos]
+            pos += 1
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return n
+            shift += 7
+
+    nomes = []
+    ciclo = 0
+    while pos < fim:
+        estagio = Estagio(dados[pos])
+        pos += 1
+        ciclo += _unzigzag(varint())
+        rob = varint() - 1
+        rs = varint()
+        if rs > len(nomes):
+            tamanho = varint()
+            if pos + tamanho > fim:
+                raise ValueError(f"{arquivo}: trace truncado (nome de RS incompleto no byte {pos})")
+            nomes.append(dados[pos:pos + tamanho].decode())
+            pos += tamanho
+        instr = varint() - 1
+        valor = varint()
+        valor = _unzigzag(valor - 1) if valor else None
+        yield Evento(ciclo, estagio, None if rob < 0 else rob, nomes[rs - 1] if rs else None,
+                     None if instr < 0 else instr, valor)
+
+
+def eventos(sim, max_cycles=None):
+    """Gerador: executa `sim` ciclo a ciclo (com tracing) e devolve cada evento."""
+    tracing = sim.tracing
+    sim.tracing = True
+    try:
+        while not sim.esta_terminado():
+            if max_cycles is not None and sim.ciclo >= max_cycles:
+                break
+            yield from sim.executar_ciclo()
+    finally:
+        sim.tracing = tracing
@@ -0,0 +1,142 @@
+# tomasulo_workloads.py
+
+# Gerador de programas sintéticos para benchmarks e varreduras. Cada gerador
+# devolve a lista de linhas (o formato de carregar_instrucoes) e só usa
+# registradores inicializados pelo próprio programa, então o resultado não
+# depende de regs_iniciais. R0 nunca é escrito e vale 0.
+
+
+def cadeia_raw(n=1000, ops=('ADD', 'SUB')):
+    """n instruções em uma única cadeia de dependências verdadeiras (RAW)."""
+    return ["ADD R1, R0, 0"] + [f"{ops[i % len(ops)]} R1, R1, {i % 7 + 1}" for i in range(n)]
+
+
+def independentes(n=1000, fluxos=8):
+    """n instruções em `fluxos` cadeias independentes intercaladas (muito ILP)."""
+    linhas = [f"ADD R{f}, R0, {f}" for f in range(1, fluxos + 1)]
+    return linhas + [f"ADD R{i % fluxos + 1}, R{i % fluxos + 1}, 1" for i in range(n)]
+
+
+def dependencias_falsas(n=1000, registradores=4):
+    """Poucos registradores reescritos em rodízio: cada instrução lê um registrador
+    que a seguinte sobrescreve (WAR) e escreve num que foi escrito há
+    `registradores` instruções (WAW). Sem renomeação, seria quase serial."""
+    linhas = [f"ADD R{r}, R0, {r}" for r in range(1, registradores + 1)]
+    for i in range(n):
+        dest = i % registradores + 1
+        fonte = (i + 1) % registradores + 1
+        linhas.append(f"ADD R{dest}, R{fonte}, {i % 5 + 1}")
+    return linhas
+
+
+def mul_div(n=1000, fracao_div=0.25, fluxos=4):
+    """Kernel dominado por MUL/DIV em `fluxos` cadeias; uma DIV a cada 1/fracao_div."""
+    linhas = [f"ADD R{f}, R0, {f + 1}" for f in range(1, fluxos + 1)]
+    passo_div = round(1 / fracao_div) if fracao_div > 0 else 0
+    for i in range(n):
+        r = i % fluxos + 1
+        if passo_div and i % passo_div == passo_div - 1:
+            linhas.append(f"DIV R{r}, R{r}, 2")
+        else:
+            linhas.append(f"MUL R{r}, R{r}, 3")
+        if i % 8 == 7:
+            linhas.append(f"SUB R{r}, R{r}, R{r}")  # Evita números enormes
+            linhas.append(f"ADD R{r}, R{r}, {r + 1}")
+    return linhas
+
+
+# Gerador congruencial (ZX81): x' = (75x + 74) mod 65537, sem estourar a precisão
+# do DIV do motor (int(vj / vk) em float)
+_LCG_A, _LCG_C, _LCG_M = 75, 74, 65537
+
+
+def laco(iteracoes=500, taxa_tomado=0.5, corpo=4, semente=1):
+    """Laço com um BEQ interno tomado em ~taxa_tomado das iterações.
+
+    O desvio depende de um número pseudoaleatório calculado no próprio programa
+    (x mod m via DIV/MUL/SUB): é tomado quando x < taxa_tomado * m, pulando uma
+    instrução. `corpo` ADDs independentes completam cada iteração.
+    """
+    limiar = max(1, round(taxa_tomado * _LCG_M))
+    linhas = [f"ADD R1, R0, {iteracoes}", f"ADD R2, R0, {semente % _LCG_M}", "ADD R5, R0, 0"]
+    linhas += [f"ADD R{6 + k}, R0, 0" for k in range(min(corpo, 4))]
+    topo = len(linhas)
+    linhas += [
+        f"MUL R3, R2, {_LCG_A}",
+        f"ADD R3, R3, {_LCG_C}",
+        f"DIV R4, R3, {_LCG_M}",
+        f"MUL R4, R4, {_LCG_M}",
+        "SUB R2, R3, R4",            # x = (a*x + c) mod m
+        f"DIV R4, R2, {limiar}",     # 0 se x < limiar
+    ]
+    salto = len(linhas)
+    linhas += [f"BEQ R4, R0, {salto + 2}", "ADD R5, R5, 1"]
+    linhas += [f"ADD R{6 + k % 4}, R{6 + k % 4}, 1" for k in range(corpo)]
+    fim = len(linhas) + 3
+    linhas += ["SUB R1, R1, 1", f"BEQ R1, R0, {fim}", f"BEQ R0, R0, {topo}"]
+    return linhas
+
+
+def memoria(n=1000, palavras=16, passo_store=3):
+    """n LW/SW sobre um vetor de `palavras` palavras (4 bytes) a partir do endereço 0.
+
+    Um SW a cada `passo_store` acessos; o LW seguinte lê o mesmo endereço. Metade
+    dos SWs tem a base calculada por um MUL: o LW passa na frente com o endereço
+    do SW ainda desconhecido e é refeito. Nos outros o dado vem por encaminhamento.
+    """
+    linhas = ["ADD R1, R0, 0", "ADD R2, R0, 1"]
+    desloc, stores = 0, 0
+    for i in range(n):
+        if i % passo_store != passo_store - 1:
+            linhas.append(f"LW R{4 + i % 4}, {desloc}(R1)")
+            desloc = (desloc + 28) % (palavras * 4)
+            continue
+        base = "R1"
+        if stores % 2:
+            linhas.append("MUL R3, R1, 1")  # Mesma base, mas só conhecida depois do MUL
+            base = "R3"
+        linhas.append(f"SW R2, {desloc}({base})")  # Lido pelo próximo LW
+        linhas.append("ADD R2, R2, 1")
+        stores += 1
+    return linhas
+
+
+CARGAS = {
+    'raw': cadeia_raw,
+    'ilp': independentes,
+    'falsas': dependencias_falsas,
+    'muldiv': mul_div,
+    'laco': laco,
+    'memoria': memoria,
+}
+
+
+def gerar(tipo, **parametros):
+    try:
+        gerador = CARGAS[tipo]
+    except KeyError:
+        raise ValueError(f"Carga desconhecida: {tipo} (opções: {', '.join(CARGAS)})") from None
+    return gerador(**parametros)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m tomasulo_workloads',
+                                     description='Gera um programa sintético (uma instrução por linha).')
+    parser.add_argument('tipo', choices=list(CARGAS))
+    parser.add_argument('parametros', nargs='*', metavar='NOME=VALOR',
+                        help='parâmetros do gerador, ex.: n=5000 fluxos=4 taxa_tomado=0.9')
+    args = parser.parse_args(argv)
+
+    parametros = {}
+    for item in args.parametros:
+        nome, sep, valor = item.partition('=')
+        if not sep:
+            parser.error(f"Esperado NOME=VALOR, recebido '{item}'")
+        parametros[nome] = float(valor) if '.' in valor else int(valor)
+    print("\n".join(gerar(args.tipo, **parametros)))
+
+
+if __name__ == "__main__":
+    main()